@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Armor.py builds !AIVDM sentences out of binary payloads, in process (a Python counterpart of unpacker.c).
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# Payloads are armored six bits per character, padded with fill bits to a six-bit boundary
+# and split into fragments so that no sentence exceeds the 82 characters allowed by NMEA 0183.
+# Sentences can be prefixed with an NMEA 4.10 tag block giving their source (s:) and time (c:, Unix
+# time in seconds), e.g. \s:AISTX,c:1700000000*6D\!AIVDM,1,1,,A,...
+#
+# Usage example:
+# >>> import AIVDM_Armor
+# >>> AIVDM_Armor.Armorer("A").sentences_from_bits("000001000000...")
+#
+
+import binascii
+import math
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Payload characters per fragment: keeps "!AIVDM,n,m,s,c,<payload>,f*hh<CR><LF>" within 82 characters
+MAX_FRAGMENT_CHARS = 60
+
+# Six-bit value -> armored ASCII character ('0'..'W', then '`'..'w')
+ARMOR = "".join(chr(48 + code + (8 if code > 39 else 0)) for code in range(64))
+
+# Base64 does the six-bit split for us: translate its alphabet into the armoring one
+_BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+try:
+	_B64_TO_ARMOR = bytes.maketrans(_BASE64.encode("ascii"), ARMOR.encode("ascii"))
+except AttributeError:	# python 2
+	import string
+	_B64_TO_ARMOR = string.maketrans(_BASE64, ARMOR)
+
+# Checksum digits of Armorer.sentences_batch()
+if numpy is not None:
+	_HEX_BYTES = numpy.frombuffer(b"0123456789ABCDEF", dtype=numpy.uint8)
+
+
+def bits_to_packed(bits):
+	"""Return (bytes, length) for an ASCII '0'/'1' payload."""
+	length = len(bits)
+	nbytes = (length + 7) >> 3
+	if not nbytes:
+		return (b'', 0)
+	value = int(bits, 2) << ((nbytes << 3) - length)
+	return (binascii.unhexlify('%0*x' % (nbytes << 1, value)), length)
+
+def armor(data, length):
+	"""Armor a packed payload: return (ASCII payload, fill bits).
+
+	data holds the payload bits MSB first, left-aligned and zero padded (see AIVDM_Encoder.pack_bits).
+	"""
+	fill = -length % 6
+	nchars = (length + fill) // 6
+	data = data[:(nchars*6 + 7) >> 3]
+	encoded = binascii.b2a_base64(data).translate(_B64_TO_ARMOR)[:nchars]
+	if not isinstance(encoded, str):
+		encoded = encoded.decode("ascii")
+	return (encoded, fill)
+
+def armor_batch(matrix, length):
+	"""Vectorized armor(): return ((N, chars) uint8 matrix of armored characters, fill bits).
+
+	matrix is a (N, bytes) uint8 matrix of packed payloads, all length bits long (see AIVDM_Encoder.pack_batch).
+	"""
+	if numpy is None:
+		raise ImportError("NumPy is required by armor_batch()")
+	fill = -length % 6
+	nchars = (length + fill) // 6
+	nbytes = (nchars*6 + 7) >> 3
+	# rows padded to a multiple of 3 bytes are base64 encoded, then armored, in one go
+	width = -(-nbytes // 3)*3
+	rows = numpy.zeros((len(matrix), width), dtype=numpy.uint8)
+	rows[:, :nbytes] = numpy.asarray(matrix, dtype=numpy.uint8)[:, :nbytes]
+	encoded = binascii.b2a_base64(rows.tobytes()).translate(_B64_TO_ARMOR)
+	chars = numpy.frombuffer(encoded, dtype=numpy.uint8)[:-1].reshape(len(matrix), width // 3 * 4)
+	return (numpy.ascontiguousarray(chars[:, :nchars]), fill)
+
+def checksum(body):
+	"""XOR of the characters between '!' and '*'."""
+	c = 0
+	for b in bytearray(body.encode("ascii") if not isinstance(body, bytes) else body):
+		c ^= b
+	return c
+
+def tag_block(source=None, timestamp=None):
+	"""NMEA 4.10 tag block: source station (s:) and Unix time in seconds (c:), each one optional.
+
+	A fractional time is rounded down, as in tag_blocks_batch(); a negative one is a ValueError.
+	"""
+	params = []
+	if source:
+		params.append("s:%s" % source)
+	if timestamp is not None:
+		seconds = int(math.floor(timestamp))
+		if seconds < 0:
+			raise ValueError("tag_block(): negative time")
+		params.append("c:%d" % seconds)
+	body = ",".join(params)
+	return "\\%s*%02X\\" % (body, checksum(body))
+
+def tag_blocks_batch(source, times, rows):
+	"""Vectorized tag_block(): return (tags, keep), tags being the (rows, width) uint8 matrix of the
+	tag blocks of times (one per row, or None for no c: parameter) and keep the mask of their characters.
+
+	Times are zero padded to the same number of digits in tags; keep is False on that padding, so that
+	tags[keep] are the tag blocks one after the other, each as tag_block() makes it.
+	"""
+	if numpy is None:
+		raise ImportError("NumPy is required by tag_blocks_batch()")
+	if times is None:
+		tags = numpy.tile(numpy.frombuffer(tag_block(source).encode("ascii"), dtype=numpy.uint8), (rows, 1))
+		return (tags, numpy.ones(tags.shape, dtype=bool))
+	seconds = numpy.floor(numpy.asarray(times, dtype=float)).astype(numpy.int64)
+	if seconds.size and seconds.min() < 0:
+		raise ValueError("tag_blocks_batch(): negative time")
+	width = len(str(int(seconds.max()))) if seconds.size else 1
+	powers = 10**numpy.arange(width - 1, -1, -1, dtype=numpy.int64)
+	digits = (seconds[:, None] // powers % 10 + ord("0")).astype(numpy.uint8)
+	# the leading zeros are left out, but the last digit of 0
+	padding = (seconds[:, None] < powers) & (powers > 1)
+	head = ("s:%s,c:" % source if source else "c:").encode("ascii")
+	c = numpy.bitwise_xor.reduce(digits, axis=1) ^ numpy.uint8(checksum(head))
+	c ^= numpy.uint8(ord("0")) * (padding.sum(axis=1) & 1).astype(numpy.uint8)
+	tags = numpy.hstack((
+		numpy.full((rows, 1), ord("\\"), dtype=numpy.uint8),
+		numpy.tile(numpy.frombuffer(head, dtype=numpy.uint8), (rows, 1)),
+		digits,
+		numpy.full((rows, 1), ord("*"), dtype=numpy.uint8),
+		_HEX_BYTES[c >> 4][:, None],
+		_HEX_BYTES[c & 15][:, None],
+		numpy.full((rows, 1), ord("\\"), dtype=numpy.uint8)))
+	keep = numpy.ones(tags.shape, dtype=bool)
+	keep[:, 1 + len(head):1 + len(head) + width] = ~padding
+	return (tags, keep)
+
+
+class Armorer(object):
+	"""Turn packed payloads into !AIVDM sentences for one channel.
+
+	Multi-fragment messages get a sequential message ID rotating over 0..9. With a source, or
+	when a timestamp is given, every sentence is prefixed with a tag block (see tag_block).
+	"""
+
+	def __init__(self, channel="A", talker="AIVDM", max_chars=MAX_FRAGMENT_CHARS, source=None):
+		self.channel = channel
+		self.talker = talker
+		self.max_chars = max_chars
+		self.source = source
+		self.seq = 0
+
+	def sentences(self, data, length, timestamp=None):
+		"""Return the list of sentences (without line terminator) carrying a packed payload.
+
+		timestamp is the Unix time of the message for the tag block, None for none.
+		"""
+		(payload, fill) = armor(data, length)
+		tag = tag_block(self.source, timestamp) if self.source or timestamp is not None else ""
+		count = max(1, -(-len(payload) // self.max_chars))
+		if count == 1:
+			return [tag + self._sentence("%s,1,1,,%s,%s,%d" % (self.talker, self.channel, payload, fill))]
+
+		seq = self.seq
+		self.seq = (seq + 1) % 10
+		out = []
+		for n in range(count):
+			chunk = payload[n*self.max_chars:(n+1)*self.max_chars]
+			out.append(tag + self._sentence("%s,%d,%d,%d,%s,%s,%d" % (self.talker, count, n+1, seq, self.channel, chunk, fill if n == count-1 else 0)))
+		return out
+
+	def sentences_from_bits(self, bits):
+		"""Same as sentences(), for an ASCII '0'/'1' payload."""
+		return self.sentences(*bits_to_packed(bits))
+
+	def sentences_batch(self, matrix, length, times=None):
+		"""Vectorized sentences() for payloads that fit in one sentence, times being the array of their timestamps.
+
+		Returns the uint8 array of the sentences one after the other, each ended by '\\n':
+		its tobytes() is ready to be written out.
+		"""
+		(chars, fill) = armor_batch(matrix, length)
+		if chars.shape[1] > self.max_chars:
+			raise ValueError("sentences_batch(): %d bit payloads need more than one sentence" % length)
+		head = ("!%s,1,1,,%s," % (self.talker, self.channel)).encode("ascii")
+		tail = (",%d*" % fill).encode("ascii")
+		c = numpy.bitwise_xor.reduce(chars, axis=1) ^ numpy.uint8(checksum(head[1:]) ^ checksum(tail[:-1]))
+		rows = chars.shape[0]
+		lines = numpy.hstack((
+			numpy.tile(numpy.frombuffer(head, dtype=numpy.uint8), (rows, 1)),
+			chars,
+			numpy.tile(numpy.frombuffer(tail, dtype=numpy.uint8), (rows, 1)),
+			_HEX_BYTES[c >> 4][:, None],
+			_HEX_BYTES[c & 15][:, None],
+			numpy.full((rows, 1), ord("\n"), dtype=numpy.uint8)))
+		if not self.source and times is None:
+			return lines.ravel()
+		(tags, keep) = tag_blocks_batch(self.source, times, rows)
+		lines = numpy.hstack((tags, lines))
+		return lines[numpy.hstack((keep, numpy.ones((rows, lines.shape[1] - tags.shape[1]), dtype=bool)))]
+
+	def _sentence(self, body):
+		return "!%s*%02X" % (body, checksum(body))
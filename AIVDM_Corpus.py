@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Corpus.py generates large corpora of random AIVDM messages for receiver testing, on all cores.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# The corpus is split into shards, each generated by one worker of a process pool and written to
+# its own files (<prefix>-NNNNN.nmea and/or <prefix>-NNNNN.bin), so nothing is funnelled through a
+# single process. A shard only depends on --seed, its number and its size, and the shards only on
+# --messages (or --shards): the same command gives the same corpus (with the same Python version)
+# whatever the number of processes.
+# .bin files hold packed records, see AIVDM_Encoder.packed_record().
+#
+# Usage examples:
+# $ ./AIVDM_Corpus.py --messages=10000000 --outdir=corpus
+# $ ./AIVDM_Corpus.py --messages=1000000 --mix=1:80,18:20 --format=nmea,bin --seed=7
+#
+
+import bisect
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import AIVDM_Armor
+import AIVDM_Encoder
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALPHABET = LETTERS + "0123456789 -"
+
+DEFAULT_MIX = "1:50,18:20,24:10,4:5,21:5,14:2,20:2,22:3,23:3"
+
+# Messages per shard when --shards is not given
+SHARD_MESSAGES = 100000
+
+
+def _name(rng, shortest, longest):
+	return rng.choice(LETTERS) + "".join(rng.choice(ALPHABET) for i in range(rng.randint(shortest, longest) - 1))
+
+def _area(rng):
+	(lon, lat) = (rng.uniform(-179, 178), rng.uniform(-89, 88))
+	return (lon + rng.uniform(0.1, 1), lat + rng.uniform(0.1, 1), lon, lat)
+
+def _vsize(rng):
+	return "%dx%d" % (2*rng.randint(5, 200), 2*rng.randint(2, 30))
+
+# Message type -> function(rng, mmsi) returning a random packed payload
+GENERATORS = {
+	"1":  lambda rng, mmsi: AIVDM_Encoder.encode_1(mmsi, rng.randint(0, 15), rng.randint(0, 1022)/10.0, rng.uniform(-180, 180),
+			rng.uniform(-90, 90), rng.randint(0, 3599)/10.0, rng.randint(0, 59), packed=True),
+	"4":  lambda rng, mmsi: AIVDM_Encoder.encode_4(mmsi, 0, rng.uniform(-180, 180), rng.uniform(-90, 90), 0, 0, packed=True),
+	"14": lambda rng, mmsi: AIVDM_Encoder.encode_14(970000000 + mmsi % 1000000, rng.choice(["SART ACTIVE", "SART TEST", "MOB ACTIVE"]), packed=True),
+	"18": lambda rng, mmsi: AIVDM_Encoder.encode_18(mmsi, rng.randint(0, 1022)/10.0, rng.uniform(-180, 180), rng.uniform(-90, 90),
+			rng.randint(0, 3599)/10.0, rng.randint(0, 59), packed=True),
+	"20": lambda rng, mmsi: AIVDM_Encoder.encode_20(mmsi, rng.randint(0, 4095), rng.randint(1, 5), rng.randint(0, 7), rng.randint(0, 1125), packed=True),
+	"21": lambda rng, mmsi: AIVDM_Encoder.encode_21(993000000 + mmsi % 1000000, rng.randint(0, 31), _name(rng, 3, 34),
+			rng.uniform(-180, 180), rng.uniform(-90, 90), _vsize(rng), int(rng.random() < 0.3), packed=True),
+	"22": lambda rng, mmsi: AIVDM_Encoder.encode_22(mmsi, 2087, 2088, *_area(rng), packed=True),
+	"23": lambda rng, mmsi: AIVDM_Encoder.encode_23(mmsi, *(_area(rng) + (rng.randint(0, 11), rng.randint(0, 15))), packed=True),
+	"24": lambda rng, mmsi: AIVDM_Encoder.encode_24(mmsi, "A", __vname=_name(rng, 3, 20), packed=True) if rng.random() < 0.5 else
+			AIVDM_Encoder.encode_24(mmsi, "B", __callsign=_name(rng, 4, 7), __vsize=_vsize(rng), __vtype=rng.randint(20, 99), packed=True),
+}
+
+
+def parse_mix(mix):
+	"""Parse "type:weight,..." into (types, cumulative weights)."""
+	(types, cumulative, total) = ([], [], 0.0)
+	for item in mix.split(","):
+		(msg_type, sep, weight) = item.strip().partition(":")
+		if msg_type not in GENERATORS:
+			raise ValueError("message type not supported: %s" % msg_type)
+		weight = float(weight) if sep else 1.0
+		if weight < 0:
+			raise ValueError("negative weight for type %s" % msg_type)
+		total += weight
+		types.append(msg_type)
+		cumulative.append(total)
+	if not total:
+		raise ValueError("empty message mix")
+	return (types, cumulative)
+
+def default_shards(messages):
+	"""Number of shards of a corpus: one per SHARD_MESSAGES messages, whatever the number of processes."""
+	return max(1, -(-messages // SHARD_MESSAGES))
+
+def shard_sizes(messages, shards):
+	"""Split messages over shards, the first ones taking the remainder."""
+	return [messages // shards + (1 if n < messages % shards else 0) for n in range(shards)]
+
+def generate_shard(job):
+	"""Generate and write one shard; job is (shard, messages, settings). Returns its statistics."""
+	(shard, messages, settings) = job
+	start = time.time()
+	rng = random.Random(settings["seed"]*1000003 + shard)
+	(types, cumulative) = parse_mix(settings["mix"])
+	generators = [GENERATORS[t] for t in types]
+	total = cumulative[-1]
+	armorer = AIVDM_Armor.Armorer(settings["channel"])
+	stations = [rng.randint(200000000, 779999999) for i in range(settings["stations"])]
+
+	base = os.path.join(settings["outdir"], "%s-%05d" % (settings["prefix"], shard))
+	nmea = open(base + ".nmea", "w") if "nmea" in settings["formats"] else None
+	binary = open(base + ".bin", "wb") if "bin" in settings["formats"] else None
+	(lines, records, sentences, nbytes) = ([], [], 0, 0)
+	try:
+		for n in range(messages):
+			generate = generators[bisect.bisect_right(cumulative, rng.random()*total)]
+			(data, length) = generate(rng, rng.choice(stations))
+			if nmea:
+				lines.extend(armorer.sentences(data, length))
+			if binary:
+				records.append(AIVDM_Encoder.packed_record(data, length))
+			if len(lines) + len(records) >= 10000 or n == messages - 1:
+				if lines:
+					text = "\n".join(lines) + "\n"
+					nmea.write(text)
+					(sentences, nbytes) = (sentences + len(lines), nbytes + len(text))
+				if records:
+					data = b"".join(records)
+					binary.write(data)
+					nbytes += len(data)
+				(lines, records) = ([], [])
+	finally:
+		for f in (nmea, binary):
+			if f:
+				f.close()
+	return {"shard": shard, "messages": messages, "sentences": sentences, "bytes": nbytes, "seconds": time.time() - start}
+
+def generate(settings, messages, shards, processes):
+	"""Generate a corpus of messages in shards with a pool of processes; yield the statistics of every shard as it is done."""
+	jobs = [(shard, size, settings) for (shard, size) in enumerate(shard_sizes(messages, shards))]
+	if processes == 1:
+		for job in jobs:
+			yield generate_shard(job)
+		return
+	pool = multiprocessing.Pool(processes)
+	try:
+		for r in pool.imap_unordered(generate_shard, jobs):
+			yield r
+	finally:
+		pool.close()
+		pool.join()
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Generate a corpus of random AIVDM messages, sharded over a process pool."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--messages", help="Messages in the whole corpus, default = 1000000", type="int", default=1000000)
+	parser.add_option("--shards", help="Number of shards (output files per format), default = one per %d messages" % SHARD_MESSAGES, type="int")
+	parser.add_option("--processes", help="Worker processes, default = number of CPUs", type="int", default=multiprocessing.cpu_count())
+	parser.add_option("--seed", help="Seed of the corpus, default = 0", type="int", default=0)
+	parser.add_option("--mix", help="Message types and relative weights, default = " + DEFAULT_MIX, default=DEFAULT_MIX)
+	parser.add_option("--stations", help="Distinct MMSIs per shard, default = 1000", type="int", default=1000)
+	parser.add_option("--format", help="Comma separated output formats: nmea (!AIVDM sentences), bin (packed records), default = nmea", default="nmea")
+	parser.add_option("--channel", help="NMEA output: AIS channel (A/B), default = A", default="A")
+	parser.add_option("--outdir", help="Output directory, default = .", default=".")
+	parser.add_option("--prefix", help="Output file name prefix, default = corpus", default="corpus")
+
+	(options, args) = parser.parse_args()
+
+	formats = options.format.split(",")
+	if not formats or [f for f in formats if f not in ("nmea", "bin")]:
+		parser.error("Formats are nmea and/or bin: -h for help")
+	if options.channel not in ("A", "B"):
+		parser.error("Channel accepts value A or B: -h for help")
+	try:
+		parse_mix(options.mix)
+	except ValueError as e:
+		parser.error(str(e))
+	processes = max(1, options.processes)
+	shards = options.shards or default_shards(options.messages)
+	if shards < 1 or options.messages < 0 or options.stations < 1:
+		parser.error("--shards, --messages and --stations must be positive")
+	if not os.path.isdir(options.outdir):
+		os.makedirs(options.outdir)
+
+	settings = {"seed": options.seed, "mix": options.mix, "stations": options.stations, "formats": formats,
+		"channel": options.channel, "outdir": options.outdir, "prefix": options.prefix}
+
+	start = time.time()
+	(messages, nbytes) = (0, 0)
+	for r in generate(settings, options.messages, shards, processes):
+		messages += r["messages"]
+		nbytes += r["bytes"]
+		sys.stderr.write("shard %05d: %d messages, %d sentences, %d bytes in %.1f s (%.0f msg/s)\n" % (r["shard"], r["messages"],
+			r["sentences"], r["bytes"], r["seconds"], r["messages"] / r["seconds"] if r["seconds"] else 0))
+	elapsed = time.time() - start
+	sys.stderr.write("%d messages, %d bytes in %d shards, %.1f s with %d processes (%.0f msg/s)\n" % (messages, nbytes, shards,
+		elapsed, processes, messages / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+	main()
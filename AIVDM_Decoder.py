@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Decoder.py decodes the payloads generated by AIVDM_Encoder.py, to verify a corpus by round trip.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# Payloads are read one per line from stdin, either as '0'/'1' strings or as !AIVDM sentences,
+# and printed as JSON. With --check, every payload is compared with the message description
+# (the --stream input of AIVDM_Encoder.py) it was generated from, and mismatches are reported.
+#
+# Usage examples:
+# $ ./AIVDM_Encoder.py --type=1 --nmea | ./AIVDM_Decoder.py
+# $ ./AIVDM_Encoder.py --stream < messages.jsonl | ./AIVDM_Decoder.py --check=messages.jsonl
+#
+
+import sys
+import binascii
+import json
+
+import AIVDM_Schema
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Six-bit ASCII alphabet (see AIVDM_Encoder.vocabolary)
+vocabolary = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^- !\"#$%&'()*+,-./0123456789:;<=>?"
+
+# Field layouts (name, width, kind, scale) by message type, from the schemas AIVDM_Encoder.py packs with.
+# kind: 'u' unsigned, 'i' two's complement, 't' six-bit text. A None width takes the rest of the payload.
+def _layout(schema):
+	return [(f.name, f.width, 't' if f.kind in "tr" else f.kind, float(f.scale) if f.scale else None)
+		for f in schema if f.kind != 'p']
+
+LAYOUTS = dict((int(key), _layout(schema)) for (key, schema) in AIVDM_Schema.SCHEMAS.items() if key.isdigit())
+# type 24 is split on its part number, see decode()
+LAYOUTS[(24, 0)] = _layout(AIVDM_Schema.SCHEMAS["24A"])
+LAYOUTS[(24, 1)] = _layout(AIVDM_Schema.SCHEMAS["24B"])
+
+def _plan(layout):
+	"""Precompute (name, offset, width, mask, kind, scale) for every field."""
+	plan = []
+	offset = 0
+	for (name, width, kind, scale) in layout:
+		mask = (1 << width) - 1 if width else None
+		plan.append((name, offset, width, mask, kind, scale))
+		offset += width or 0
+	return plan
+
+PLANS = dict((key, _plan(layout)) for (key, layout) in LAYOUTS.items())
+
+
+def decode_text(value, nchars):
+	return "".join(vocabolary[(value >> (6*(nchars - 1 - i))) & 0x3f] for i in range(nchars))
+
+def decoder_source(plan, length):
+	"""Python source of a function decoding payloads of length bits laid out as plan, or None if they are too short."""
+	items = []
+	for (name, offset, width, mask, kind, scale) in plan:
+		if width is None:
+			width = 6*((length - offset) // 6)
+			mask = (1 << width) - 1
+		shift = length - offset - width
+		if shift < 0:
+			return None
+		x = "value >> %d & %#x" % (shift, mask) if shift else "value & %#x" % mask
+		if kind == 't':
+			x = "decode_text(%s, %d)" % (x, width // 6)
+		elif kind == 'i':
+			sign = 1 << (width - 1)
+			x = "((%s ^ %#x) - %#x)" % (x, sign, sign)
+		if scale:
+			x = "(%s) / %r" % (x, scale)
+		items.append("%r: %s" % (name, x))
+	return "def decode_payload(value):\n\treturn {%s}\n" % ", ".join(items)
+
+def _compile_decoder(plan, length):
+	source = decoder_source(plan, length)
+	if source is None:
+		return None
+	namespace = {"decode_text": decode_text}
+	exec(compile(source, "<AIVDM_Decoder %d bits>" % length, "exec"), namespace)
+	return namespace["decode_payload"]
+
+# (plan key, payload length) -> compiled decoder; payloads of a type come in very few lengths
+_DECODERS = {}
+
+def decode(value, length):
+	"""Decode a payload given as an integer of length bits; return a dict of fields.
+
+	Scaled fields (speed, course, positions) are returned in their units, texts as
+	decoded (including '@' padding).
+	"""
+	if length < 6:
+		raise ValueError("payload too short")
+	msg_type = value >> (length - 6)
+	key = msg_type
+	if msg_type == 24:
+		if length < 40:
+			raise ValueError("payload too short")
+		key = (24, (value >> (length - 40)) & 0x3)
+	try:
+		decoder = _DECODERS[(key, length)]
+	except KeyError:
+		plan = PLANS.get(key)
+		if plan is None:
+			raise ValueError("message type not supported: %d" % msg_type)
+		decoder = _DECODERS[(key, length)] = _compile_decoder(plan, length)
+	if decoder is None:
+		raise ValueError("payload too short for type %d (%d bits)" % (msg_type, length))
+	return decoder(value)
+
+def decode_packed(data, length):
+	"""decode() for (bytes, length) as returned by the encoders with packed=True."""
+	return decode(int(binascii.hexlify(data), 16) >> ((len(data) << 3) - length), length)
+
+def decode_bits(bits):
+	"""decode() for an ASCII '0'/'1' payload."""
+	return decode(int(bits, 2), len(bits))
+
+def dearmor(payload, fill=0):
+	"""Return (value, length) of an armored NMEA payload."""
+	value = 0
+	for c in bytearray(payload.encode("ascii") if not isinstance(payload, bytes) else payload):
+		c -= 48
+		if c > 40:
+			c -= 8
+		value = (value << 6) | c
+	return (value >> fill, 6*len(payload) - fill)
+
+
+def decode_batch(matrix, msg_type):
+	"""Decode a homogeneous batch: an (N, bytes) uint8 matrix of packed payloads of one type.
+
+	Returns a dict of NumPy arrays, one per fixed-width numeric field (text fields are skipped).
+	For type 24 pass (24, 0) or (24, 1) to select the part.
+	"""
+	if numpy is None:
+		raise ImportError("NumPy is required by decode_batch()")
+	if not isinstance(msg_type, tuple):
+		msg_type = int(msg_type)
+	if msg_type not in PLANS:
+		raise ValueError("message type not supported: %s" % (msg_type,))
+	matrix = numpy.asarray(matrix, dtype=numpy.uint8)
+	(rows, nbytes) = matrix.shape
+	nwords = (nbytes + 7) >> 3
+	padded = numpy.zeros((rows, nwords << 3), dtype=numpy.uint8)
+	padded[:, :nbytes] = matrix
+	words = padded.view('>u8').astype(numpy.uint64)
+
+	fields = {}
+	for (name, offset, width, mask, kind, scale) in PLANS[msg_type]:
+		if width is None or kind == 't' or offset + width > (nbytes << 3):
+			continue
+		end = offset + width
+		k = offset >> 6
+		if (end - 1) >> 6 == k:
+			x = words[:, k] >> numpy.uint64(((k + 1) << 6) - end)
+		else:	# the field straddles two words
+			low = end - ((k + 1) << 6)
+			x = (words[:, k] << numpy.uint64(low)) | (words[:, k+1] >> numpy.uint64(64 - low))
+		x = (x & numpy.uint64(mask)).astype(numpy.int64)
+		if kind == 'i':
+			x = numpy.where(x >> (width - 1), x - (1 << width), x)
+		if scale:
+			x = x / scale
+		fields[name] = x
+	return fields
+
+
+# Encoder options -> decoded fields, per message type: (option, field, kind)
+# kind: 'i' integer, 'f' scaled value (compared within half a unit), 't' text
+_CHECKS = {
+	"1":  [("mmsi", "mmsi", 'i'), ("status", "status", 'i'), ("speed", "speed", 'f'), ("long", "lon", 'f'), ("lat", "lat", 'f'),
+		("course", "course", 'f'), ("ts", "second", 'i')],
+	"4":  [("mmsi", "mmsi", 'i'), ("long", "lon", 'f'), ("lat", "lat", 'f')],
+	"14": [("mmsi", "mmsi", 'i'), ("sart_msg", "text", 't')],
+	"18": [("mmsi", "mmsi", 'i'), ("speed", "speed", 'f'), ("long", "lon", 'f'), ("lat", "lat", 'f'), ("course", "course", 'f'),
+		("ts", "second", 'i')],
+	"20": [("mmsi", "mmsi", 'i'), ("fatdmaoffset", "offset1", 'i'), ("fatdmaslots", "number1", 'i'), ("fatdmatimeout", "timeout1", 'i'),
+		("fatdmaincrement", "increment1", 'i')],
+	"21": [("mmsi", "mmsi", 'i'), ("aid_type", "aid_type", 'i'), ("aid_name", "name", 't'), ("long", "lon", 'f'), ("lat", "lat", 'f')],
+	"22": [("mmsi", "mmsi", 'i'), ("channel_a", "channel_a", 'i'), ("channel_b", "channel_b", 'i'), ("ne_lon", "ne_lon", 'f'),
+		("ne_lat", "ne_lat", 'f'), ("sw_lon", "sw_lon", 'f'), ("sw_lat", "sw_lat", 'f')],
+	"23": [("mmsi", "mmsi", 'i'), ("ne_lon", "ne_lon", 'f'), ("ne_lat", "ne_lat", 'f'), ("sw_lon", "sw_lon", 'f'), ("sw_lat", "sw_lat", 'f'),
+		("interval", "interval", 'i'), ("quiet", "quiet", 'i')],
+	"24A": [("mmsi", "mmsi", 'i'), ("vname", "shipname", 't')],
+	"24B": [("mmsi", "mmsi", 'i'), ("vtype", "shiptype", 'i'), ("callsign", "callsign", 't')],
+}
+
+_RESOLUTION = dict((f.name, float(f.scale)) for schema in AIVDM_Schema.SCHEMAS.values() for f in schema if f.scale)
+
+def _six_bit(string):
+	"""A string as the six-bit alphabet can carry it (upper case, '?' for anything else)."""
+	return "".join(c if c in vocabolary else "?" for c in string.upper())
+
+def check(options, fields):
+	"""Compare decoded fields with the encoder options they come from.
+
+	Returns a list of (field, expected, decoded) mismatches, empty when the round trip is exact.
+	"""
+	msg_type = str(options.type)
+	key = AIVDM_Schema.key_of(msg_type, options.part)
+	if key not in _CHECKS:
+		return [("type", msg_type, fields.get("type"))]
+
+	mismatches = []
+	if fields.get("type") != int(msg_type):
+		mismatches.append(("type", int(msg_type), fields.get("type")))
+	for (option, name, kind) in _CHECKS[key]:
+		expected = getattr(options, option)
+		got = fields.get(name)
+		if kind == 'i':
+			ok = got == int(expected)
+		elif kind == 'f':
+			ok = got is not None and abs(got - float(expected)) <= 0.5/_RESOLUTION[name] + 1e-9
+		else:
+			expected = _six_bit(expected).strip("@")
+			got = (got + fields.get("name_ext", "")).strip("@") if got is not None else None
+			ok = got == expected
+		if not ok:
+			mismatches.append((name, expected, got))
+
+	if key in ("21", "24B") and not (key == "21" and options.v_AtoN):
+		x = options.vsize.find("x")
+		(hl, hw) = (int(options.vsize[:x])//2, int(options.vsize[x+1:])//2)
+		for (name, expected) in (("to_bow", hl), ("to_stern", hl), ("to_port", hw), ("to_starboard", hw)):
+			if fields.get(name) != expected:
+				mismatches.append((name, expected, fields.get(name)))
+	return mismatches
+
+
+def _encodable(options):
+	import AIVDM_Encoder
+	try:
+		AIVDM_Encoder.encode_message(options)
+	except (ValueError, TypeError, AttributeError, OverflowError):		# as AIVDM_Encoder.stream_encode
+		return False
+	return True
+
+def read_payloads(stream):
+	"""Yield (value, length) for every payload line: '0'/'1' strings or !AIVDM sentences (fragments are joined).
+
+	NMEA 4.10 tag blocks in front of the sentences are skipped.
+	"""
+	fragments = []
+	for line in stream:
+		line = line.strip()
+		if line.startswith("\\"):
+			line = line[line.find("\\", 1) + 1:]
+		if not line:
+			continue
+		if not line.startswith("!"):
+			yield (int(line, 2), len(line))
+			continue
+		parts = line.split("*")[0].split(",")
+		(count, number) = (int(parts[1]), int(parts[2]))
+		if number == 1:
+			fragments = []
+		fragments.append(parts[5])
+		if number == count:
+			yield dearmor("".join(fragments), int(parts[6]))
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Decode AIVDM payloads ('0'/'1' strings or !AIVDM sentences, one per line on stdin) and print them as JSON."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--check", help="""Message descriptions (JSON Lines or CSV, as read by AIVDM_Encoder.py --stream) the payloads were
+	                                     generated from: report every field that does not match instead of printing""")
+
+	(options, args) = parser.parse_args()
+
+	if not options.check:
+		for (value, length) in read_payloads(sys.stdin):
+			try:
+				print(json.dumps(decode(value, length), sort_keys=True))
+			except ValueError as e:
+				sys.stderr.write("%s\n" % e)
+		return
+
+	import AIVDM_Encoder
+	defaults = vars(AIVDM_Encoder.option_parser().get_default_values())
+	with open(options.check) as f:
+		records = AIVDM_Encoder.read_records(f, defaults)
+		(checked, bad) = (0, 0)
+		payloads = read_payloads(sys.stdin)		# read in step with the records, not loaded first
+		for (n, record) in records:
+			# records the encoder rejected produced no payload; one that did not even parse is not re-encoded
+			if isinstance(record, ValueError) or not _encodable(record):
+				continue
+			payload = next(payloads, None)
+			if payload is None:
+				break
+			(value, length) = payload
+			checked += 1
+			try:
+				mismatches = check(record, decode(value, length))
+			except ValueError as e:
+				mismatches = [("payload", "", str(e))]
+			if mismatches:
+				bad += 1
+				for (name, expected, got) in mismatches:
+					print("record %d: %s expected %r, decoded %r" % (n, name, expected, got))
+	print("%d payloads checked, %d mismatching" % (checked, bad))
+	if bad:
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -13,238 +13,790 @@
 # Usage examples:
 # $ ./AIVDM_Encoder.py --type=1 --vsize=30x10 | xargs -IA ./unpacker A 1 A
 # $ ./AIVDM_Encoder.py --type=1 --vsize=30x10 | xargs -IX ./AiS_TX.py --payload=X --channel=A
+# $ ./AIVDM_Encoder.py --stream --mmsi=247320162 < messages.jsonl > payloads.txt
+# $ ./AIVDM_Encoder.py --type=21 --aid_name="A VERY LONG AID TO NAVIGATION NAME" --nmea --channel=B
+# $ ./AIVDM_Encoder.py --type=1 --packed | ./AiS_TX.py --packed_file=- --channel=A
+# $ ./AIVDM_Encoder.py --stream --nmea --source=LAB1 < scheduled.jsonl > replay.nmea	# records with a "time" key
 #
 
 import sys
+import binascii
+import csv
+import itertools
+import json
+import struct
+from collections import OrderedDict
+from optparse import Values
+
+import AIVDM_Armor
+import AIVDM_Frame
+import AIVDM_Schema
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Six-bit ASCII alphabet, adapted from gpsd-3.9's driver_ais.c
+vocabolary = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^- !\"#$%&'()*+,-./0123456789:;<=>?"
+
+# Six-bit code of every byte value: lower case letters fold to upper case, anything
+# outside the alphabet becomes '?' (63). The first occurrence wins for '-'.
+SIXBIT = [63]*256
+for (_code, _c) in reversed(list(enumerate(vocabolary))):
+	SIXBIT[ord(_c)] = SIXBIT[ord(_c.lower())] = _code
+SIXBIT = tuple(SIXBIT)
+del _code, _c
+
+
+class LRUCache(object):
+	"""Bounded mapping evicting the least recently used entry, with hit/miss counters."""
+
+	def __init__(self, maxsize=4096):
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key):
+		"""Return the cached value, or None on a miss."""
+		try:
+			value = self.entries.pop(key)
+		except KeyError:
+			self.misses += 1
+			return None
+		self.entries[key] = value
+		self.hits += 1
+		return value
+
+	def put(self, key, value):
+		self.entries[key] = value
+		if len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+
+	def clear(self):
+		self.entries.clear()
+		self.hits = self.misses = 0
+
+	def info(self):
+		return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+	def __len__(self):
+		return len(self.entries)
+
+
+# Names and callsigns are re-encoded on every static report: keep them around
+text_cache = LRUCache()
+
+def encode_text(string):
+	"""Return (value, length) of string in six-bit ASCII, memoized in text_cache."""
+	encoded = text_cache.get(string)
+	if encoded is None:
+		data = string
+		if not isinstance(data, bytes):
+			data = data.encode('latin-1', 'replace')
+		v = 0
+		for b in bytearray(data):
+			v = (v << 6) | SIXBIT[b]
+		encoded = (v, 6*len(data))
+		text_cache.put(string, encoded)
+	return encoded
+
+
+class StaticCache(LRUCache):
+	"""LRU cache of encoded static data payloads (messages 21, 24A and 24B), one entry per message and station.
+
+	Every entry remembers the static fields it was encoded from: a lookup with other values is a miss
+	and the new payload replaces the old one. invalidate() drops the entries of a station explicitly.
+
+	The cache is off unless enabled is set. A hit skips the packing altogether, but a miss costs the
+	lookup and the store on top of it, so it is slower than no cache: turn it on when the same stations
+	send the same static reports cycle after cycle (--static_cache), not for one-off or random ones.
+	"""
+
+	KEYS = ("21", "24A", "24B")
+
+	def __init__(self, maxsize=65536, enabled=False):
+		LRUCache.__init__(self, maxsize)
+		self.enabled = enabled
+		self.invalidations = 0
+
+	def lookup(self, key, mmsi, fields, packed):
+		"""Return the payload of message key for mmsi if it was cached from fields, None otherwise."""
+		entry = self.get((key, mmsi, packed))
+		if entry is None:
+			return None
+		if entry[0] != fields:		# a static field changed
+			(self.hits, self.misses, self.invalidations) = (self.hits - 1, self.misses + 1, self.invalidations + 1)
+			return None
+		return entry[1]
+
+	def store(self, key, mmsi, fields, packed, payload):
+		self.put((key, mmsi, packed), (fields, payload))
+		return payload
+
+	def invalidate(self, mmsi, key=None):
+		"""Drop the cached payloads of a station, for one message key or all of them; return how many."""
+		dropped = 0
+		for k in ((key,) if key else self.KEYS):
+			for packed in (False, True):
+				if self.entries.pop((k, mmsi, packed), None) is not None:
+					dropped += 1
+		self.invalidations += dropped
+		return dropped
+
+	def clear(self):
+		LRUCache.clear(self)
+		self.invalidations = 0
+
+	def info(self):
+		info = LRUCache.info(self)
+		info["invalidations"] = self.invalidations
+		return info
+
+
+class BitWriter(object):
+	"""Append fixed-width fields (MSB first) into a single integer accumulator.
+
+	Every field is masked to its width, so negative values end up in two's complement.
+	The payload can then be taken out either packed (bytes + bit length) or rendered
+	as the ASCII '0'/'1' string historically printed by this script.
+	"""
+
+	__slots__ = ('value', 'length')
+
+	def __init__(self):
+		self.value = 0
+		self.length = 0
+
+	def put(self, *fields):
+		"""Append (value, width) pairs, signed or unsigned."""
+		v = self.value
+		n = self.length
+		for (x, width) in fields:
+			v = (v << width) | (x & ((1 << width) - 1))
+			n += width
+		self.value = v
+		self.length = n
+
+	def text(self, string):
+		"""Append a string as six-bit ASCII characters."""
+		(v, n) = encode_text(string)
+		self.value = (self.value << n) | v
+		self.length += n
+
+	def pack(self):
+		return pack_bits(self.value, self.length)
+
+	def bits(self):
+		return render_bits(self.value, self.length)
+
+
+def pack_bits(value, length):
+	"""Return (bytes, length): the payload left-aligned and zero padded to a whole octet."""
+	nbytes = (length + 7) >> 3
+	if not nbytes:
+		return (b'', 0)
+	value <<= (nbytes << 3) - length
+	return (binascii.unhexlify('%0*x' % (nbytes << 1, value)), length)
+
+def render_bits(value, length):
+	"""Return the ASCII '0'/'1' rendering of a payload."""
+	if not length:
+		return ''
+	return format(value, 'b').zfill(length)
+
+def packed_record(data, length):
+	"""Binary record of a packed payload: its bit count (2 bytes, big endian) followed by the payload bytes."""
+	return struct.pack(">H", length) + data
+
+def read_packed_records(stream):
+	"""Yield (bytes, length) for every packed_record() read from a binary stream."""
+	while True:
+		head = stream.read(2)
+		if not head:
+			return
+		if len(head) < 2:
+			raise ValueError("truncated packed record")
+		length = struct.unpack(">H", head)[0]
+		nbytes = (length + 7) >> 3
+		data = stream.read(nbytes)
+		if len(data) < nbytes:
+			raise ValueError("truncated packed record")
+		yield (data, length)
 
-# Adapted from gpsd-3.9's driver_ais.c
 def encode_string(string):
-	vocabolary = "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^- !\"#$%&'()*+,-./0123456789:;<=>?"
-	encoded_string = ""
-	for c in string.upper():
-		index = vocabolary.find(c)
-		encoded_string += '{0:b}'.format(index).rjust(6,'0')
-	return encoded_string
-
-# NB. We add a mask to tell python how long is our rapresentation (overwise on negative integers, it cannot do the complement 2).
+	return render_bits(*encode_text(string))
+
+# NB. Masking to 28/27 bits is left to the packers (PACKERS, BitWriter), which keep the two's complement representation of negative values.
 def compute_long_lat (__long, __lat):
-	_long = '{0:b}'.format(int(round(__long*600000)) & 0b1111111111111111111111111111).rjust(28,'0')
-	_lat =  '{0:b}'.format(int(round(__lat*600000))  & 0b111111111111111111111111111).rjust(27,'0')
-	return (_long, _lat)
+	return (int(round(__long*600000)), int(round(__lat*600000)))
 
 def compute_long_lat22 (__long, __lat):
-	_long = '{0:b}'.format(int(round(__long*600)) & 0b111111111111111111).rjust(18,'0')
-	_lat =  '{0:b}'.format(int(round(__lat*600))  & 0b11111111111111111).rjust(17,'0')
-	return (_long, _lat)
-
-def encode_1(__mmsi, __status,__speed, __long, __lat, __course, __ts):
-	_type = '{0:b}'.format(1).rjust(6,'0')				# 18
-	_repeat = "00"										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-	_status = '{0:b}'.format(__status).rjust(4,'0')			#  navigation status e.g. 0=Under way using engine, 1-At anchor, 5=Moored, 8=Sailing,15=undefined
-	_rot = '{0:b}'.format(128).rjust(8,'0')				# rate of turn not defined
-
-	_speed = '{0:b}'.format(int(round(__speed*10))).rjust(10,'0')	# Speed over ground is in 0.1-knot resolution from 0 to 102 knots. value 1023 indicates speed is not available, value 1022 indicates 102.2 knots or higher.
-	_accurancy = '0'									# > 10m
-
-	(_long, _lat) = compute_long_lat(__long, __lat)
-
-	_course = '{0:b}'.format(int(round(__course*10))).rjust(12,'0')	# 0.1 resolution. Course over ground will be 3600 (0xE10) if that data is not available.
-	_true_heading = '1'*9	# 511 (N/A)
-	_ts = '{0:b}'.format(__ts).rjust(6,'0') # Second of UTC timestamp.
-
-	_flags = '0'*6
-	# '00': manufactor NaN
-	# '000':  spare
-	# '0': Raim flag
-
-	_rstatus = '0'*19 # ??
-	# '11100000000000000110' : Radio status
-
-	return _type+_repeat+_mmsi+_status+_rot+_speed+_accurancy+_long+_lat+_course+_true_heading+_ts+_flags+_rstatus
-
-
-def encode_4(__mmsi, __speed, __long, __lat, __course, __ts):
-	_type = '{0:b}'.format(4).rjust(6,'0')				# 18
-	_repeat = "00"										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-
-	_hour = '{0:b}'.format(24).rjust(5,'0')
-	_min = _sec = '{0:b}'.format(60).rjust(6,'0')
-
-
-	_accurancy = '1'									# <= 10m
-	(_long, _lat) = compute_long_lat(__long, __lat)
-
-	_device = '0001'	# GPS
-	_flags = '0'*12
-	# '0': transmission control for packet 24
-	# '000000000':  spare
-	# '0': Raim flag
-
-	_rstatus = '0'*19 # ??
-	# '11100000000000000110' : Radio status
-
-	return _type+_repeat+_mmsi+'0'*23+_hour+_min+_sec+_accurancy+_long+_lat+_device+'0'*11+_rstatus
-
-def encode_14(__mmsi, __msg):
-	_type = '{0:b}'.format(14).rjust(6,'0')				# 14
-	_repeat = "00"										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-	_spare = "00"										# spare bit
-	_msg = encode_string(__msg)
-#	_padding = '0'*(168-6-2-30-2-len(_msg))
-	return _type+_repeat+_mmsi+_spare+_msg
-
-
-def encode_18(__mmsi, __speed, __long, __lat, __course, __ts):
-	_type = '{0:b}'.format(18).rjust(6,'0')				# 18
-	_repeat = "00"										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-	_reserved = '0'*8
-	_speed = '{0:b}'.format(int(round(__speed*10))).rjust(10,'0')	# Speed over ground is in 0.1-knot resolution from 0 to 102 knots. value 1023 indicates speed is not available, value 1022 indicates 102.2 knots or higher.
-	_accurancy = '0'									# > 10m
-
-	(_long, _lat) = compute_long_lat(__long, __lat)
-
-	_course = '{0:b}'.format(int(round(__course*10))).rjust(12,'0')	# 0.1 resolution. Course over ground will be 3600 (0xE10) if that data is not available.
-	_true_heading = '1'*9	# 511 (N/A)
-	_ts = '{0:b}'.format(__ts).rjust(6,'0') # Second of UTC timestamp.
-
-	_flags = '001011100'
-	# '00': Regional reserved
-	# '1':  CS mode (carrier sense Class B)
-	# '0' Display flag
-	# '1': DSC
-	# '1': Band Flag
-	# '1': M22 Flag
-	# '0': Assigned 0 -> Autonomous mode
-	# '0': Raim flag
-
-	_rstatus = '11100000000000000110' # ??
-	# '11100000000000000110' : Radio status
-
-	return _type+_repeat+_mmsi+_reserved+_speed+_accurancy+_long+_lat+_course+_true_heading+_ts+_flags+_rstatus
-
-def encode_20(__mmsi, __offset, __slots, __timeout, __increment):
-	_type = '{0:b}'.format(20).rjust(6,'0')				#
-	_repeat = '00'										# repeat (count of how many times this msg has been repeated)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-
-	_offset = '{0:b}'.format(__offset).rjust(12,'0')
-	_slots =  '{0:b}'.format(__slots).rjust(4,'0')
-	_timeout = '{0:b}'.format(__timeout).rjust(3,'0')
-	_increment = '{0:b}'.format(__increment).rjust(11,'0')
-
-	return 	_type+_repeat+_mmsi+'00'+_offset+_slots+_timeout+_increment+'00'
-
-def encode_21(__mmsi, __aid_type, __aid_name, __long, __lat, __vsize, __virtual):
-	_type = '{0:b}'.format(21).rjust(6,'0')
-	_repeat = '00'										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-
-	_aid_type = '{0:b}'.format(__aid_type).rjust(5,'0')
-	if len(__aid_name) <= 20:
-		_name = encode_string(__aid_name).rjust(120,'0')
-		_name_ext = ''
-	else:
-		__aid_name = str.strip(__aid_name,'@')
-		if len(__aid_name) <= 20:
-			_name = encode_string(__aid_name).rjust(120,'0')
-			_name_ext = ''
+	return (int(round(__long*600)), int(round(__lat*600)))
+
+def half_size(__vsize):
+	x = __vsize.find("x")
+	return (int(__vsize[:x])//2, int(__vsize[x+1:])//2)	# AIS antenna in the middle of the boat
+
+def _output(payload, packed):
+	if packed:
+		return pack_bits(*payload)
+	return render_bits(*payload)
+
+# Static data reports are sent again and again with the same content: their payloads can be kept around
+static_cache = StaticCache()
+
+def _static(key, mmsi, fields, packed, build):
+	"""Payload of a static data message, from static_cache when enabled or build() (returning (value, length))."""
+	if not static_cache.enabled:
+		return _output(build(), packed)
+	packed = bool(packed)
+	payload = static_cache.lookup(key, mmsi, fields, packed)
+	if payload is None:
+		payload = static_cache.store(key, mmsi, fields, packed, _output(build(), packed))
+	return payload
+
+
+# Message packers, compiled at import from the schemas in AIVDM_Schema.py.
+# Every packer takes the schema inputs in payload order and returns (value, length):
+# runs of fixed width fields become a single expression, constant fields are folded
+# into one literal, and only variable length texts need a statement of their own.
+
+def _fit_text(string, width, right):
+	"""A string as a width-bit six-bit field, padded with '@' on the right (or the left) and truncated if too long."""
+	(v, n) = encode_text(string)
+	if n > width:
+		return v >> (n - width)
+	if right:
+		return v
+	return v << (width - n)
+
+def field_bounds(f):
+	"""(lowest, highest) value of a fixed width numeric field, in payload units (i.e. once scaled)."""
+	if f.kind == 'i':
+		return (-(1 << (f.width - 1)), (1 << (f.width - 1)) - 1)
+	return (0, (1 << f.width) - 1)
+
+def _field_code(f, raw=False):
+	"""Source of an input field: (statements scaling it, condition of its range check, packed value).
+
+	Every value is checked against the width of its field before packing: out of range values
+	would otherwise spill into the neighbouring fields. With raw set, the value is already scaled.
+	"""
+	if f.kind in "tr":
+		return ([], "len(%s) <= %d" % (f.name, f.width // 6), "_fit_text(%s, %d, %s)" % (f.name, f.width, f.kind == 'r'))
+	(name, statements) = (f.name, [])
+	if f.scale and not raw:
+		name = "_" + f.name
+		statements.append("%s = int(round(%s*%r))" % (name, f.name, f.scale))
+	(low, high) = field_bounds(f)
+	check = "%d <= %s <= %#x" % (low, name, high)
+	if f.kind == 'i':		# two's complement
+		return (statements, check, "(%s & %#x)" % (name, (1 << f.width) - 1))
+	return (statements, check, name)
+
+def _range_error(key, values, raw=False):
+	"""Raise the ValueError listing every input of values (field name -> value) not fitting in its field of message key."""
+	errors = []
+	for f in AIVDM_Schema.inputs(key):
+		if f.name not in values or f.width is None:
+			continue
+		x = values[f.name]
+		if f.kind in "tr":
+			if len(x) > f.width // 6:
+				errors.append("%s '%s' is longer than %d characters" % (f.name, x, f.width // 6))
+			continue
+		(low, high) = field_bounds(f)
+		if f.scale and not raw:
+			if not low <= int(round(x*f.scale)) <= high:
+				errors.append("%s = %r is out of range [%g, %g]" % (f.name, x, low / float(f.scale), high / float(f.scale)))
+		elif not low <= x <= high:
+			errors.append("%s = %r is out of range [%d, %d]" % (f.name, x, low, high))
+	raise ValueError("message %s: %s" % (key, ", ".join(errors)))
+
+def packer_source(key):
+	"""Python source of the packing function of a message schema (see AIVDM_Schema.SCHEMAS).
+
+	The inputs are range checked first, in one condition: a ValueError names the ones that do not fit.
+	"""
+	body = []
+	(scaling, checks) = ([], [])		# statements and conditions of the range checks
+	run = []			# (expression or constant, width) of the pending fixed width fields
+	state = {"length": 0, "variable": False}
+
+	def flush():
+		if not run:
+			return
+		width = sum(w for (x, w) in run)
+		(const, terms, shift) = (0, [], width)
+		for (x, w) in run:
+			shift -= w
+			if isinstance(x, str):
+				terms.append("%s << %d" % (x, shift) if shift else x)
+			else:
+				const |= (x & ((1 << w) - 1)) << shift
+		if const or not terms:
+			terms.insert(0, "%#x" % const)
+		expr = " | ".join(terms)
+		if state["length"] or state["variable"]:
+			body.append("v = (v << %d) | %s" % (width, expr))
 		else:
-			_name = encode_string(__aid_name[:20])
-			_name_ext =  encode_string(__aid_name[20:])
-			_name_ext += ''.rjust(len(_name_ext) % 8, '0')
-			print _name_ext
-
-	_accurancy = '0'
-
-	(_long, _lat) = compute_long_lat(__long, __lat)
-
+			body.append("v = %s" % expr)
+		if state["variable"]:
+			body.append("n += %d" % width)
+		state["length"] += width
+		del run[:]
+
+	for f in AIVDM_Schema.SCHEMAS[key]:
+		if f.kind == 'p':
+			flush()
+			if not state["variable"]:
+				raise ValueError("schema %s: padding after a fixed width part" % key)
+			body.append("if n < %d:" % f.width)
+			body.append("\tv <<= %d - n" % f.width)
+			body.append("\tn = %d" % f.width)
+		elif f.width is None:
+			flush()
+			if not state["variable"]:
+				body.append("n = %d" % state["length"])
+				state["variable"] = True
+			body.append("(t, k) = encode_text(%s)" % f.name)
+			body.append("v = (v << k) | t")
+			body.append("n += k")
+		elif f.default is None:
+			(statements, check, expr) = _field_code(f)
+			scaling.extend(statements)
+			checks.append(check)
+			run.append((expr, f.width))
+		else:
+			run.append((f.default, f.width))
+	flush()
+	body.append("return (v, %s)" % ("n" if state["variable"] else state["length"]))
+	if checks:
+		body = scaling + ["if not (%s):" % " and ".join(checks), "\t_range_error(%r, locals())" % key] + body
+
+	args = ", ".join(f.name for f in AIVDM_Schema.inputs(key))
+	return "def pack_%s(%s):\n\t%s\n" % (key, args, "\n\t".join(body))
+
+def _compile_packers():
+	packers = {}
+	for key in AIVDM_Schema.SCHEMAS:
+		namespace = {"encode_text": encode_text, "_fit_text": _fit_text, "_range_error": _range_error}
+		exec(compile(packer_source(key), "<AIVDM_Schema %s>" % key, "exec"), namespace)
+		packers[key] = namespace["pack_%s" % key]
+	return packers
+
+# schema key ("1", ..., "24A", "24B") -> packing function
+PACKERS = _compile_packers()
+
+def patch_source(key, names, raw=False):
+	"""Python source of the function ORing the fields names into a payload value of schema key where they are zero.
+
+	With raw set, the values are taken in payload units (already scaled and rounded, e.g. speed in 0.1 kn).
+	"""
+	length = AIVDM_Schema.length(key)
+	fields = dict((f.name, f) for f in AIVDM_Schema.SCHEMAS[key])
+	(scaling, checks, terms) = ([], [], [])
+	for name in names:
+		(start, width) = AIVDM_Schema.offset(key, name)
+		shift = length - start - width
+		(statements, check, expr) = _field_code(fields[name], raw)
+		scaling.extend(statements)
+		checks.append(check)
+		terms.append("%s << %d" % (expr, shift) if shift else expr)
+	body = scaling + ["if not (%s):" % " and ".join(checks), "\t_range_error(%r, locals(), %s)" % (key, raw), "return base | %s" % " | ".join(terms)]
+	return "def patch_%s%s(base, %s):\n\t%s\n" % (key, "_raw" if raw else "", ", ".join(names), "\n\t".join(body))
+
+
+class PositionTemplate(object):
+	"""Position reports (message 1 or 18) of one vessel, re-encoded incrementally.
+
+	The static part of the payload (type, MMSI, navigation status and the constant fields) is packed
+	once; each report then only ORs the dynamic fields in at their bit offsets, a handful of integer
+	operations with value_raw(), which skips the scaling. For framed output the CRC register after
+	the static leading bytes is kept too, so only the rest of the payload goes through the CRC.
+	Call update() when the navigation status changes.
+	"""
+
+	DYNAMIC = ("speed", "lon", "lat", "course", "second")
+
+	# (schema key, raw) -> compiled patch function (see patch_source)
+	_patches = {}
+
+	def __init__(self, msg_type, mmsi, status=15):
+		self.key = str(msg_type)
+		if self.key not in ("1", "18"):
+			raise ValueError("PositionTemplate: message %s is not a position report" % msg_type)
+		(self.patch, self.patch_raw) = [self._patch_function(self.key, raw) for raw in (False, True)]
+		self.mmsi = mmsi
+		self.update(status)
+
+	@classmethod
+	def _patch_function(cls, key, raw):
+		patch = cls._patches.get((key, raw))
+		if patch is None:
+			namespace = {"_range_error": _range_error}
+			exec(compile(patch_source(key, cls.DYNAMIC, raw), "<AIVDM_Schema %s patch>" % key, "exec"), namespace)
+			patch = cls._patches[(key, raw)] = namespace["patch_%s%s" % (key, "_raw" if raw else "")]
+		return patch
+
+	def update(self, status=None):
+		"""Encode the static part again, e.g. with a new navigation status (message 1 only)."""
+		if status is not None:
+			self.status = status
+		values = dict((name, 0) for name in self.DYNAMIC)
+		values.update(mmsi=self.mmsi, status=self.status)
+		(self.base, self.length) = PACKERS[self.key](*[values[f.name] for f in AIVDM_Schema.inputs(self.key)])
+		self.static_bytes = min(AIVDM_Schema.offset(self.key, name)[0] for name in self.DYNAMIC) >> 3
+		(data, length) = pack_bits(self.base, self.length)
+		self.crc_state = AIVDM_Frame.crc_state(data[:self.static_bytes])
+
+	def value(self, speed, lon, lat, course, second):
+		"""(value, length) of a report, as PACKERS would return it."""
+		return (self.patch(self.base, speed, lon, lat, course, second), self.length)
+
+	def value_raw(self, speed, lon, lat, course, second):
+		"""Same as value(), the fields being in payload units: 0.1 kn, 1/10000 minute, 0.1 degree and second."""
+		return (self.patch_raw(self.base, speed, lon, lat, course, second), self.length)
+
+	def encode(self, speed, lon, lat, course, second, packed=False):
+		"""The payload of a report, as encode_1()/encode_18() return it."""
+		return _output((self.patch(self.base, speed, lon, lat, course, second), self.length), packed)
+
+	def frame(self, speed, lon, lat, course, second, enable_NRZI=True):
+		"""(packed frame, number of bits) of a report, as AIVDM_Frame.build_frame() returns it."""
+		(data, length) = pack_bits(self.patch(self.base, speed, lon, lat, course, second), self.length)
+		checksum = AIVDM_Frame.crc(data[self.static_bytes:], self.crc_state)
+		return AIVDM_Frame.build_frame(data, length, enable_NRZI, checksum)
+
+def pack(key, **fields):
+	"""Pack a message field by field, constants included (e.g. repeat=3 or radio=...); returns (value, length).
+
+	Slower than PACKERS[key], which only takes the inputs of the schema.
+	"""
+	w = BitWriter()
+	for f in AIVDM_Schema.SCHEMAS[key]:
+		x = fields.pop(f.name, f.default)
+		if f.kind == 'p':
+			if w.length < f.width:
+				w.put((0, f.width - w.length))
+			continue
+		if x is None:
+			raise TypeError("pack(): missing field '%s' of message %s" % (f.name, key))
+		if f.width is None:
+			w.text(x)
+			continue
+		if f.kind in "tr":
+			if len(x) > f.width // 6:
+				_range_error(key, {f.name: x})
+			w.put((_fit_text(x, f.width, f.kind == 'r'), f.width))
+			continue
+		value = int(round(x*f.scale)) if f.scale else x
+		(low, high) = field_bounds(f)
+		if not low <= value <= high:
+			raise ValueError("message %s: %s = %r does not fit in %d bits" % (key, f.name, x, f.width))
+		w.put((value, f.width))
+	if fields:
+		raise TypeError("pack(): unknown fields %s for message %s" % (", ".join(sorted(fields)), key))
+	return (w.value, w.length)
+
+
+_pack_1 = PACKERS["1"]
+_pack_4 = PACKERS["4"]
+_pack_14 = PACKERS["14"]
+_pack_18 = PACKERS["18"]
+_pack_20 = PACKERS["20"]
+_pack_21 = PACKERS["21"]
+_pack_22 = PACKERS["22"]
+_pack_23 = PACKERS["23"]
+_pack_24A = PACKERS["24A"]
+_pack_24B = PACKERS["24B"]
+
+def encode_1(__mmsi, __status,__speed, __long, __lat, __course, __ts, packed=False):
+	return _output(_pack_1(__mmsi, __status, __speed, __long, __lat, __course, __ts), packed)
+
+
+def encode_4(__mmsi, __speed, __long, __lat, __course, __ts, packed=False):
+	return _output(_pack_4(__mmsi, __long, __lat), packed)
+
+def encode_14(__mmsi, __msg, packed=False):
+	return _output(_pack_14(__mmsi, __msg), packed)
+
+
+def encode_18(__mmsi, __speed, __long, __lat, __course, __ts, packed=False):
+	return _output(_pack_18(__mmsi, __speed, __long, __lat, __course, __ts), packed)
+
+def encode_20(__mmsi, __offset, __slots, __timeout, __increment, packed=False):
+	return _output(_pack_20(__mmsi, __offset, __slots, __timeout, __increment), packed)
+
+def encode_21(__mmsi, __aid_type, __aid_name, __long, __lat, __vsize, __virtual, packed=False):
+	return _static("21", __mmsi, (__aid_type, __aid_name, __long, __lat, __vsize, __virtual), packed,
+		lambda: _encode_21(__mmsi, __aid_type, __aid_name, __long, __lat, __vsize, __virtual))
+
+def _encode_21(__mmsi, __aid_type, __aid_name, __long, __lat, __vsize, __virtual):
+	if len(__aid_name) > 20:
+		__aid_name = __aid_name.strip('@')
 	if not __virtual:
-		_hl = int(__vsize[:__vsize.find("x")])/2		# AIS antenna in the middle
-		_hw = int(__vsize[__vsize.find("x")+1:])/2
-		_half_length = '{0:b}'.format(_hl).rjust(9,'0')
-		_half_width = '{0:b}'.format(_hw).rjust(6,'0')
+		(_hl, _hw) = half_size(__vsize)		# AIS antenna in the middle
 	else:
-		_half_length = '000000000'
-		_half_width = '000000'
-
-	_fix = '0000'
-	_time = '{0:b}'.format(60).rjust(6,'0')
-	_virtual = '{0:b}'.format(int(__virtual))
-
-	return _type + _repeat + _mmsi + _aid_type + _name + _accurancy + _long + _lat + _half_length + _half_length + _half_width + _half_width + _fix + _time + '1000000000' + _virtual + '00' + _name_ext
-
-
-def encode_22(__mmsi, __channel_a, __channel_b, __ne_lon, __ne_lat, __sw_lon, __sw_lat):
-	_type = '{0:b}'.format(22).rjust(6,'0')				#
-	_repeat = '00'										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
-
-	_channel_a = '{0:b}'.format(__channel_a).rjust(12,'0')	# 2087
-	_channel_b = '{0:b}'.format(__channel_b).rjust(12,'0')	# 2088
-
-	_txrxmode = '0'*4	#'{0:b}'.format(__channel_b).rjust(4,'0')	# 0,1,2 (1 e 2 disable one tx)
-	_power = '0'	# high ('1' = low)
-
-	(_ne_lon, _ne_lat) = compute_long_lat22(__ne_lon, __ne_lat)
-	(_sw_lon, _sw_lat) = compute_long_lat22(__sw_lon, __sw_lat)
-
-	_zonesize = '{0:b}'.format(4).rjust(3,'0')	# default
+		(_hl, _hw) = (0, 0)
 
-	return 	_type+_repeat+_mmsi+'00'+_channel_a+_channel_b+_txrxmode+_power+_ne_lon+_ne_lat+_sw_lon+_sw_lat+'000'+_zonesize+'0'*23
+	_name_ext = __aid_name[20:]
+	(v, n) = _pack_21(__mmsi, __aid_type, __aid_name[:20], __long, __lat, _hl, _hl, _hw, _hw, int(__virtual), _name_ext)
+	if _name_ext:
+		pad = (6*len(_name_ext)) % 8
+		(v, n) = (v << pad, n + pad)
+	return (v, n)
 
 
-def encode_23(__mmsi, __ne_lon, __ne_lat, __sw_lon, __sw_lat, __interval_time, __quiet_time):
-	_type = '{0:b}'.format(23).rjust(6,'0')				#
-	_repeat = '00'										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
+def encode_22(__mmsi, __channel_a, __channel_b, __ne_lon, __ne_lat, __sw_lon, __sw_lat, packed=False):
+	return _output(_pack_22(__mmsi, __channel_a, __channel_b, __ne_lon, __ne_lat, __sw_lon, __sw_lat), packed)
 
-	(_ne_lon, _ne_lat) = compute_long_lat22(__ne_lon, __ne_lat)
-	(_sw_lon, _sw_lat) = compute_long_lat22(__sw_lon, __sw_lat)
 
-	_station_type = '0000'	# Target all stations (class A, B, ...)
-	_ship_type = '0'*8		# Target all ships/cargos
+def encode_23(__mmsi, __ne_lon, __ne_lat, __sw_lon, __sw_lat, __interval_time, __quiet_time, packed=False):
+	return _output(_pack_23(__mmsi, __ne_lon, __ne_lat, __sw_lon, __sw_lat, __interval_time, __quiet_time), packed)
 
-	_txrxmode = '0'*2	#'{0:b}'.format(__channel_b).rjust(4,'0')	# 0,1,2 (1 e 2 disable one tx) - NB: 2bits in message 23, 4bits in message 22
 
-	_interval = '{0:b}'.format(__interval_time).rjust(4,'0')
-	_quiet = '{0:b}'.format(__quiet_time).rjust(4,'0')
 
-	return 	_type+_repeat+_mmsi+'00'+_ne_lon+_ne_lat+_sw_lon+_sw_lat+_station_type+_ship_type+'0'*22+_txrxmode+_interval+_quiet+'0'*6
-
-
-
-def encode_24(__mmsi, __part, __vname="NAN", __callsign="NAN", __vsize="90x14", __vtype=60):
-	_type = '{0:b}'.format(24).rjust(6,'0')				# 24
-	_repeat = "00"										# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
-	_mmsi = '{0:b}'.format(__mmsi).rjust(30,'0')		# 30 bits (247320162)
+def encode_24(__mmsi, __part, __vname="NAN", __callsign="NAN", __vsize="90x14", __vtype=60, packed=False):
 	if __part == "A":
-		_part = "00"
-		_vname = encode_string(__vname)
-		_padding = '0'*(156-6-2-30-2-len(_vname))		# 160 bits per RFC -> 4 bits padding added in Build_Frame_imple.cc
-		return _type+_repeat+_mmsi+_part+_vname+_padding
+		return _static("24A", __mmsi, (__vname,), packed, lambda: _pack_24A(__mmsi, __vname))
+
+	return _static("24B", __mmsi, (__vtype, __callsign, __vsize), packed, lambda: _encode_24B(__mmsi, __callsign, __vsize, __vtype))
+
+def _encode_24B(__mmsi, __callsign, __vsize, __vtype):
+	(_hl, _hw) = half_size(__vsize)		# AIS antenna in the middle of the boat
+	return _pack_24B(__mmsi, __vtype, __callsign, _hl, _hl, _hw, _hw)
+
+
+# Batch (vectorized) encoders, available when NumPy is installed.
+# Every row is packed exactly as the scalar encoder would do with packed=True.
+
+def _require_numpy():
+	if numpy is None:
+		raise ImportError("NumPy is required by the batch encoders")
+
+def _round_batch(x):
+	# Same rounding as the built-in round() of the running interpreter (half even in py3, half away from zero in py2)
+	if round(0.5) == 0:
+		return numpy.rint(x)
+	return numpy.copysign(numpy.floor(numpy.abs(x) + 0.5), x)
+
+def _pack_batch(fields, nbits):
+	"""Pack (array, width) fields MSB first into an (N, ceil(nbits/8)) uint8 matrix."""
+	arrays = [numpy.asarray(f[0]) for f in fields]
+	shape = numpy.broadcast(*[a for a in arrays if a.ndim] or [0]).shape
+	rows = int(numpy.prod(shape))
+	nwords = (nbits + 63) >> 6
+	# scalar fields (the constants) are packed once, then copied to every row
+	constant = 0
+	offset = 0
+	for (array, (_, width)) in zip(arrays, fields):
+		offset += width
+		if not array.ndim:
+			constant |= (int(array) & ((1 << width) - 1)) << ((nwords << 6) - offset)
+	constant = [(constant >> ((nwords - 1 - k) << 6)) & 0xFFFFFFFFFFFFFFFF for k in range(nwords)]
+	words = numpy.empty((rows, nwords), dtype=numpy.uint64)
+	words[:] = numpy.array(constant, dtype=numpy.uint64)
+	offset = 0
+	for (array, (_, width)) in zip(arrays, fields):
+		end = offset + width
+		if not array.ndim:
+			offset = end
+			continue
+		values = numpy.broadcast_to(array, shape).ravel().astype(numpy.int64).astype(numpy.uint64) & numpy.uint64((1 << width) - 1)
+		k = offset >> 6
+		if (end - 1) >> 6 == k:
+			words[:, k] |= values << numpy.uint64(((k + 1) << 6) - end)
+		else:	# the field straddles two words
+			low = end - ((k + 1) << 6)
+			words[:, k] |= values >> numpy.uint64(low)
+			words[:, k+1] |= (values & numpy.uint64((1 << low) - 1)) << numpy.uint64(64 - low)
+		offset = end
+	return numpy.ascontiguousarray(words.astype('>u8').view(numpy.uint8).reshape(rows, nwords << 3)[:, :(nbits + 7) >> 3])
+
+def _bad_batch(fields, kinds):
+	"""Boolean array of the rows where a field does not fit in its width (NaN included)."""
+	arrays = [numpy.asarray(x) for (x, width) in fields]
+	shape = numpy.broadcast(*[a for a in arrays if a.ndim] or [0]).shape
+	bad = numpy.zeros(shape, dtype=bool)
+	with numpy.errstate(invalid="ignore"):
+		for (array, (x, width), kind) in zip(arrays, fields, kinds):
+			if array.ndim or array.dtype.kind not in "iu" or not 0 <= array <= (1 << width) - 1:
+				(low, high) = field_bounds(AIVDM_Schema.Field(None, width, kind, None, None))
+				bad |= ~((array >= low) & (array <= high))
+	return bad.ravel()
+
+def pack_batch(key, checked=False, **columns):
+	"""Vectorized PACKERS[key]: one array (or scalar) per input field, returns the (N, bytes) uint8 matrix.
+
+	Constant fields can be overridden like in pack(). Only fixed width, non-text messages are supported.
+	With checked set, (matrix, bad) is returned, bad being the boolean array of the rows where a value
+	does not fit in its field; their fields are packed as zeros.
+	"""
+	_require_numpy()
+	if not AIVDM_Schema.is_fixed(key):
+		raise ValueError("message %s has no fixed width layout" % key)
+	(fields, kinds) = ([], [])
+	for f in AIVDM_Schema.SCHEMAS[key]:
+		x = columns.pop(f.name, f.default)
+		if x is None:
+			raise TypeError("pack_batch(): missing field '%s' of message %s" % (f.name, key))
+		if f.kind in "tr":
+			raise ValueError("pack_batch(): text field '%s' is not supported" % f.name)
+		if f.scale:
+			x = _round_batch(numpy.asarray(x)*f.scale)
+		fields.append((x, f.width))
+		kinds.append(f.kind)
+	if columns:
+		raise TypeError("pack_batch(): unknown fields %s for message %s" % (", ".join(sorted(columns)), key))
+	if not checked:
+		return _pack_batch(fields, AIVDM_Schema.length(key))
+	bad = _bad_batch(fields, kinds)
+	if bad.any():
+		fields = [(numpy.where(bad, 0, x) if numpy.ndim(x) else x, width) for (x, width) in fields]
+	return (_pack_batch(fields, AIVDM_Schema.length(key)), bad)
+
+def encode_1_batch(__mmsi, __status, __speed, __long, __lat, __course, __ts, checked=False):
+	"""Vectorized encode_1(): returns the (N, 21) uint8 matrix of packed payloads (and the bad rows if checked, see pack_batch)."""
+	return pack_batch("1", checked, mmsi=__mmsi, status=__status, speed=__speed, lon=__long, lat=__lat, course=__course, second=__ts)
+
+def encode_18_batch(__mmsi, __speed, __long, __lat, __course, __ts, checked=False):
+	"""Vectorized encode_18(): returns the (N, 21) uint8 matrix of packed payloads (and the bad rows if checked, see pack_batch)."""
+	return pack_batch("18", checked, mmsi=__mmsi, speed=__speed, lon=__long, lat=__lat, course=__course, second=__ts)
+
+
+
+
+def encode_message(options, packed=False):
+	"""Encode the message described by the command line options (or any object with the same attributes).
+
+	Returns the ASCII bit string, or (bytes, length) if packed is set.
+	"""
+	msg_type = str(options.type)
+
+	if msg_type == "1":
+		return encode_1(int(options.mmsi),int(options.status), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts), packed=packed)
+
+	elif msg_type == "4":
+		return encode_4(int(options.mmsi), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts), packed=packed)
+
+	elif msg_type == "14":
+		return encode_14(int(options.mmsi), options.sart_msg, packed=packed)
+
+	elif msg_type == "20":
+		return encode_20(int(options.mmsi), int(options.fatdmaoffset), int(options.fatdmaslots), int(options.fatdmatimeout), int(options.fatdmaincrement), packed=packed)
+
+	elif msg_type == "18":
+		return encode_18(int(options.mmsi), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts), packed=packed)
+
+	elif msg_type == "21":
+		if options.v_AtoN == True: __virtual = 1
+		else: __virtual = 0
+		return encode_21(int(options.mmsi), int(options.aid_type), options.aid_name, float(options.long), float(options.lat), options.vsize, __virtual, packed=packed)
+
+	elif msg_type == "22":
+		return encode_22(int(options.mmsi), int(options.channel_a), int(options.channel_b), float(options.ne_lon), float(options.ne_lat), float(options.sw_lon), float(options.sw_lat), packed=packed)
+
+	elif msg_type == "23":
+		return encode_23(int(options.mmsi), float(options.ne_lon), float(options.ne_lat), float(options.sw_lon), float(options.sw_lat), int(options.interval), int(options.quiet), packed=packed)
+
+	elif msg_type == "24":
+		if options.part=="A":
+			return encode_24(int(options.mmsi), "A", __vname=options.vname.upper(), packed=packed)
+		else:
+			return encode_24(int(options.mmsi), "B", __callsign=options.callsign.upper(), __vsize=options.vsize, __vtype=int(options.vtype), packed=packed)
 
-	else:
-		_part = "01"
-		_vtype = '{0:b}'.format(__vtype).rjust(8,'0')   # 60 = passengers
-		_vendorID = "0"*42								# vendor ID
+	raise ValueError("Sentence type not supported: %s" % msg_type)
 
-		_tmp = encode_string(__callsign)
-		_callsign = _tmp + "0"*(42-len(_tmp))			# 7 six-bit characters
 
-		_hl=int(__vsize[:__vsize.find("x")])/2		# AIS antenna in the middle of the boat
-		_hw=int(__vsize[__vsize.find("x")+1:])/2
-		_half_length='{0:b}'.format(_hl).rjust(9,'0')
-		_half_width='{0:b}'.format(_hw).rjust(6,'0')
+# Options that are plain flags on the command line
+STREAM_FLAGS = ("v_AtoN",)
 
-		return _type+_repeat+_mmsi+_part+_vtype+_vendorID+_callsign+_half_length+_half_length+_half_width+_half_width+"000000"
+# Options that are not message fields (output and --stream settings)
+OUTPUT_OPTIONS = ("stream", "flush", "nmea", "channel", "packed", "source", "static_cache")
 
+def read_records(instream, defaults):
+	"""Yield (record number, options) for every message description read from instream.
 
+	The input is JSON Lines or, when the first line is not a JSON object, CSV with a header row.
+	Keys/columns are the long option names (type, mmsi, speed, ...); missing or empty values take
+	the value in defaults. options is an optparse.Values, or the ValueError raised by a bad record.
+	"""
+	lines = iter(instream)
+	first = next(lines, None)
+	if first is None:
+		return
+	lines = itertools.chain([first], lines)
 
-def main():
+	if first.lstrip().startswith("{"):
+		items = (line for line in lines if line.strip())
+		parse = json.loads
+	else:
+		items = csv.reader(lines)
+		header = [h.strip() for h in next(items)]
+		parse = lambda row: dict(zip(header, row))
+
+	for (n, item) in enumerate(items, 1):
+		try:
+			values = dict(defaults)
+			for (key, value) in parse(item).items():
+				if key not in values:
+					raise ValueError("unknown field '%s'" % key)
+				if value is None or value == "":
+					continue
+				if key in STREAM_FLAGS:
+					value = str(value).lower() in ("1", "true", "yes")
+				values[key] = value
+			if not values["type"]:
+				raise ValueError("Sentence type not specified")
+		except ValueError as e:
+			yield (n, e)
+			continue
+		yield (n, Values(values))
+
+def stream_encode(defaults, instream, outstream, flush_every=1000, armorer=None, packed=False):
+	"""Encode one message description per input line (see read_records) and write one payload per output line.
+
+	Payloads are written flush_every lines at a time, or as NMEA sentences (one or more lines each)
+	when an AIVDM_Armor.Armorer is given, or as packed records (see packed_record) when packed is set,
+	outstream being binary then. Bad records are reported on stderr and skipped; their count is returned.
+	"""
+	def write(items):
+		outstream.write(b"".join(items) if packed else "\n".join(items) + "\n")
+
+	out = []
+	errors = 0
+	for (n, options) in read_records(instream, defaults):
+		try:
+			if isinstance(options, ValueError):
+				raise options
+			if armorer:
+				timestamp = float(options.time) if getattr(options, "time", None) not in (None, "") else None
+				out.extend(armorer.sentences(*encode_message(options, packed=True), timestamp=timestamp))
+			elif packed:
+				out.append(packed_record(*encode_message(options, packed=True)))
+			else:
+				out.append(encode_message(options))
+		except (ValueError, TypeError, AttributeError, OverflowError) as e:
+			errors += 1
+			sys.stderr.write("record %d: %s\n" % (n, e))
+			continue
+
+		if len(out) >= flush_every:
+			write(out)
+			outstream.flush()
+			del out[:]
+
+	if out:
+		write(out)
+	outstream.flush()
+	return errors
+
+
+def option_parser():
+	"""The command line parser; its defaults also apply to --stream records."""
 	from optparse import OptionParser
 
 	desc="""Use this tool to generate the binary payload of an AIVDM sentence."""
@@ -302,49 +854,66 @@ def main():
 									""", default=60)
 	parser.add_option("--vsize",   help="24B/21. Vessel Size (multiple of 2), default = 90x14", default="90x14")
 
+	parser.add_option("--nmea", help="Print the payload as !AIVDM sentence(s) instead of bits", action="store_true")
+	parser.add_option("--channel", help="NMEA output: AIS channel (A/B), default = A", default="A")
+	parser.add_option("--source", help="NMEA output: prefix the sentences with an NMEA 4.10 tag block of this source station (s:)")
+	parser.add_option("--time", help="""NMEA output: Unix time of the message (scheduled, not the wall clock) for the tag block (c:);
+	                                    in --stream mode, give it per record""")
+	parser.add_option("--packed", help="""Write the payload as a binary packed record (2 bytes bit count, big endian, then the
+	                                      payload bytes) instead of bits, e.g. for AiS_TX.py --packed_file""", action="store_true")
 
-	(options, args) = parser.parse_args()
-	if not options.type:
-		parser.error("Sentence type not specified: -h for help.")
-
-	payload = ""
-
-	if options.type == "1":
-		payload = encode_1(int(options.mmsi),int(options.status), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts))
-
-	elif options.type == "4":
-		payload = encode_4(int(options.mmsi), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts))
-
-	elif options.type == "14":
-		payload = encode_14(int(options.mmsi), options.sart_msg)
-
-	elif options.type == "20":
-		payload = encode_20(int(options.mmsi), int(options.fatdmaoffset), int(options.fatdmaslots), int(options.fatdmatimeout), int(options.fatdmaincrement))
+	parser.add_option("--stream", help="""Read one message per line from stdin (JSON Lines, or CSV with a header row) using the
+	                                      option names above as keys, and write one payload per line. Options given on the
+	                                      command line act as defaults.""", action="store_true")
+	parser.add_option("--flush", help="Stream mode: payloads written per flush, default = 1000", type="int", default=1000)
+	parser.add_option("--static_cache", help="""Stream mode: cache the payloads of static data messages (21, 24), for scenarios
+	                                            repeating the same static reports; slower when they rarely repeat""", action="store_true")
+	return parser
 
-	elif options.type == "18":
-		payload = encode_18(int(options.mmsi), float(options.speed), float(options.long), float(options.lat), float(options.course), int(options.ts))
 
-	elif options.type == "21":
-		if options.v_AtoN == True: __virtual = '1'
-		else: __virtual = '0'
-		payload = encode_21(int(options.mmsi), int(options.aid_type), options.aid_name, float(options.long), float(options.lat), options.vsize, __virtual)
-
-	elif options.type == "22":
-		payload = encode_22(int(options.mmsi), int(options.channel_a), int(options.channel_b), float(options.ne_lon), float(options.ne_lat), float(options.sw_lon), float(options.sw_lat))
+def main():
+	parser = option_parser()
+	(options, args) = parser.parse_args()
 
-	elif options.type == "23":
-			payload = encode_23(int(options.mmsi), float(options.ne_lon), float(options.ne_lat), float(options.sw_lon), float(options.sw_lat), int(options.interval), int(options.quiet))
+	armorer = None
+	if options.nmea and options.packed:
+		parser.error("--nmea and --packed are exclusive: -h for help")
+	if options.nmea:
+		if options.channel not in ("A", "B"):
+			parser.error("Channel accepts value A or B: -h for help")
+		armorer = AIVDM_Armor.Armorer(options.channel, source=options.source)
+
+	if options.stream:
+		static_cache.enabled = bool(options.static_cache)
+		defaults = dict(vars(options))
+		for key in OUTPUT_OPTIONS:
+			del defaults[key]
+		outstream = getattr(sys.stdout, "buffer", sys.stdout) if options.packed else sys.stdout
+		if stream_encode(defaults, sys.stdin, outstream, options.flush, armorer, options.packed):
+			sys.exit(1)
+		return
 
-	elif options.type == "24":
-		if options.part=="A":
-			payload = encode_24(int(options.mmsi), "A", __vname=options.vname.upper())
-		else:
-			payload = encode_24(int(options.mmsi), "B", __callsign=options.callsign.upper(), __vsize=options.vsize, __vtype=int(options.vtype))
+	if not options.type:
+		parser.error("Sentence type not specified: -h for help.")
 
+	try:
+		payload = encode_message(options, packed=bool(armorer or options.packed))
+	except ValueError as e:
+		parser.error("%s: -h for help." % e)
+
+	if options.packed:
+		outstream = getattr(sys.stdout, "buffer", sys.stdout)
+		outstream.write(packed_record(*payload))
+		outstream.flush()
+	elif armorer:
+		try:
+			timestamp = float(options.time) if options.time else None
+			sentences = armorer.sentences(*payload, timestamp=timestamp)
+		except (ValueError, OverflowError):
+			parser.error("Time is a Unix time in seconds: -h for help")
+		print("\n".join(sentences))
 	else:
-		parser.error("Sentence type not supported: -h for help.")
-
-	print payload
+		print(payload)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Frame.py builds AIS HDLC frames out of binary payloads, in process (a Python counterpart of Build_Frame).
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# The steps are those of gr-aistx (lib/Build_Frame_impl.cc and lib/ais_frame.cc), bit for bit:
+# the payload is padded to a multiple of 8 bits, followed by its CRC, bit reversed byte by byte,
+# stuffed (a 0 after five 1s), put between the preamble, start and end flags, padded to the end of
+# its slots (1 slot of 256 bits up to 168 bits of payload, up to 5 for 1008 bits, see frame_slots),
+# NRZI encoded and packed MSB first.
+# Modulator turns frames into complex baseband samples the way AiS_TX.py does (GMSK, BT 0.4);
+# it requires NumPy.
+#
+# Usage example:
+# >>> import AIVDM_Frame, AIVDM_Encoder
+# >>> (frame, nbits) = AIVDM_Frame.build_frame(*AIVDM_Encoder.encode_1(247320162, 15, 0.1, 9.72, 45.69, 83.4, 38, packed=True))
+#
+
+import binascii
+import math
+import re
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+PREAMBLE = "10" * 12
+FLAG = "01111110"
+LEN_CRC = 16
+LEN_SLOT = 256
+# longest payload of a frame of 1 to 5 slots (ITU-R M.1371), as ais_frame.cc
+SLOT_PAYLOAD = (168, 440, 696, 952, 1008)
+MAX_PAYLOAD = SLOT_PAYLOAD[-1]
+
+_STUFF = re.compile("11111")
+
+# CRC-16 (ITU) table of ais_frame.cc compute_crc()
+_CRC_TABLE = []
+for _n in range(256):
+	_c = _n
+	for _k in range(8):
+		_c = (_c >> 1) ^ 0x8408 if _c & 1 else _c >> 1
+	_CRC_TABLE.append(_c)
+
+# byte -> its bits in reverse order
+_REVERSED = bytearray(int("{0:08b}".format(_n)[::-1], 2) for _n in range(256))
+
+
+def crc(data, state=0xffff):
+	"""CRC of a packed payload (whole bytes), as computed by Build_Frame.
+
+	state is the crc_state() of the bytes preceding data, to carry on a CRC computed in part.
+	"""
+	return crc_state(data, state) ^ 0xffff
+
+def crc_state(data, state=0xffff):
+	"""CRC register after data (before the final inversion)."""
+	c = state
+	for b in bytearray(data):
+		c = (c >> 8) ^ _CRC_TABLE[(c ^ b) & 0xff]
+	return c
+
+def _bits(data, length):
+	"""'0'/'1' string of the first length bits of data."""
+	if not length:
+		return ""
+	return "{0:0{1}b}".format(int(binascii.hexlify(data), 16), len(data)*8)[:length]
+
+def _pack(bits):
+	nbytes = len(bits) >> 3
+	return binascii.unhexlify("%0*x" % (nbytes*2, int(bits, 2))) if nbytes else b""
+
+def stuff(bits):
+	"""Insert a 0 after every run of five 1s ('0'/'1' strings)."""
+	return _STUFF.sub("111110", bits)
+
+def nrzi(bits):
+	"""NRZI encoding of a '0'/'1' string: a 0 toggles the line, a 1 keeps it (the line starts at 0)."""
+	n = len(bits)
+	if not n:
+		return bits
+	# the line level after bit i is the parity of the 0s up to i: a prefix XOR of the inverted bits
+	x = int(bits, 2) ^ ((1 << n) - 1)
+	shift = 1
+	while shift < n:
+		x ^= x >> shift
+		shift <<= 1
+	return "{0:0{1}b}".format(x, n)
+
+def frame_slots(length):
+	"""Slots taken by the frame of a payload of length bits, 0 when longer than MAX_PAYLOAD."""
+	padded = (length + 7) >> 3 << 3
+	for (slots, bits) in enumerate(SLOT_PAYLOAD):
+		if padded <= bits:
+			return slots + 1
+	return 0
+
+def frame_body(data, length, checksum=None):
+	"""The payload bytes padded to a multiple of 8 bits followed by the CRC, each byte bit reversed
+	(i.e. in transmission order), and the padded payload length. checksum is the CRC of the padded
+	payload when already known."""
+	nbytes = (length + 7) >> 3
+	data = bytearray(data[:nbytes])
+	if length & 7:
+		data[-1] &= (0xff << (8 - (length & 7))) & 0xff
+	c = crc(data) if checksum is None else checksum
+	body = (data + bytearray((c & 0xff, c >> 8))).translate(_REVERSED)
+	return (bytes(body), nbytes*8)
+
+def build_frame(data, length, enable_NRZI=True, checksum=None):
+	"""Return (packed frame, number of bits) for a packed payload of length bits, as Build_Frame outputs it.
+
+	checksum is the CRC of the payload when already known (see frame_body).
+	Raises ValueError for a payload longer than MAX_PAYLOAD bits.
+	"""
+	slots = frame_slots(length)
+	if not slots:
+		raise ValueError("payload of %d bits, frames hold up to %d bits (5 slots)" % (length, MAX_PAYLOAD))
+	body = frame_body(data, length, checksum)[0]
+	bits = PREAMBLE + FLAG + stuff(_bits(body, len(body)*8)) + FLAG
+	bits += "0" * (-len(bits) % 8)
+	bits += "0" * (slots*LEN_SLOT - len(bits))
+	if enable_NRZI:
+		bits = nrzi(bits)
+	return (_pack(bits), len(bits))
+
+def gaussian_taps(samples_per_symbol, bt, ntaps):
+	"""Gaussian filter taps normalised to unit sum (GNU Radio firdes.gaussian with a gain of 1)."""
+	s = 1.0 / (math.sqrt(math.log(2.0)) / (2*math.pi*bt))
+	t = numpy.arange(ntaps) - 0.5*ntaps + 1
+	taps = numpy.exp(-0.5*(s*t/samples_per_symbol)**2)
+	return taps / taps.sum()
+
+
+class Modulator(object):
+	"""GMSK modulator of packed frames into complex64 samples, as the flow graph of AiS_TX.py
+	(digital.gmsk_mod with BT 0.4, then a 0.9 gain). Phase and filter state carry over from one
+	frame to the next; gap_samples of silence are inserted after each frame.
+	"""
+
+	def __init__(self, samples_per_symbol=34, bt=0.4, gain=0.9, gap_samples=0):
+		if numpy is None:
+			raise ImportError("NumPy is required by Modulator")
+		self.sps = samples_per_symbol
+		taps = numpy.convolve(gaussian_taps(samples_per_symbol, bt, 4*samples_per_symbol), numpy.ones(samples_per_symbol))
+		# polyphase form of the interpolating filter: row j holds the taps applied to the symbol j symbols back
+		self.taps = numpy.zeros(-(-len(taps) // samples_per_symbol) * samples_per_symbol)
+		self.taps[:len(taps)] = taps
+		self.taps = self.taps.reshape(-1, samples_per_symbol)
+		self.sensitivity = (math.pi/2) / samples_per_symbol
+		self.gain = gain
+		self.gap_samples = gap_samples
+		self.tail = numpy.zeros((len(self.taps) - 1, samples_per_symbol))
+		self.phase = 0.0
+
+	def modulate(self, frame, nbits):
+		"""complex64 samples of the first nbits of a packed frame (followed by the gap, if any)."""
+		symbols = numpy.unpackbits(numpy.frombuffer(frame, dtype=numpy.uint8))[:nbits].astype(float)*2 - 1
+		freq = numpy.zeros((nbits + len(self.tail), self.sps))
+		freq[:len(self.tail)] = self.tail
+		for (j, row) in enumerate(self.taps):
+			freq[j:j + nbits] += symbols[:, None] * row
+		(freq, self.tail) = (freq[:nbits].ravel(), freq[nbits:])
+		phase = self.phase + numpy.cumsum(freq*self.sensitivity)
+		self.phase = phase[-1] % (2*math.pi) if len(phase) else self.phase
+		samples = (self.gain*numpy.exp(1j*phase)).astype(numpy.complex64)
+		if self.gap_samples:		# end of the burst: the filter rings out in the silence
+			self.tail[:] = 0
+			samples = numpy.concatenate((samples, numpy.zeros(self.gap_samples, dtype=numpy.complex64)))
+		return samples
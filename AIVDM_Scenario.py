@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Scenario.py runs a whole scenario in one process: encoding, NMEA armoring or framing and modulation.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# The scenario is read once, one message per line, in the format of AIVDM_Encoder.py --stream
+# (JSON Lines or CSV with a header row, e.g. as written by AIVDM_pre.pl --scenario), and goes
+# through a pipeline of generators instead of one AIVDM_Encoder.py | unpacker | AiS_TX.py run per
+# message:  records -> encode -> armor (NMEA)
+#                             -> frame (Build_Frame steps, see AIVDM_Frame.py) -> modulate (IQ)
+# Only --flush outputs are held at a time, so memory does not grow with the scenario length.
+# Output formats:
+#  - nmea:   !AIVDM sentences, with a tag block when --source is given or records have a "time"
+#  - frames: the bytes Build_Frame feeds to the modulator, as packed records (see AIVDM_Encoder.packed_record)
+#  - iq:     complex64 samples at --sampling_rate (GNU Radio file sink format), GMSK as in AiS_TX.py; requires NumPy
+#
+# Usage examples:
+# $ ./AIVDM_Scenario.py --scenario=harbour.jsonl --format=nmea > harbour.nmea
+# $ ./AIVDM_pre.pl --scenario=harbour.ini && ./AIVDM_Scenario.py --scenario=harbour.jsonl --format=iq --output=harbour.cf32
+#
+
+import sys
+
+import AIVDM_Armor
+import AIVDM_Encoder
+import AIVDM_Frame
+
+
+def encoder_defaults():
+	"""Default value of every message field, as on the AIVDM_Encoder.py command line."""
+	defaults = vars(AIVDM_Encoder.option_parser().get_default_values())
+	for key in AIVDM_Encoder.OUTPUT_OPTIONS:
+		del defaults[key]
+	return defaults
+
+def records(instream, defaults, errors):
+	"""Yield the options of every good record of the scenario; bad ones are reported on stderr and counted in errors["records"]."""
+	for (n, options) in AIVDM_Encoder.read_records(instream, defaults):
+		if isinstance(options, ValueError):
+			errors["records"] += 1
+			sys.stderr.write("record %d: %s\n" % (n, options))
+			continue
+		options.record = n
+		yield options
+
+def encode(messages, errors):
+	"""Yield (options, (packed payload, length)) for every message that can be encoded."""
+	for options in messages:
+		try:
+			yield (options, AIVDM_Encoder.encode_message(options, packed=True))
+		except (ValueError, TypeError, AttributeError) as e:
+			errors["records"] += 1
+			sys.stderr.write("record %d: %s\n" % (options.record, e))
+
+def armor(payloads, armorer, errors):
+	"""Yield the NMEA sentences of every payload, one line each."""
+	for (options, payload) in payloads:
+		time = getattr(options, "time", None)
+		try:
+			timestamp = float(time) if time not in (None, "") else None
+			sentences = armorer.sentences(*payload, timestamp=timestamp)
+		except (ValueError, TypeError, OverflowError) as e:
+			errors["records"] += 1
+			sys.stderr.write("record %d: %s\n" % (options.record, e))
+			continue
+		for sentence in sentences:
+			yield sentence + "\n"
+
+def frame(payloads, errors, enable_NRZI=True):
+	"""Yield (options, (packed frame, number of bits)) for every payload that fits in a frame."""
+	for (options, payload) in payloads:
+		try:
+			yield (options, AIVDM_Frame.build_frame(payload[0], payload[1], enable_NRZI))
+		except ValueError as e:
+			errors["records"] += 1
+			sys.stderr.write("record %d: %s\n" % (options.record, e))
+
+def modulate(frames, modulator):
+	"""Yield the complex64 samples of every frame."""
+	for (options, f) in frames:
+		yield modulator.modulate(*f)
+
+def write(chunks, outstream, flush_every=1000):
+	"""Write chunks (strings, bytes or sample arrays) flush_every at a time; return the count written."""
+	(out, count) = ([], 0)
+	for chunk in chunks:
+		out.append(chunk)
+		if len(out) >= flush_every:
+			outstream.write(_join(out))
+			count += len(out)
+			del out[:]
+	if out:
+		outstream.write(_join(out))
+		count += len(out)
+	outstream.flush()
+	return count
+
+def _join(out):
+	if isinstance(out[0], str):
+		return "".join(out)
+	if isinstance(out[0], bytes):
+		return b"".join(out)
+	return AIVDM_Frame.numpy.concatenate(out).tobytes()
+
+def run(instream, outstream, output_format="nmea", channel="A", source=None, samples_per_symbol=34, gap_samples=0, flush_every=1000, defaults=None):
+	"""Run a scenario from instream to outstream (binary unless output_format is nmea).
+
+	Returns (outputs written, bad records).
+	"""
+	errors = {"records": 0}
+	payloads = encode(records(instream, defaults or encoder_defaults(), errors), errors)
+	if output_format == "nmea":
+		chunks = armor(payloads, AIVDM_Armor.Armorer(channel, source=source), errors)
+	elif output_format == "frames":
+		chunks = (AIVDM_Encoder.packed_record(*f) for (options, f) in frame(payloads, errors))
+	elif output_format == "iq":
+		chunks = modulate(frame(payloads, errors), AIVDM_Frame.Modulator(samples_per_symbol, gap_samples=gap_samples))
+	else:
+		raise ValueError("unknown output format: %s" % output_format)
+	return (write(chunks, outstream, flush_every), errors["records"])
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Run a scenario (one message per line, JSON Lines or CSV as read by AIVDM_Encoder.py --stream) in one process
+	and write its NMEA sentences, frames or IQ samples."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--scenario", help="Scenario file, default = stdin")
+	parser.add_option("--format", help="Output: nmea, frames (packed records of the Build_Frame output) or iq (complex64 samples), default = nmea", default="nmea")
+	parser.add_option("--output", help="Output file, default = stdout")
+	parser.add_option("--channel", help="NMEA output: AIS channel (A/B), default = A", default="A")
+	parser.add_option("--source", help="NMEA output: prefix the sentences with an NMEA 4.10 tag block of this source station (s:)")
+	parser.add_option("--sampling_rate", help="IQ output: sampling rate (default is 326.531KHz, as AiS_TX.py)", type="int", default=326531)
+	parser.add_option("--bit_rate", help="IQ output: bit rate (default is 9600 baud)", type="int", default=9600)
+	parser.add_option("--gap", help="IQ output: seconds of silence after each frame, default = 0", type="float", default=0.0)
+	parser.add_option("--flush", help="Outputs written per flush, default = 1000", type="int", default=1000)
+	parser.add_option("--static_cache", help="""Cache the payloads of static data messages (21, 24), for scenarios repeating the same
+	                                            static reports every cycle; slower when they rarely repeat""", action="store_true")
+
+	(options, args) = parser.parse_args()
+
+	if options.format not in ("nmea", "frames", "iq"):
+		parser.error("Formats are nmea, frames or iq: -h for help")
+	if options.channel not in ("A", "B"):
+		parser.error("Channel accepts value A or B: -h for help")
+	if options.format == "iq" and AIVDM_Frame.numpy is None:
+		parser.error("IQ output requires NumPy")
+	samples_per_symbol = options.sampling_rate // options.bit_rate
+	if samples_per_symbol < 1 or options.gap < 0 or options.flush < 1:
+		parser.error("--sampling_rate must be at least --bit_rate, --gap and --flush positive")
+
+	AIVDM_Encoder.static_cache.enabled = bool(options.static_cache)
+	instream = open(options.scenario) if options.scenario else sys.stdin
+	if options.output:
+		outstream = open(options.output, "w" if options.format == "nmea" else "wb")
+	else:
+		outstream = sys.stdout if options.format == "nmea" else getattr(sys.stdout, "buffer", sys.stdout)
+	try:
+		(count, errors) = run(instream, outstream, options.format, options.channel, options.source, samples_per_symbol,
+			int(options.gap*options.sampling_rate), options.flush)
+	finally:
+		for f in (instream, outstream):
+			if f not in (sys.stdin, sys.stdout) and f is not getattr(sys.stdout, "buffer", None):
+				f.close()
+	sys.stderr.write("%d %s written, %d bad record(s)\n" % (count, {"nmea": "sentences", "frames": "frames", "iq": "frames"}[options.format], errors))
+	if errors:
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
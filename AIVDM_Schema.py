@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Schema.py describes, field by field, the payloads generated by AIVDM_Encoder.py.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# The tables below are the single description of every message layout: AIVDM_Encoder.py compiles
+# them into one packing function per message, AIVDM_Decoder.py into its decoding plans.
+# To add a message type, add its schema here and a thin encode_N() wrapper in AIVDM_Encoder.py.
+#
+# Usage example:
+# >>> import AIVDM_Schema
+# >>> [f.name for f in AIVDM_Schema.inputs("18")]
+# ['mmsi', 'speed', 'lon', 'lat', 'course', 'second']
+#
+
+from collections import namedtuple
+
+# name:    field name (also the key returned by the decoder)
+# width:   bits; None for a variable length text, which takes as many six-bit characters as given
+# kind:    'u' unsigned, 'i' two's complement, 't' six-bit text padded with '@' on the right,
+#          'r' six-bit text padded with '@' on the left, 'p' zero padding up to width bits of payload
+# scale:   the value is encoded as round(value*scale)
+# default: constant value of the field; None marks an input of the packing function
+Field = namedtuple("Field", "name width kind scale default")
+
+def field(name, width, kind='u', scale=None, default=None):
+	return Field(name, width, kind, scale, default)
+
+_HEADER = (
+	field("repeat", 2, default=0),						# repeat (directive to an AIS transceiver that this message should be rebroadcast.)
+	field("mmsi", 30))									# 30 bits (247320162)
+
+def _message(msg_type, *fields):
+	return (field("type", 6, default=msg_type),) + _HEADER + fields
+
+SCHEMAS = {
+	"1": _message(1,
+		field("status", 4),								# navigation status e.g. 0=Under way using engine, 1-At anchor, 5=Moored, 8=Sailing,15=undefined
+		field("turn", 8, 'i', default=-128),			# rate of turn not defined (0x80)
+		field("speed", 10, scale=10),					# Speed over ground is in 0.1-knot resolution from 0 to 102 knots. value 1023 indicates speed is not available, value 1022 indicates 102.2 knots or higher.
+		field("accuracy", 1, default=0),				# accurancy > 10m
+		field("lon", 28, 'i', 600000),
+		field("lat", 27, 'i', 600000),
+		field("course", 12, scale=10),					# 0.1 resolution. Course over ground will be 3600 (0xE10) if that data is not available.
+		field("heading", 9, default=511),				# true heading 511 (N/A)
+		field("second", 6),								# Second of UTC timestamp.
+		field("maneuver", 2, default=0),				# manufactor NaN
+		field("spare", 3, default=0),
+		field("raim", 1, default=0),
+		field("radio", 19, default=0)),
+
+	"4": _message(4,
+		field("year", 14, default=0),					# year, month, day N/A
+		field("month", 4, default=0),
+		field("day", 5, default=0),
+		field("hour", 5, default=24),					# hour N/A
+		field("minute", 6, default=60),					# minute N/A
+		field("second", 6, default=60),					# second N/A
+		field("accuracy", 1, default=1),				# accurancy <= 10m
+		field("lon", 28, 'i', 600000),
+		field("lat", 27, 'i', 600000),
+		field("epfd", 4, default=1),					# device: GPS
+		field("spare", 10, default=0),					# transmission control for packet 24, spare
+		field("raim", 1, default=0),
+		field("radio", 19, default=0)),
+
+	"14": _message(14,
+		field("spare", 2, default=0),
+		field("text", None, 't')),
+
+	"18": _message(18,
+		field("reserved", 8, default=0),
+		field("speed", 10, scale=10),					# Speed over ground is in 0.1-knot resolution from 0 to 102 knots. value 1023 indicates speed is not available, value 1022 indicates 102.2 knots or higher.
+		field("accuracy", 1, default=0),				# accurancy > 10m
+		field("lon", 28, 'i', 600000),
+		field("lat", 27, 'i', 600000),
+		field("course", 12, scale=10),					# 0.1 resolution. Course over ground will be 3600 (0xE10) if that data is not available.
+		field("heading", 9, default=511),				# true heading 511 (N/A)
+		field("second", 6),								# Second of UTC timestamp.
+		field("regional", 2, default=0),				# Regional reserved
+		field("cs", 1, default=1),						# CS mode (carrier sense Class B)
+		field("display", 1, default=0),					# Display flag
+		field("dsc", 1, default=1),						# DSC
+		field("band", 1, default=1),					# Band Flag
+		field("msg22", 1, default=1),					# M22 Flag
+		field("assigned", 1, default=0),				# Assigned 0 -> Autonomous mode
+		field("raim", 1, default=0),
+		field("radio", 20, default=0b11100000000000000110)),
+
+	"20": _message(20,
+		field("spare", 2, default=0),
+		field("offset1", 12),
+		field("number1", 4),
+		field("timeout1", 3),
+		field("increment1", 11),
+		field("spare2", 2, default=0)),
+
+	"21": _message(21,
+		field("aid_type", 5),
+		field("name", 120, 'r'),						# first 20 characters, right-justified
+		field("accuracy", 1, default=0),				# accurancy
+		field("lon", 28, 'i', 600000),
+		field("lat", 27, 'i', 600000),
+		field("to_bow", 9),								# AIS antenna in the middle
+		field("to_stern", 9),
+		field("to_port", 6),
+		field("to_starboard", 6),
+		field("epfd", 4, default=0),					# fix
+		field("second", 6, default=60),					# time
+		field("off_position", 1, default=1),
+		field("regional", 8, default=0),
+		field("raim", 1, default=0),
+		field("virtual", 1),
+		field("assigned", 1, default=0),
+		field("spare", 1, default=0),
+		field("name_ext", None, 't')),					# characters beyond the 20th
+
+	"22": _message(22,
+		field("spare", 2, default=0),
+		field("channel_a", 12),							# 2087
+		field("channel_b", 12),							# 2088
+		field("txrx", 4, default=0),					# tx/rx mode: 0,1,2 (1 e 2 disable one tx)
+		field("power", 1, default=0),					# power: high ('1' = low)
+		field("ne_lon", 18, 'i', 600),
+		field("ne_lat", 17, 'i', 600),
+		field("sw_lon", 18, 'i', 600),
+		field("sw_lat", 17, 'i', 600),
+		field("addressed", 1, default=0),
+		field("band_a", 1, default=0),
+		field("band_b", 1, default=0),
+		field("zonesize", 3, default=4),				# zone size: default
+		field("spare2", 23, default=0)),
+
+	"23": _message(23,
+		field("spare", 2, default=0),
+		field("ne_lon", 18, 'i', 600),
+		field("ne_lat", 17, 'i', 600),
+		field("sw_lon", 18, 'i', 600),
+		field("sw_lat", 17, 'i', 600),
+		field("station_type", 4, default=0),			# station type: target all stations (class A, B, ...)
+		field("ship_type", 8, default=0),				# ship type: target all ships/cargos
+		field("spare2", 22, default=0),
+		field("txrx", 2, default=0),					# tx/rx mode: 0,1,2 (1 e 2 disable one tx) - NB: 2bits in message 23, 4bits in message 22
+		field("interval", 4),
+		field("quiet", 4),
+		field("spare3", 6, default=0)),
+
+	"24A": _message(24,
+		field("part", 2, default=0),					# part A
+		field("shipname", None, 't'),
+		field("pad", 156, 'p')),						# 160 bits per RFC -> 4 bits padding added in Build_Frame_imple.cc
+
+	"24B": _message(24,
+		field("part", 2, default=1),					# part B
+		field("shiptype", 8),							# 60 = passengers
+		field("vendorid", 42, default=0),				# vendor ID
+		field("callsign", 42, 't'),						# 7 six-bit characters
+		field("to_bow", 9),								# AIS antenna in the middle of the boat
+		field("to_stern", 9),
+		field("to_port", 6),
+		field("to_starboard", 6),
+		field("spare", 6, default=0)),
+}
+
+
+def inputs(key):
+	"""The fields a message of schema key is built from, in payload order."""
+	return [f for f in SCHEMAS[key] if f.default is None and f.kind != 'p']
+
+def is_fixed(key):
+	"""True when every field of the schema has a fixed width."""
+	return all(f.width is not None and f.kind != 'p' for f in SCHEMAS[key])
+
+def length(key):
+	"""Payload length in bits of a fixed width schema."""
+	return sum(f.width for f in SCHEMAS[key])
+
+def offset(key, name):
+	"""(first bit, width) of a field of the schema; the fields before it must have a fixed width."""
+	start = 0
+	for f in SCHEMAS[key]:
+		if f.name == name:
+			return (start, f.width)
+		if f.width is None or f.kind == 'p':
+			raise ValueError("schema %s: field %s follows a variable length part" % (key, name))
+		start += f.width
+	raise KeyError("schema %s has no field %s" % (key, name))
+
+def key_of(msg_type, part="A"):
+	"""Schema key of a message type (and part, "A"/"B" or 0/1, for type 24)."""
+	msg_type = str(msg_type)
+	if msg_type == "24":
+		return "24A" if part in ("A", 0) else "24B"
+	return msg_type
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# AIVDM_Simulator.py moves a fleet of vessels by dead reckoning and writes their position reports, in time order.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# The state of the fleet (position, SOG, COG, navigation status) is kept in NumPy arrays and advanced
+# one tick at a time. Every vessel reports at the rate ITU-R M.1371 gives for its class and speed:
+# class A vessels send message 1, class B vessels message 18, encoded a tick at a time by
+# AIVDM_Encoder.encode_1_batch() and encode_18_batch(). Requires NumPy.
+# With --tag_blocks, NMEA sentences carry their report time on the simulated clock (--start) in an
+# NMEA 4.10 tag block, so that a corpus generated once can be replayed with its original timing.
+#
+# The fleet is either random (--vessels, --area, --seed) or read from a CSV file with the columns
+# mmsi,class,lon,lat,sog,cog,status (class is A or B, status the navigation status of message 1).
+#
+# Usage examples:
+# $ ./AIVDM_Simulator.py --vessels=10000 --duration=3600 --output=traffic.nmea
+# $ ./AIVDM_Simulator.py --fleet=fleet.csv --duration=600 --format=bits | ./AIVDM_Decoder.py
+# $ ./AIVDM_Simulator.py --vessels=500 --start=1700000000 --source=SIM1 --output=replay.nmea
+#
+
+import csv
+import sys
+import time
+
+import AIVDM_Armor
+import AIVDM_Encoder
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Navigation status of message 1
+UNDER_WAY = 0
+AT_ANCHOR = 1
+MOORED = 5
+SAILING = 8
+
+# Mean time (s) before an under way vessel drops anchor, and before an anchored vessel gets under way again
+MEAN_UNDER_WAY = 6*3600.0
+MEAN_AT_ANCHOR = 2*3600.0
+
+
+def report_intervals(class_b, status, sog):
+	"""Reporting interval in seconds of every vessel (ITU-R M.1371 table 1, course changes not considered)."""
+	stopped = ((status == AT_ANCHOR) | (status == MOORED)) & (sog <= 3)
+	interval_a = numpy.select([stopped, sog <= 14, sog <= 23], [180.0, 10.0, 6.0], 2.0)
+	interval_b = numpy.where(sog <= 2, 180.0, 30.0)
+	return numpy.where(class_b, interval_b, interval_a)
+
+
+class Simulator(object):
+	"""Fleet of vessels moved by dead reckoning.
+
+	All attributes are NumPy arrays with one entry per vessel, but t: the simulated clock in seconds
+	(Unix time if start is, the UTC second of the reports is taken from it). A vessel is only moved
+	when it reports, so that a tick costs in proportion to the reports rather than to the fleet.
+	"""
+
+	def __init__(self, mmsi, class_b, lon, lat, sog, cog, status, seed=0, wander=2.0, start=0.0):
+		self.rng = numpy.random.RandomState(seed)
+		self.mmsi = numpy.asarray(mmsi, dtype=numpy.int64)
+		self.class_b = numpy.asarray(class_b, dtype=bool)
+		self.lon = numpy.asarray(lon, dtype=float).copy()
+		self.lat = numpy.asarray(lat, dtype=float).copy()
+		self.sog = numpy.asarray(sog, dtype=float).copy()
+		self.cog = numpy.asarray(cog, dtype=float) % 360
+		self.status = numpy.asarray(status, dtype=numpy.int64).copy()
+		self.cruise = numpy.where(self.sog > 0, self.sog, self.rng.uniform(5, 20, self.mmsi.size))
+		self.voyage = numpy.where(self.status == SAILING, SAILING, UNDER_WAY)
+		self.wander = wander			# course changes, degrees per minute (standard deviation)
+		self.t = float(start)
+		self.updated = numpy.full(self.mmsi.size, self.t)		# time of the state of every vessel
+		# first reports spread over one interval, as if the fleet had been at sea for a while
+		self.next_report = self.t + self.rng.uniform(0, 1, self.mmsi.size)*report_intervals(self.class_b, self.status, self.sog)
+
+	@classmethod
+	def random(cls, vessels, area=(-180.0, -80.0, 180.0, 80.0), class_b=0.3, seed=0, wander=2.0, start=0.0):
+		"""Random fleet of vessels within area (lon_min, lat_min, lon_max, lat_max)."""
+		_require_numpy()
+		rng = numpy.random.RandomState(seed)
+		stride = 580000000 // max(vessels, 1)
+		mmsi = 200000000 + numpy.arange(vessels)*stride + rng.randint(0, stride, vessels)
+		status = rng.choice([UNDER_WAY, SAILING, AT_ANCHOR, MOORED], vessels, p=[0.7, 0.05, 0.15, 0.1])
+		sog = numpy.where((status == AT_ANCHOR) | (status == MOORED), 0.0, rng.uniform(2, 25, vessels))
+		return cls(mmsi, rng.uniform(0, 1, vessels) < class_b, rng.uniform(area[0], area[2], vessels),
+			rng.uniform(area[1], area[3], vessels), sog, rng.uniform(0, 360, vessels), status, seed + 1, wander, start)
+
+	@classmethod
+	def from_csv(cls, f, seed=0, wander=2.0, start=0.0):
+		"""Fleet read from a CSV file with the columns mmsi,class,lon,lat,sog,cog,status."""
+		_require_numpy()
+		rows = list(csv.DictReader(f))
+		column = lambda name, convert: [convert(r[name]) for r in rows]
+		return cls(column("mmsi", int), column("class", lambda c: c.strip().upper() == "B"), column("lon", float),
+			column("lat", float), column("sog", float), column("cog", float), column("status", int), seed, wander, start)
+
+	def step(self, dt):
+		"""Advance the whole fleet by dt seconds."""
+		self.t += dt
+		self._advance(numpy.arange(self.mmsi.size), self.t)
+
+	def _advance(self, v, when):
+		"""Dead reckoning of vessels v (indices) from their last update up to when (scalar or one time per vessel)."""
+		dt = when - self.updated[v]
+		self.updated[v] = when
+		(lon, lat, sog, cog, status) = (self.lon[v], self.lat[v], self.sog[v], self.cog[v], self.status[v])
+		moving = sog > 0
+
+		# navigation status: drop anchor, or get under way again at cruise speed
+		draw = self.rng.uniform(0, 1, v.size)
+		anchor = moving & (draw < -numpy.expm1(-dt/MEAN_UNDER_WAY))
+		leave = (status == AT_ANCHOR) & (draw < -numpy.expm1(-dt/MEAN_AT_ANCHOR))
+		self.status[v] = numpy.where(anchor, AT_ANCHOR, numpy.where(leave, self.voyage[v], status))
+		self.sog[v] = numpy.where(anchor, 0.0, numpy.where(leave, self.cruise[v], sog))
+
+		# dead reckoning: one knot is one minute of latitude per hour; the course wanders as a random walk
+		cog = (cog + moving*self.rng.normal(0, 1, v.size)*self.wander*numpy.sqrt(dt/60.0)) % 360
+		heading = numpy.radians(cog)
+		distance = sog*dt/3600.0/60.0
+		lat = lat + distance*numpy.cos(heading)
+		lon = lon + distance*numpy.sin(heading)/numpy.maximum(numpy.cos(numpy.radians(lat)), 0.01)
+
+		# turn back before the poles, wrap around the antimeridian
+		polar = numpy.abs(lat) > 89.0
+		self.lat[v] = numpy.clip(lat, -89.0, 89.0)
+		self.cog[v] = numpy.where(polar, (180.0 - cog) % 360, cog)
+		self.lon[v] = (lon + 180.0) % 360 - 180.0
+
+	def reports(self, dt):
+		"""Reports due during the next dt seconds.
+
+		Returns (times, payloads): the report times (simulated clock), in increasing order, and the matching
+		(N, 21) uint8 matrix of 168 bit payloads (message 1 or 18). Only the reporting vessels are moved,
+		to the time of their report: call step() to bring the state of the whole fleet up to date.
+		"""
+		end = self.t + dt
+		(times, payloads) = ([], [])
+		due = numpy.flatnonzero(self.next_report < end)
+		while due.size:		# fast vessels report more than once in a long tick
+			when = self.next_report[due]
+			self._advance(due, when)
+			times.append(when)
+			payloads.append(self._encode(due, when))
+			self.next_report[due] += report_intervals(self.class_b[due], self.status[due], self.sog[due])
+			due = due[self.next_report[due] < end]
+		self.t = end
+		if not times:
+			return (numpy.empty(0), numpy.empty((0, 21), dtype=numpy.uint8))
+		times = numpy.concatenate(times)
+		order = numpy.argsort(times, kind="mergesort")
+		return (times[order], numpy.concatenate(payloads)[order])
+
+	def _encode(self, v, when):
+		"""(N, 21) uint8 matrix of the current reports of vessels v, made at times when."""
+		payloads = numpy.empty((v.size, 21), dtype=numpy.uint8)
+		seconds = numpy.floor(when).astype(numpy.int64) % 60
+		(a, b) = (~self.class_b[v], self.class_b[v])
+		(va, vb) = (v[a], v[b])
+		if va.size:
+			(payloads[a], bad) = AIVDM_Encoder.encode_1_batch(self.mmsi[va], self.status[va], numpy.minimum(self.sog[va], 102.2),
+				self.lon[va], self.lat[va], numpy.round(self.cog[va], 1) % 360, seconds[a], checked=True)
+			self._check(1, va[bad])
+		if vb.size:
+			(payloads[b], bad) = AIVDM_Encoder.encode_18_batch(self.mmsi[vb], numpy.minimum(self.sog[vb], 102.2),
+				self.lon[vb], self.lat[vb], numpy.round(self.cog[vb], 1) % 360, seconds[b], checked=True)
+			self._check(18, vb[bad])
+		return payloads
+
+	def _check(self, msg_type, bad):
+		if bad.size:
+			raise ValueError("message %d: out of range fields for vessel(s) %s" % (msg_type, ", ".join(str(m) for m in self.mmsi[bad[:10]])))
+
+	def run(self, duration, tick=1.0):
+		"""Yield (times, payloads) one tick at a time for duration seconds, see reports()."""
+		end = self.t + duration
+		while self.t < end:
+			yield self.reports(min(tick, end - self.t))
+
+
+def _require_numpy():
+	if numpy is None:
+		raise ImportError("NumPy is required by AIVDM_Simulator.py")
+
+def bits_lines(payloads, length):
+	"""(N, line length) uint8 matrix of '0'/'1' lines, as printed by AIVDM_Encoder.py."""
+	bits = numpy.unpackbits(payloads, axis=1)[:, :length] + numpy.uint8(ord("0"))
+	return numpy.hstack((bits, numpy.full((bits.shape[0], 1), ord("\n"), dtype=numpy.uint8)))
+
+def packed_records(payloads, length):
+	"""(N, record length) uint8 matrix of AIVDM_Encoder.packed_record() records."""
+	head = numpy.frombuffer(AIVDM_Encoder.packed_record(b"", length), dtype=numpy.uint8)
+	return numpy.hstack((numpy.tile(head, (payloads.shape[0], 1)), payloads))
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Simulate a fleet of vessels and write their position reports (messages 1 and 18) in time order."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--vessels", help="Random fleet: number of vessels, default = 1000", type="int", default=1000)
+	parser.add_option("--class_b", help="Random fleet: share of class B vessels, default = 0.3", type="float", default=0.3)
+	parser.add_option("--area", help="Random fleet: lon_min,lat_min,lon_max,lat_max, default = -180,-80,180,80", default="-180,-80,180,80")
+	parser.add_option("--fleet", help="CSV file of the fleet (mmsi,class,lon,lat,sog,cog,status) instead of a random one")
+	parser.add_option("--seed", help="Seed of the random fleet and of its moves, default = 0", type="int", default=0)
+	parser.add_option("--wander", help="Course changes, degrees per minute, default = 2", type="float", default=2.0)
+	parser.add_option("--duration", help="Simulated time in seconds, default = 3600", type="float", default=3600.0)
+	parser.add_option("--tick", help="Simulation step in seconds, default = 1", type="float", default=1.0)
+	parser.add_option("--start", help="UTC start of the simulation (Unix time) for the timestamps, default = now", type="float")
+	parser.add_option("--format", help="Output format: nmea (!AIVDM sentences), bits ('0'/'1' lines) or bin (packed records), default = nmea", default="nmea")
+	parser.add_option("--channel", help="NMEA output: AIS channel (A/B), default = A", default="A")
+	parser.add_option("--tag_blocks", help="NMEA output: prefix every sentence with an NMEA 4.10 tag block holding the report time (c:)", action="store_true")
+	parser.add_option("--source", help="NMEA output: source station of the tag blocks (s:), implies --tag_blocks")
+	parser.add_option("--output", help="Output file, default = stdout")
+
+	(options, args) = parser.parse_args()
+
+	if numpy is None:
+		parser.error("NumPy is required")
+	if options.format not in ("nmea", "bits", "bin"):
+		parser.error("Format accepts nmea, bits or bin: -h for help")
+	if options.channel not in ("A", "B"):
+		parser.error("Channel accepts value A or B: -h for help")
+	if options.tick <= 0 or options.duration < 0:
+		parser.error("--tick must be positive and --duration not negative")
+	try:
+		area = [float(x) for x in options.area.split(",")]
+		if len(area) != 4 or area[0] >= area[2] or area[1] >= area[3]:
+			raise ValueError
+	except ValueError:
+		parser.error("Area is lon_min,lat_min,lon_max,lat_max: -h for help")
+
+	start = time.time() if options.start is None else options.start
+	if options.fleet:
+		with open(options.fleet) as f:
+			sim = Simulator.from_csv(f, options.seed, options.wander, start)
+	else:
+		sim = Simulator.random(options.vessels, area, options.class_b, options.seed, options.wander, start)
+
+	armorer = AIVDM_Armor.Armorer(options.channel, source=options.source)
+	tag_blocks = options.tag_blocks or bool(options.source)
+	if options.format == "nmea":
+		render = lambda payloads, times: armorer.sentences_batch(payloads, 168, times if tag_blocks else None)
+	elif options.format == "bits":
+		render = lambda payloads, times: bits_lines(payloads, 168)
+	else:
+		render = lambda payloads, times: packed_records(payloads, 168)
+	if options.output:
+		out = open(options.output, "wb")
+	else:
+		out = getattr(sys.stdout, "buffer", sys.stdout)
+
+	messages = 0
+	begin = time.time()
+	for (times, payloads) in sim.run(options.duration, options.tick):
+		if payloads.shape[0]:
+			out.write(render(payloads, times).tobytes())
+			messages += payloads.shape[0]
+	out.flush()
+	if options.output:
+		out.close()
+	elapsed = time.time() - begin
+	sys.stderr.write("%d vessels, %.0f s simulated: %d messages in %.1f s (%.0f msg/s)\n" % (sim.mmsi.size, options.duration,
+		messages, elapsed, messages / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+	main()
@@ -21,6 +21,8 @@
 #
 # Usage example: 
 # $ ./AIVDM_Encoder.py --type=1 --mmsi=970010000 --lat=45.6910 --long=9.7235 | xargs -IX ./AiS_TX.py --payload=X --channel=A
+# $ ./AIVDM_Encoder.py --type=1 --mmsi=970010000 --packed | ./AiS_TX.py --packed_file=- --channel=A --once
+# $ ./AIVDM_Encoder.py --stream --packed < scenario.jsonl | ./AiS_TX.py --packed_file=- --stream --channel=A
 #
 
 from gnuradio import blocks
@@ -33,12 +35,15 @@ from gnuradio.gr import firdes
 from grc_gnuradio import wxgui as grc_wxgui
 from optparse import OptionParser
 import AISTX
+import AIVDM_Encoder
+import pmt
+import sys
 import time
 import wx
 
 class top_block(grc_wxgui.top_block_gui):
 
-	def __init__(self, p, c, pw, ff, sr, br):
+	def __init__(self, p, c, pw, ff, sr, br, repeat=True):
 		grc_wxgui.top_block_gui.__init__(self, title="Top Block")
 		_icon_path = "/usr/share/icons/hicolor/32x32/apps/gnuradio-grc.png"
 		self.SetIcon(wx.Icon(_icon_path, wx.BITMAP_TYPE_ANY))
@@ -71,7 +76,12 @@ class top_block(grc_wxgui.top_block_gui):
 			log=False,
 		)
 		self.blocks_multiply_const_vxx_0 = blocks.multiply_const_vcc((0.9, ))
-		self.AISTX_Build_Frame_0 = AISTX.Build_Frame(p, False, True)
+		if p is None:		# stream: the payloads come through the payload port (see payload_feeder)
+			self.AISTX_Build_Frame_0 = AISTX.Build_Frame("", False, True)
+		elif isinstance(p, tuple):	# packed payload: (bytes, number of bits)
+			self.AISTX_Build_Frame_0 = AISTX.Build_Frame(list(bytearray(p[0])), p[1], repeat, True)
+		else:
+			self.AISTX_Build_Frame_0 = AISTX.Build_Frame(p, repeat, True)
 
 		##################################################
 		# Connections
@@ -101,6 +111,26 @@ class top_block(grc_wxgui.top_block_gui):
 	def set_bit_rate(self, bit_rate):
 		self.bit_rate = bit_rate
 
+class payload_feeder(gr.basic_block):
+	"""Posts (bytes, length) packed records to the payload port of Build_Frame, one for each message
+	of its "room" port: the queue of Build_Frame never overflows, and nothing waits or polls for room."""
+
+	def __init__(self, records):
+		gr.basic_block.__init__(self, name="payload_feeder", in_sig=None, out_sig=None)
+		self.records = records
+		self.message_port_register_out(pmt.intern("payload"))
+		self.message_port_register_in(pmt.intern("room"))
+		self.set_msg_handler(pmt.intern("room"), self.handle_room)
+
+	def handle_room(self, msg):
+		record = next(self.records, None)
+		if record is None:
+			return
+		(data, length) = record
+		meta = pmt.dict_add(pmt.make_dict(), pmt.intern("nbits"), pmt.from_long(length))
+		payload = pmt.init_u8vector(len(data), list(bytearray(data)))
+		self.message_port_pub(pmt.intern("payload"), pmt.cons(meta, payload))
+
 if __name__ == '__main__':
 
 	desc="""GnuRadio-Based AIS Transmitter. Copyright Embyte & Pastus 2013-2014."""
@@ -109,6 +139,12 @@ if __name__ == '__main__':
 	
 	parser.add_option("--payload", help="""Specify the message payload to transmit 
 	                                    (e.g., crafted via AIVDM_Encoder)""")
+	parser.add_option("--packed_file", help="""Read the payload as a packed record from this file, - for stdin
+	                                    (e.g., written by AIVDM_Encoder --packed)""")
+	parser.add_option("--stream", help="""Transmit every record of --packed_file in turn, with the same flow graph
+	                                    (e.g., written by AIVDM_Encoder --stream --packed)""", action="store_true", default=False)
+	parser.add_option("--interval", help="""Specify the seconds between two frames (default is 0.1)""", type="float", default=0.1)
+	parser.add_option("--once", help="""Transmit the payload once, instead of repeating it until stopped""", action="store_true", default=False)
 	parser.add_option("--channel", help="""Specify the AIS channel:
 	                                    - A: 161.975Mhz (87B)
 	                                    - B: 162.025Mhz (88B)""")
@@ -116,10 +152,27 @@ if __name__ == '__main__':
 	parser.add_option("--filter_frequency", help="""Specify the filter frequency (default is 19MHz)""", type="int", default = 19000000)
 	parser.add_option("--sampling_rate", help="""Specify the sampling rate (default is 326.531KHz)""", type="int", default = 326531)
 	parser.add_option("--bit_rate", help="""Specify the bit rate (default is 9600 baud)""", type="int", default = 9600)	
+	parser.add_option("--trace", help="""Specify what Build_Frame logs: off, warn, info or debug (the frame bits)
+	                                    (default is off)""", type="choice", choices=["off", "warn", "info", "debug"], default="off")
 	
 	(options, args) = parser.parse_args()
 	
-	if not options.payload:
+	if options.stream and not options.packed_file:
+		parser.error("--stream requires --packed_file: -h for help.")
+
+	if options.stream and options.once:
+		parser.error("--stream sends every record once already: -h for help.")
+
+	if options.packed_file and not options.stream:
+		f = getattr(sys.stdin, "buffer", sys.stdin) if options.packed_file == "-" else open(options.packed_file, "rb")
+		try:
+			options.payload = next(AIVDM_Encoder.read_packed_records(f), None)
+		except ValueError as e:
+			parser.error("%s: %s" % (options.packed_file, e))
+		if options.payload is None:
+			parser.error("No packed record in %s" % options.packed_file)
+
+	if not options.payload and not options.stream:
 		parser.error("Payload not specified: -h for help.")
 
 	if not options.channel:
@@ -128,8 +181,18 @@ if __name__ == '__main__':
 	if options.channel!="A" and options.channel!="B":
 		parser.error("Channel accepts value A or B: -h for help")
 	    
+	if options.interval < 0:
+		parser.error("The interval cannot be negative: -h for help.")
+
 	channel_ID = 0 if options.channel=="A" else 1
 
-	tb = top_block(p=options.payload, c=channel_ID, pw=options.power, ff=options.filter_frequency, sr=options.sampling_rate, br=options.bit_rate)
+	tb = top_block(p=options.payload, c=channel_ID, pw=options.power, ff=options.filter_frequency, sr=options.sampling_rate, br=options.bit_rate, repeat=not options.once)
+	tb.AISTX_Build_Frame_0.set_trace_level(getattr(AISTX, "TRACE_" + options.trace.upper()))
+	tb.AISTX_Build_Frame_0.set_interval(options.interval)
+	if options.stream:
+		f = getattr(sys.stdin, "buffer", sys.stdin) if options.packed_file == "-" else open(options.packed_file, "rb")
+		tb.payload_feeder = payload_feeder(AIVDM_Encoder.read_packed_records(f))
+		tb.msg_connect(tb.payload_feeder, "payload", tb.AISTX_Build_Frame_0, "payload")
+		tb.msg_connect(tb.AISTX_Build_Frame_0, "room", tb.payload_feeder, "room")
 	tb.Run(True)
 
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# bench_armor.py compares the in-process NMEA armoring of AIVDM_Armor.py with one unpacker.c process per payload,
+# and with the batch modes of unpacker.c (every payload read from stdin by a single process).
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# unpacker.c is built with $CXX (default g++). Spawning it a million times takes a long while, so it is
+# timed on --c_samples payloads and its rate extrapolated; the sampled sentences are also compared with ours.
+#
+# Usage example:
+# $ ./benchmarks/bench_armor.py --payloads=1000000
+#
+
+import binascii
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import AIVDM_Armor
+import AIVDM_Encoder
+
+
+def payloads(count, distinct=1000, seed=0):
+	"""Type 1 payloads (packed), cycling over a pool of distinct random reports."""
+	rng = random.Random(seed)
+	pool = [AIVDM_Encoder.encode_1(rng.randint(200000000, 779999999), rng.randint(0, 15), rng.randint(0, 1022)/10.0,
+		rng.uniform(-180, 180), rng.uniform(-90, 90), rng.randint(0, 3599)/10.0, rng.randint(0, 59), packed=True)
+		for i in range(distinct)]
+	return [pool[i % distinct] for i in range(count)]
+
+def build_unpacker(workdir):
+	binary = os.path.join(workdir, "unpacker")
+	cxx = os.environ.get("CXX", "g++")
+	try:
+		subprocess.check_call([cxx, "-O2", "-o", binary, os.path.join(ROOT, "unpacker.c")])
+	except (OSError, subprocess.CalledProcessError):
+		return None
+	return binary
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Measure NMEA armoring throughput (sentences/sec): AIVDM_Armor.py in process against unpacker.c."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--payloads", help="Payloads armored in process, default = 1000000", type="int", default=1000000)
+	parser.add_option("--c_samples", help="Payloads armored by spawning unpacker.c, default = 2000", type="int", default=2000)
+
+	(options, args) = parser.parse_args()
+
+	data = payloads(options.payloads)
+	armorer = AIVDM_Armor.Armorer("A")
+	start = time.time()
+	for (payload, length) in data:
+		armorer.sentences(payload, length)
+	py_rate = len(data) / (time.time() - start)
+	print("AIVDM_Armor.py: %d payloads, %.0f sentences/s, %.1f s" % (len(data), py_rate, len(data) / py_rate))
+
+	workdir = tempfile.mkdtemp()
+	try:
+		binary = build_unpacker(workdir)
+		if binary is None:
+			print("unpacker.c: cannot be built, skipped")
+			return
+		samples = data[:options.c_samples]
+		bits = [AIVDM_Encoder.render_bits(int(binascii.hexlify(p), 16) >> (8*len(p) - n), n) for (p, n) in samples]
+		mismatches = 0
+		start = time.time()
+		for (b, (p, n)) in zip(bits, samples):
+			out = subprocess.Popen([binary, b, "1", "A"], stdout=subprocess.PIPE).communicate()[0].decode("ascii").strip()
+			if [out] != armorer.sentences(p, n):
+				mismatches += 1
+		c_rate = len(samples) / (time.time() - start)
+		print("unpacker.c:     %d payloads, %.0f sentences/s, %.1f s extrapolated to %d payloads" % (len(samples), c_rate, len(data) / c_rate, len(data)))
+		print("speedup %.0fx, %d mismatching sentences" % (py_rate / c_rate, mismatches))
+
+		# batch mode: all the payloads through a single unpacker.c process
+		lines = "".join(AIVDM_Encoder.render_bits(int(binascii.hexlify(p), 16) >> (8*len(p) - n), n) + "\n" for (p, n) in data)
+		records = b"".join(AIVDM_Encoder.packed_record(p, n) for (p, n) in data)
+		for (mode, stdin) in (("-", lines.encode("ascii")), ("-b", records)):
+			start = time.time()
+			out = subprocess.Popen([binary, mode, "1", "A"], stdin=subprocess.PIPE, stdout=subprocess.PIPE).communicate(stdin)[0]
+			batch_rate = len(data) / (time.time() - start)
+			sentences = out.decode("ascii").splitlines()
+			mismatches = sum(1 for (s, (p, n)) in zip(sentences, samples) if [s] != armorer.sentences(p, n)) + abs(len(sentences) - len(data))
+			print("unpacker.c %-3s %d payloads, %.0f sentences/s, %.1f s, %.0fx the per-process rate, %d mismatching sentences" % (mode,
+				len(data), batch_rate, len(data) / batch_rate, batch_rate / c_rate, mismatches))
+	finally:
+		shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+	main()
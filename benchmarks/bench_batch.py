@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# bench_batch.py compares the NumPy batch encoders for position reports (types 1 and 18) with a loop over the scalar ones.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# Usage example:
+# $ ./benchmarks/bench_batch.py --rows=10000,100000,1000000
+#
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import AIVDM_Encoder
+
+
+def fleet(rows, seed=0):
+	rng = numpy.random.RandomState(seed)
+	return {
+		"mmsi":   rng.randint(200000000, 780000000, rows),
+		"status": rng.randint(0, 16, rows),
+		"speed":  rng.randint(0, 1023, rows) / 10.0,
+		"long":   rng.uniform(-180, 180, rows),
+		"lat":    rng.uniform(-90, 90, rows),
+		"course": rng.randint(0, 3600, rows) / 10.0,
+		"ts":     rng.randint(0, 60, rows),
+	}
+
+def scalar_rate(msg_type, f, rows):
+	mmsi, status, speed = f["mmsi"].tolist(), f["status"].tolist(), f["speed"].tolist()
+	lon, lat, course, ts = f["long"].tolist(), f["lat"].tolist(), f["course"].tolist(), f["ts"].tolist()
+	start = time.time()
+	if msg_type == 1:
+		for i in range(rows):
+			AIVDM_Encoder.encode_1(mmsi[i], status[i], speed[i], lon[i], lat[i], course[i], ts[i], packed=True)
+	else:
+		for i in range(rows):
+			AIVDM_Encoder.encode_18(mmsi[i], speed[i], lon[i], lat[i], course[i], ts[i], packed=True)
+	return rows / (time.time() - start)
+
+def batch_rate(msg_type, f, repeat):
+	best = None
+	for r in range(repeat):
+		start = time.time()
+		if msg_type == 1:
+			AIVDM_Encoder.encode_1_batch(f["mmsi"], f["status"], f["speed"], f["long"], f["lat"], f["course"], f["ts"])
+		else:
+			AIVDM_Encoder.encode_18_batch(f["mmsi"], f["speed"], f["long"], f["lat"], f["course"], f["ts"])
+		elapsed = time.time() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return f["mmsi"].size / best
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Measure the batch position report encoders (messages/sec) against the scalar ones."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--rows", help="Comma separated batch sizes, default = 10000,100000,1000000", default="10000,100000,1000000")
+	parser.add_option("--scalar_rows", help="Rows encoded by the scalar loop (capped to save time), default = 100000", type="int", default=100000)
+	parser.add_option("--repeat", help="Timing runs per batch (best is kept), default = 3", type="int", default=3)
+
+	(options, args) = parser.parse_args()
+
+	print("%-5s %9s %14s %14s %8s" % ("type", "rows", "scalar msg/s", "batch msg/s", "speedup"))
+	for rows in [int(r) for r in options.rows.split(",")]:
+		f = fleet(rows)
+		for msg_type in (1, 18):
+			scalar = scalar_rate(msg_type, f, min(rows, options.scalar_rows))
+			batch = batch_rate(msg_type, f, options.repeat)
+			print("%-5d %9d %14.0f %14.0f %7.1fx" % (msg_type, rows, scalar, batch, batch/scalar))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# bench_encoder.py measures how many payloads per second AIVDM_Encoder.py generates for each supported message type.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# Usage examples:
+# $ ./benchmarks/bench_encoder.py
+# $ git show <rev>:AIVDM_Encoder.py > /tmp/AIVDM_Encoder_old.py
+# $ ./benchmarks/bench_encoder.py --baseline=/tmp/AIVDM_Encoder_old.py
+#
+
+import itertools
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+# (label, encoder function, positional args, keyword args)
+CASES = [
+	("1",   "encode_1",  (247320162, 15, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {}),
+	("4",   "encode_4",  (247320162, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {}),
+	("14",  "encode_14", (970010000, "SART ACTIVE"), {}),
+	("18",  "encode_18", (247320162, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {}),
+	("20",  "encode_20", (247320162, 100, 2, 3, 750), {}),
+	("21",  "encode_21", (247320162, 1, "BUOY 7", 9.72357833333333, 45.6910166666667, "90x14", 0), {}),
+	("22",  "encode_22", (247320162, 2087, 2088, 9.9, 45.8, 9.5, 45.5), {}),
+	("23",  "encode_23", (247320162, 9.9, 45.8, 9.5, 45.5, 1, 15), {}),
+	("24A", "encode_24", (247320162, "A"), {"__vname": "NAN"}),
+	("24B", "encode_24", (247320162, "B"), {"__callsign": "KC9CAF", "__vsize": "90x14", "__vtype": 60}),
+]
+
+# Static data messages, whose payloads AIVDM_Encoder can cache (static_cache, off by default): their cases
+# encode another MMSI on every call, without the cache. With it, their "<type> hit" rows time the same
+# message over and over, and their "<type> miss" rows another MMSI on every call.
+CACHED = ("21", "24A", "24B")
+
+
+def load_encoder(path):
+	"""Import an AIVDM_Encoder.py from an arbitrary path (e.g. an older revision)."""
+	name = "AIVDM_Encoder_" + str(abs(hash(path)))
+	try:
+		import importlib.util
+		spec = importlib.util.spec_from_file_location(name, path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		return module
+	except ImportError:
+		import imp
+		return imp.load_source(name, path)
+
+def cases():
+	"""Yield (label, encoder function, positional args, keyword args, vary_mmsi, cached) of every row:
+	CASES, then the cache hits and misses."""
+	for (label, name, args, kwargs) in CASES:
+		yield (label, name, args, kwargs, label in CACHED, False)
+	for (suffix, vary_mmsi) in ((" hit", False), (" miss", True)):
+		for (label, name, args, kwargs) in CASES:
+			if label in CACHED:
+				yield (label + suffix, name, args, kwargs, vary_mmsi, True)
+
+def use_cache(module, cached):
+	"""Empty the static payload cache of an encoder module, and turn it on or off (older revisions have none)."""
+	if hasattr(module, "static_cache"):
+		module.static_cache.clear()
+		module.static_cache.enabled = cached
+
+def rate(func, args, kwargs, number, repeat, vary_mmsi=False):
+	"""Best-of-repeat messages per second; with vary_mmsi, every call encodes the next MMSI from args[0]."""
+	if vary_mmsi:
+		mmsi = itertools.count(args[0])
+		timer = timeit.Timer(lambda: func(next(mmsi), *args[1:], **kwargs))
+	else:
+		timer = timeit.Timer(lambda: func(*args, **kwargs))
+	return number / min(timer.repeat(repeat=repeat, number=number))
+
+def run(module, number, repeat, packed=False):
+	results = {}
+	for (label, name, args, kwargs, vary_mmsi, cached) in cases():
+		if packed:
+			kwargs = dict(kwargs, packed=True)
+		use_cache(module, cached)
+		results[label] = rate(getattr(module, name), args, kwargs, number, repeat, vary_mmsi)
+	use_cache(module, False)
+	return results
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Measure AIVDM_Encoder.py throughput (messages/sec) for every supported message type."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--baseline", help="Path of another AIVDM_Encoder.py to compare against (e.g. extracted with git show)")
+	parser.add_option("--number", help="Messages per timing run, default = 20000", type="int", default=20000)
+	parser.add_option("--repeat", help="Timing runs per type (best is kept), default = 5", type="int", default=5)
+
+	(options, args) = parser.parse_args()
+
+	import AIVDM_Encoder
+	current = run(AIVDM_Encoder, options.number, options.repeat)
+	packed = run(AIVDM_Encoder, options.number, options.repeat, packed=True)
+
+	if options.baseline:
+		baseline = run(load_encoder(options.baseline), options.number, options.repeat)
+		print("%-7s %14s %14s %14s %8s" % ("type", "baseline msg/s", "bits msg/s", "packed msg/s", "speedup"))
+		for label in [c[0] for c in cases()]:
+			print("%-7s %14.0f %14.0f %14.0f %7.2fx" % (label, baseline[label], current[label], packed[label], current[label]/baseline[label]))
+	else:
+		print("%-7s %14s %14s" % ("type", "bits msg/s", "packed msg/s"))
+		for label in [c[0] for c in cases()]:
+			print("%-7s %14.0f %14.0f" % (label, current[label], packed[label]))
+
+
+if __name__ == "__main__":
+	main()
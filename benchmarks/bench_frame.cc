@@ -0,0 +1,283 @@
+/*
+ * This file is part of the AIS BlackToolkit.
+ * bench_frame.cc times the frame building steps of Build_Frame (gr-aistx/lib/ais_frame.cc) without GNU Radio.
+ *
+ * This program is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU General Public License
+ * as published by the Free Software Foundation; either version 2
+ * of the License, or (at your option) any later version.
+ *
+ * Payloads are read from stdin, one '0'/'1' string per line (as printed by AIVDM_Encoder.py).
+ * Every step is run on every payload, the way Build_Frame does it, and the results are printed
+ * as JSON on stdout: calls per second, heap bytes allocated per call and a digest of the
+ * output bits (so that two builds can be checked to produce the same frames).
+ * The steps run both on one bit per char (the reference) and on packed bits (*_packed, what
+ * Build_Frame uses); "frame" and "frame_packed" must have the same digest, else the exit
+ * status is 1.
+ *
+ * Usage example:
+ * $ g++ -O2 -Igr-aistx/lib -o bench_frame benchmarks/bench_frame.cc gr-aistx/lib/ais_frame.cc
+ * $ ./AIVDM_Encoder.py --type=1 | ./bench_frame 100000
+ */
+
+#include "ais_frame.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include <new>
+#include <vector>
+
+using namespace gr::AISTX::framing;
+
+#define LEN_PREAMBLE 24
+#define LEN_START 8
+#define LEN_CRC 16
+#define LEN_SLOT 256
+
+#define ROUNDS 5
+
+struct payload_t {
+	std::vector<char> bits;		// payload padded to 8 bits, then room for the CRC
+	int len;					// padded payload length
+	std::vector<unsigned char> bytes;	// the same, packed
+	int nbits;					// payload length
+};
+
+// Everything the steps produce is folded into sink, so that nothing is optimised away;
+// the first pass over the payloads is also recorded in digest.
+static unsigned long digest;
+static bool recording;
+volatile unsigned long sink;
+
+static void fold(const char *data, int length)
+{
+	unsigned long h = digest;
+	for (int i = 0; i < length; i++)
+		h = h*31 + (unsigned char) data[i];
+	if (recording)
+		digest = h;
+	sink = h;
+}
+
+static double now()
+{
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return ts.tv_sec + ts.tv_nsec*1e-9;
+}
+
+// Bytes requested from the heap (the frame steps themselves only use the stack)
+static unsigned long allocated;
+
+void *operator new(size_t size)
+{
+	allocated += size;
+	void *p = malloc(size);
+	if (!p)
+		throw std::bad_alloc();
+	return p;
+}
+
+void operator delete(void *p) noexcept
+{
+	free(p);
+}
+
+void operator delete(void *p, size_t) noexcept
+{
+	free(p);
+}
+
+// Frame of payload+CRC bits (already reversed), one bit per char, as Build_Frame builds it;
+// returns its length in bits.
+static int frame_bits(const char *payload, int len, char *frame)
+{
+	std::vector<char> stuffed(2*len);
+	int len_stuffed = stuff(payload, &stuffed[0], len);
+	int len_frame = LEN_PREAMBLE + LEN_START*2 + len_stuffed;
+	while (len_frame % 8 != 0)
+		len_frame++;
+	if (len_frame < frame_slots(len - LEN_CRC)*LEN_SLOT)
+		len_frame = frame_slots(len - LEN_CRC)*LEN_SLOT;
+	memset(frame, 0x0, len_frame);
+	memcpy(frame, "\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0", LEN_PREAMBLE);
+	memcpy(frame+LEN_PREAMBLE, "\0\1\1\1\1\1\1\0", LEN_START);
+	memcpy(frame+LEN_PREAMBLE+LEN_START, &stuffed[0], len_stuffed);
+	memcpy(frame+LEN_PREAMBLE+LEN_START+len_stuffed, "\0\1\1\1\1\1\1\0", LEN_START);
+	return len_frame;
+}
+
+struct result_t {
+	const char *name;
+	double calls_per_sec;
+	double heap_bytes_per_call;
+	unsigned long digest;
+};
+
+static std::vector<result_t> results;
+
+// Run step(payload) iterations times over every payload
+template <class Step>
+static void run(const char *name, std::vector<payload_t> &payloads, long iterations, Step step)
+{
+	digest = 0;
+	recording = true;
+	for (size_t p = 0; p < payloads.size(); p++)
+		step(payloads[p]);
+	recording = false;
+
+	// best of ROUNDS rounds of iterations/ROUNDS passes
+	long passes = iterations/ROUNDS > 0 ? iterations/ROUNDS : 1;
+	double calls = (double) passes*payloads.size();
+	double best = 0;
+	unsigned long heap = allocated;
+	for (int round = 0; round < ROUNDS; round++) {
+		double start = now();
+		for (long n = 0; n < passes; n++)
+			for (size_t p = 0; p < payloads.size(); p++)
+				step(payloads[p]);
+		double elapsed = now() - start;
+		if (round == 0 || elapsed < best)
+			best = elapsed;
+	}
+	result_t r = {name, calls/best, (allocated - heap)/(calls*ROUNDS), digest};
+	results.push_back(r);
+}
+
+int main(int argc, char **argv)
+{
+	long iterations = argc > 1 ? atol(argv[1]) : 100000;
+
+	std::vector<payload_t> payloads;
+	char line[4096];
+	while (fgets(line, sizeof(line), stdin)) {
+		int len = strcspn(line, "\r\n");
+		if (len == 0 || !frame_slots(len))	// empty, or longer than 5 slots
+			continue;
+		payload_t p;
+		p.len = (len + 7) & ~7;
+		p.bits.assign(p.len + LEN_CRC, 0);
+		for (int i = 0; i < len; i++)
+			p.bits[i] = line[i] - '0';
+		p.nbits = len;
+		p.bytes.assign(p.len/8 + 2, 0);
+		byte_packing(&p.bits[0], &p.bytes[0], p.len);
+		payloads.push_back(p);
+	}
+	if (payloads.empty()) {
+		fprintf(stderr, "no payloads on stdin\n");
+		return 1;
+	}
+
+	// The inputs of each step, as Build_Frame has them
+	std::vector<payload_t> framed(payloads);
+	std::vector<std::vector<char> > frames;
+	for (size_t p = 0; p < framed.size(); p++) {
+		payload_t &f = framed[p];
+		compute_crc(&f.bits[0], &f.bits[f.len], f.len);
+		reverse_bit_order(&f.bits[0], f.len + LEN_CRC);
+		std::vector<char> frame(2*(f.len + LEN_CRC) + LEN_SLOT);
+		frame.resize(frame_bits(&f.bits[0], f.len + LEN_CRC, &frame[0]));
+		frames.push_back(frame);
+	}
+	int max_frame = 0;
+	for (size_t p = 0; p < frames.size(); p++)
+		if ((int) frames[p].size() > max_frame)
+			max_frame = frames[p].size();
+	std::vector<char> work(2*max_frame + LEN_SLOT);
+	std::vector<unsigned char> bytes(2*max_frame/8 + LEN_SLOT/8);
+	// the packed inputs of the packed steps
+	for (size_t p = 0; p < framed.size(); p++) {
+		payload_t &f = framed[p];
+		f.bytes.resize(f.len/8 + 2);
+		byte_packing(&f.bits[0], &f.bytes[0], f.len + LEN_CRC);
+	}
+	std::vector<std::vector<unsigned char> > packed_frames;
+	for (size_t p = 0; p < frames.size(); p++) {
+		std::vector<unsigned char> frame(frames[p].size()/8);
+		byte_packing(&frames[p][0], &frame[0], frames[p].size());
+		packed_frames.push_back(frame);
+	}
+
+	run("compute_crc", payloads, iterations, [](payload_t &p) {
+		char crc[LEN_CRC];
+		compute_crc(&p.bits[0], crc, p.len);
+		fold(crc, LEN_CRC);
+	});
+	run("reverse_bit_order", framed, iterations, [&](payload_t &p) {
+		memcpy(&work[0], &p.bits[0], p.len + LEN_CRC);
+		reverse_bit_order(&work[0], p.len + LEN_CRC);
+		fold(&work[0], 8);
+	});
+	run("stuff", framed, iterations, [&](payload_t &p) {
+		int l = stuff(&p.bits[0], &work[0], p.len + LEN_CRC);
+		fold(&work[l - 8], 8);
+	});
+	size_t k = 0;
+	run("nrz_to_nrzi", framed, iterations, [&](payload_t &) {
+		std::vector<char> &f = frames[k++ % frames.size()];
+		memcpy(&work[0], &f[0], f.size());
+		nrz_to_nrzi(&work[0], f.size());
+		fold(&work[f.size() - 8], 8);
+	});
+	k = 0;
+	run("byte_packing", framed, iterations, [&](payload_t &) {
+		std::vector<char> &f = frames[k++ % frames.size()];
+		byte_packing(&f[0], &bytes[0], f.size());
+		fold((const char *) &bytes[0], 1);
+	});
+	run("frame", payloads, iterations, [&](payload_t &p) {
+		// the whole chain: CRC, bit reversal, stuffing, flags, NRZI, bytes
+		std::vector<char> bits(p.bits);
+		compute_crc(&bits[0], &bits[p.len], p.len);
+		reverse_bit_order(&bits[0], p.len + LEN_CRC);
+		int l = frame_bits(&bits[0], p.len + LEN_CRC, &work[0]);
+		nrz_to_nrzi(&work[0], l);
+		byte_packing(&work[0], &bytes[0], l);
+		fold((const char *) &bytes[0], l/8);
+	});
+
+
+	run("crc16", payloads, iterations, [](payload_t &p) {
+		unsigned short crc = crc16(&p.bytes[0], p.len/8);
+		fold((const char *) &crc, sizeof(crc));
+	});
+	run("reverse_bytes", framed, iterations, [&](payload_t &p) {
+		memcpy(&bytes[0], &p.bytes[0], p.len/8 + 2);
+		reverse_bytes(&bytes[0], p.len/8 + 2);
+		fold((const char *) &bytes[0], 1);
+	});
+	run("stuff_packed", framed, iterations, [&](payload_t &p) {
+		int l = stuff_packed(&p.bytes[0], p.len/8 + 2, &bytes[0]);
+		fold((const char *) &bytes[(l - 8)/8], 1);
+	});
+	k = 0;
+	run("nrzi_packed", framed, iterations, [&](payload_t &) {
+		std::vector<unsigned char> &f = packed_frames[k++ % packed_frames.size()];
+		memcpy(&bytes[0], &f[0], f.size());
+		nrzi_packed(&bytes[0], f.size());
+		fold((const char *) &bytes[f.size() - 1], 1);
+	});
+	run("frame_packed", payloads, iterations, [&](payload_t &p) {
+		// the whole chain on packed bits, as Build_Frame builds it
+		int l = frame_packed(&p.bytes[0], p.nbits, &bytes[0], true);
+		fold((const char *) &bytes[0], l/8);
+	});
+
+	printf("{\"payloads\": %d, \"iterations\": %ld, \"steps\": {", (int) payloads.size(), iterations);
+	for (size_t i = 0; i < results.size(); i++)
+		printf("%s\"%s\": {\"calls_per_sec\": %.0f, \"heap_bytes_per_call\": %.1f, \"digest\": \"%016lx\"}",
+			i ? ", " : "", results[i].name, results[i].calls_per_sec, results[i].heap_bytes_per_call, results[i].digest);
+	printf("}}\n");
+
+	for (size_t i = 0; i < results.size(); i++)
+		for (size_t j = 0; j < results.size(); j++)
+			if (!strcmp(results[i].name, "frame") && !strcmp(results[j].name, "frame_packed") && results[i].digest != results[j].digest) {
+				fprintf(stderr, "frame_packed does not build the same frames as frame\n");
+				return 1;
+			}
+	return 0;
+}
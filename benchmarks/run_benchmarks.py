@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+#
+# This script is part of the AIS BlackToolkit.
+# run_benchmarks.py runs the whole benchmark suite and stores the results as JSON, to compare commits.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# Measured, without any radio hardware nor GNU Radio:
+#  - encoder:  every encode_* function (and the batch encoders when NumPy is there), messages/sec
+#              and peak heap bytes while encoding one message (tracemalloc, python 3 only)
+#  - armor:    NMEA armoring, AIVDM_Armor.py in process, unpacker.c spawned once per payload and
+#              unpacker.c reading every payload from stdin ('0'/'1' lines, then packed records)
+#  - frame:    the Build_Frame steps (gr-aistx/lib/ais_frame.cc) through benchmarks/bench_frame.cc,
+#              calls/sec, heap bytes per call and a digest of the frames built, one bit per char
+#              and packed (the run fails if the two do not build the same frames)
+# C/C++ sources are compiled with $CXX (default g++); a part that cannot be built is skipped.
+#
+# Usage examples:
+# $ ./benchmarks/run_benchmarks.py --output=before.json
+# $ ./benchmarks/run_benchmarks.py --output=after.json --compare=before.json
+#
+
+import binascii
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH, os.pardir)
+sys.path.insert(0, ROOT)
+
+import AIVDM_Armor
+import AIVDM_Encoder
+import bench_armor
+import bench_encoder
+
+try:
+	import tracemalloc
+except ImportError:	# python 2
+	tracemalloc = None
+
+# Payloads framed by bench_frame: single slot (168 bits), a long type 21 (2 slots) and a long
+# safety message (type 14, 4 slots)
+FRAME_PAYLOADS = [
+	AIVDM_Encoder.encode_1(247320162, 15, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38),
+	AIVDM_Encoder.encode_18(247320162, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38),
+	AIVDM_Encoder.encode_24(247320162, "B", __callsign="KC9CAF"),
+	AIVDM_Encoder.encode_21(247320162, 1, "A VERY LONG AID TO NAVIGATION NAME", 9.72357833333333, 45.6910166666667, "90x14", 0),
+	AIVDM_Encoder.encode_14(247320162, "SECURITE SECURITE SECURITE ALL SHIPS IN THE AREA OF THE HARBOUR ENTRANCE KEEP CLEAR "
+		"OF THE DREDGER AT WORK AND PROCEED WITH CAUTION AT REDUCED SPEED"),
+]
+
+
+def peak_bytes(func, args=(), kwargs={}):
+	"""Peak heap bytes allocated while running func once (None without tracemalloc)."""
+	if tracemalloc is None:
+		return None
+	func(*args, **kwargs)		# warm up caches
+	tracemalloc.start()
+	try:
+		before = tracemalloc.get_traced_memory()[0]
+		func(*args, **kwargs)
+		return tracemalloc.get_traced_memory()[1] - before
+	finally:
+		tracemalloc.stop()
+
+def bench_encoders(number, repeat):
+	results = {}
+	for (label, name, args, kwargs, vary_mmsi, cached) in bench_encoder.cases():
+		func = getattr(AIVDM_Encoder, name)
+		bench_encoder.use_cache(AIVDM_Encoder, cached)
+		results[label] = {
+			"msgs_per_sec": bench_encoder.rate(func, args, kwargs, number, repeat, vary_mmsi),
+			"packed_msgs_per_sec": bench_encoder.rate(func, args, dict(kwargs, packed=True), number, repeat, vary_mmsi),
+			"peak_bytes_per_msg": peak_bytes(func, args, kwargs),
+		}
+	bench_encoder.use_cache(AIVDM_Encoder, False)
+
+	if AIVDM_Encoder.numpy is not None:
+		import numpy
+		rows = 100000
+		rng = numpy.random.RandomState(0)
+		columns = (rng.randint(200000000, 780000000, rows), rng.randint(0, 1023, rows)/10.0, rng.uniform(-180, 180, rows),
+			rng.uniform(-90, 90, rows), rng.randint(0, 3600, rows)/10.0, rng.randint(0, 60, rows))
+		for (label, func, args) in (("1_batch", AIVDM_Encoder.encode_1_batch, columns[:1] + (rng.randint(0, 16, rows),) + columns[1:]),
+				("18_batch", AIVDM_Encoder.encode_18_batch, columns)):
+			best = min(timed(func, args) for i in range(repeat))
+			peak = peak_bytes(func, args)
+			results[label] = {"msgs_per_sec": rows / best, "peak_bytes_per_msg": peak / float(rows) if peak is not None else None}
+	return results
+
+def timed(func, args):
+	start = time.time()
+	func(*args)
+	return time.time() - start
+
+def bench_armoring(workdir, count, c_samples):
+	data = bench_armor.payloads(count)
+	armorer = AIVDM_Armor.Armorer("A")
+	def armor_all():
+		for (payload, length) in data:
+			armorer.sentences(payload, length)
+	best = min(timed(armor_all, ()) for i in range(3))
+	results = {"AIVDM_Armor": {
+		"sentences_per_sec": len(data) / best,
+		"peak_bytes_per_msg": peak_bytes(armorer.sentences, data[0]),
+	}}
+
+	binary = bench_armor.build_unpacker(workdir)
+	if binary is None:
+		sys.stderr.write("unpacker.c cannot be built, skipped\n")
+		return results
+	bits = [AIVDM_Encoder.render_bits(int(binascii.hexlify(p), 16) >> (8*len(p) - n), n) for (p, n) in data[:c_samples]]
+	devnull = open(os.devnull, "w")
+	max_rss = 0
+	start = time.time()
+	for b in bits:
+		proc = subprocess.Popen([binary, b, "1", "A"], stdout=devnull)
+		(pid, proc.returncode, usage) = os.wait4(proc.pid, 0)
+		max_rss = max(max_rss, usage.ru_maxrss)
+	elapsed = time.time() - start
+	devnull.close()
+	results["unpacker.c"] = {
+		"sentences_per_sec": len(bits) / elapsed,
+		"max_rss_kb": max_rss,
+	}
+
+	# batch modes: every payload through one process
+	lines = "".join(AIVDM_Encoder.render_bits(int(binascii.hexlify(p), 16) >> (8*len(p) - n), n) + "\n" for (p, n) in data).encode("ascii")
+	records = b"".join(AIVDM_Encoder.packed_record(p, n) for (p, n) in data)
+	for (label, mode, stdin) in (("unpacker.c -", "-", lines), ("unpacker.c -b", "-b", records)):
+		(elapsed, usage) = run_batch([binary, mode, "1", "A"], stdin, workdir)
+		results[label] = {
+			"sentences_per_sec": len(data) / elapsed,
+			"max_rss_kb": usage.ru_maxrss,
+		}
+	return results
+
+def run_batch(args, stdin, workdir):
+	"""Run args once with stdin (bytes) from a file and its output discarded; return (seconds, rusage)."""
+	path = os.path.join(workdir, "stdin")
+	with open(path, "wb") as f:
+		f.write(stdin)
+	with open(path, "rb") as f:
+		devnull = open(os.devnull, "w")
+		start = time.time()
+		proc = subprocess.Popen(args, stdin=f, stdout=devnull)
+		(pid, proc.returncode, usage) = os.wait4(proc.pid, 0)
+		elapsed = time.time() - start
+		devnull.close()
+	return (elapsed, usage)
+
+def bench_frames(workdir, iterations):
+	binary = os.path.join(workdir, "bench_frame")
+	cxx = os.environ.get("CXX", "g++")
+	lib = os.path.join(ROOT, "gr-aistx", "lib")
+	try:
+		subprocess.check_call([cxx, "-O2", "-I", lib, "-o", binary, os.path.join(BENCH, "bench_frame.cc"), os.path.join(lib, "ais_frame.cc")])
+	except (OSError, subprocess.CalledProcessError):
+		sys.stderr.write("bench_frame.cc cannot be built, skipped\n")
+		return {}
+	proc = subprocess.Popen([binary, str(iterations)], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+	out = proc.communicate("\n".join(FRAME_PAYLOADS).encode("ascii") + b"\n")[0]
+	if proc.returncode:
+		sys.exit("bench_frame.cc failed")
+	return json.loads(out.decode("ascii"))["steps"]
+
+
+def metadata():
+	meta = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform()}
+	try:
+		devnull = open(os.devnull, "w")
+		meta["commit"] = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=devnull).decode("ascii").strip()
+		if subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT, stderr=devnull):
+			meta["commit"] += "-dirty"
+		devnull.close()
+	except (OSError, subprocess.CalledProcessError):
+		meta["commit"] = None
+	return meta
+
+def compare(old, new, threshold):
+	"""Print every measurement of new against old; return the number of regressions beyond threshold."""
+	regressions = 0
+	for part in ("encoder", "armor", "frame"):
+		for (name, metrics) in sorted(new.get(part, {}).items()):
+			before = old.get(part, {}).get(name, {})
+			for (metric, value) in sorted(metrics.items()):
+				was = before.get(metric)
+				if value is None or was is None:
+					continue
+				if metric == "digest":
+					if value != was:
+						regressions += 1
+						print("%-6s %-18s %-20s output changed (%s -> %s)  <-- CHANGED" % (part, name, metric, was, value))
+					continue
+				ratio = value / float(was) if was else (1.0 if value == was else float("inf"))
+				worse = ratio < 1 - threshold if metric.endswith("per_sec") else ratio > 1 + threshold
+				regressions += worse
+				print("%-6s %-18s %-20s %14.1f -> %14.1f  %6.2fx%s" % (part, name, metric, was, value, ratio, "  <-- REGRESSION" if worse else ""))
+	return regressions
+
+
+def main():
+	from optparse import OptionParser
+
+	desc="""Run the benchmark suite (encoder, NMEA armoring, frame building) and write the results as JSON."""
+
+	parser = OptionParser(description=desc)
+	parser.add_option("--output", help="JSON file the results are written to, default = stdout")
+	parser.add_option("--compare", help="JSON results of an earlier run: print the ratios and exit 1 on regressions")
+	parser.add_option("--threshold", help="Relative change reported as a regression, default = 0.1 (10%)", type="float", default=0.1)
+	parser.add_option("--only", help="Comma separated parts to run (encoder,armor,frame), default = all", default="encoder,armor,frame")
+	parser.add_option("--quick", help="Fewer iterations: a smoke test, not a measurement", action="store_true")
+
+	(options, args) = parser.parse_args()
+	parts = options.only.split(",")
+	scale = 10 if options.quick else 1
+
+	results = {"meta": metadata()}
+	workdir = tempfile.mkdtemp()
+	try:
+		if "encoder" in parts:
+			results["encoder"] = bench_encoders(20000 // scale, 5 if not options.quick else 1)
+		if "armor" in parts:
+			results["armor"] = bench_armoring(workdir, 200000 // scale, 1000 // scale)
+		if "frame" in parts:
+			results["frame"] = bench_frames(workdir, 200000 // scale)
+	finally:
+		shutil.rmtree(workdir)
+
+	text = json.dumps(results, indent=1, sort_keys=True)
+	if options.output:
+		with open(options.output, "w") as f:
+			f.write(text + "\n")
+	else:
+		print(text)
+
+	if options.compare:
+		with open(options.compare) as f:
+			old = json.load(f)
+		print("compared with %s (commit %s)" % (options.compare, old.get("meta", {}).get("commit")))
+		if compare(old, results, options.threshold):
+			sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -23,7 +23,9 @@
 #define INCLUDED_AISTX_BUILD_FRAME_H
 
 #include <AISTX/api.h>
+#include <AISTX/trace.h>
 #include <gnuradio/sync_block.h>
+#include <vector>
 
 namespace gr {
   namespace AISTX {
@@ -38,19 +40,101 @@ namespace gr {
      public:
       typedef boost::shared_ptr<Build_Frame> sptr;
 
+      //! What a full payload queue does with one more payload
+      enum queue_policy_t {
+        DROP_NEWEST = 0,	//!< the new payload is dropped
+        DROP_OLDEST = 1		//!< the oldest queued payload is dropped to make room
+      };
+
       /*!
-       * \brief Builds an AIS Frame of 256 bytes.
+       * \brief Builds an AIS Frame of 1 to 5 slots (256 bits each).
        *
        * This module does, in order:
        * 1. Payload (NMEA sentence) encoding (6 bits per ASCII)
        * 2. CRC generation [16]
        * 3. Reverse bit order (payload + crc)
        * 4. Stuffing (payload + crc)
-       * 5. Headers (Preamble [24], Start [8], Trailer [8], 0x00 Padding)
+       * 5. Headers (Preamble [24], Start [8], Trailer [8], 0x00 Padding to the end of the slots)
        * 6. NRZI conversion (enabled by default)
        *
+       * A payload of up to 168 bits takes 1 slot, 440 bits 2, 696 bits 3, 952 bits 4 and
+       * 1008 bits 5 (ITU-R M.1371); longer payloads are rejected.
+       *
+       * More payloads can be sent to the "payload" message port while the flow graph runs.
+       * A message is the payload, either a symbol of '0'/'1' characters (as printed by
+       * AIVDM_Encoder.py) or a u8vector of packed bytes, or a PDU (metadata dict . payload).
+       * Metadata keys:
+       * - nbits: payload length in bits of a u8vector, default = 8 bits per byte
+       * - channel: AIS channel ("A" or "B"), tagged on the first byte of the frame
+       * - time: transmission time in seconds (UNIX time), tagged as tx_time for the UHD sink
+       * Other keys are tagged as they are. Payloads are framed on arrival and queued; queued
+       * frames are sent in order, before the repeated one. Without repeat the block is done when
+       * nothing is left to send; with an empty sentence it only sends what comes on the port and
+       * never finishes.
+       *
+       * The "room" message port gives the payload source credits: a message for every payload
+       * the queue can take, queue_size() of them when the flow graph starts, then one each time
+       * a payload leaves the queue, is dropped or is rejected. A source that posts one payload per
+       * credit never overflows the queue and never waits in the scheduler (see AiS_TX.py).
+       *
+       * Frames are paced without blocking the scheduler: a frame starts when it is due, either
+       * interval() seconds after the previous one (0.1 s by default, 0 to send them back to back)
+       * or on the AIS slots of set_slot_schedule(). Until then work() produces nothing.
        */
       static sptr make(const char *sentence, bool repeat, bool enable_NRZI);
+
+      /*!
+       * \brief Same, for a packed payload instead of a '0'/'1' string.
+       *
+       * \param payload the payload bits, MSB first, zero padded to a whole byte
+       *                (the record written by AIVDM_Encoder.py --packed, without its 2 bytes bit count)
+       * \param nbits   payload length in bits
+       */
+      static sptr make(const std::vector<unsigned char> &payload, int nbits, bool repeat, bool enable_NRZI);
+
+      //! Frames the payload queue holds at most (default 64)
+      virtual void set_queue_size(int queue_size) = 0;
+      virtual int queue_size() const = 0;
+      //! What a full queue does with a new payload (a queue_policy_t, default DROP_NEWEST)
+      virtual void set_queue_policy(int policy) = 0;
+      virtual int queue_policy() const = 0;
+
+      //! Frames waiting in the queue
+      virtual int queue_depth() const = 0;
+      //! Highest queue_depth() so far
+      virtual int queue_high_water() const = 0;
+      //! Payloads queued, dropped by the queue policy and rejected (not a valid payload) so far
+      virtual unsigned long frames_queued() const = 0;
+      virtual unsigned long frames_dropped() const = 0;
+      virtual unsigned long frames_rejected() const = 0;
+      //! Frames sent so far
+      virtual unsigned long frames_sent() const = 0;
+
+      //! Seconds from the start of a frame to the start of the next one, 0 = back to back
+      virtual void set_interval(double interval) = 0;
+      virtual double interval() const = 0;
+      /*!
+       * \brief Start the frames on AIS slots (2250 per UTC minute) instead of every interval():
+       * slot first_slot of every minute, then every increment slots. An increment of 0
+       * goes back to interval().
+       */
+      virtual void set_slot_schedule(int first_slot, int increment) = 0;
+      virtual int slot_increment() const = 0;
+
+      //! Mean and standard deviation (jitter) of the measured frame intervals, in seconds
+      virtual double frame_interval_mean() const = 0;
+      virtual double frame_interval_jitter() const = 0;
+      //! Latest a frame started after it was due so far, in seconds
+      virtual double frame_max_lateness() const = 0;
+      virtual void reset_frame_interval_stats() = 0;
+
+      //! What goes to the logger of the block (a trace_level_t, default TRACE_OFF)
+      virtual void set_trace_level(int level) = 0;
+      virtual int trace_level() const = 0;
+      //! Frames built, bits inserted by stuffing and bytes output so far (lock free, cheap to poll)
+      virtual unsigned long frames_built() const = 0;
+      virtual unsigned long bits_stuffed() const = 0;
+      virtual unsigned long bytes_out() const = 0;
     };
 
   } // namespace AISTX
@@ -23,6 +23,7 @@
 #define INCLUDED_AISTX_DEBUGME_H
 
 #include <AISTX/api.h>
+#include <AISTX/trace.h>
 #include <gnuradio/blocks/null_source.h>
 
 
@@ -43,9 +44,16 @@ namespace gr {
       /*!
        * \brief Print the incoming BYTE sequence as sequence of HEXs
        *
-       * Goes through the incoming sequence (const char *in) and prints it in HEXs
+       * Goes through the incoming sequence (const char *in) and prints it in HEXs,
+       * to the logger of the block at TRACE_INFO
        */
       static sptr make(size_t itemsize);
+
+      //! What goes to the logger of the block (a trace_level_t, default TRACE_OFF)
+      virtual void set_trace_level(int level) = 0;
+      virtual int trace_level() const = 0;
+      //! Items received so far (lock free, cheap to poll)
+      virtual unsigned long items_in() const = 0;
     };
 
   } // namespace AISTX
@@ -23,6 +23,7 @@
 #define INCLUDED_AISTX_NRZ_TO_NRZI_H
 
 #include <AISTX/api.h>
+#include <AISTX/trace.h>
 #include <gnuradio/blocks/null_source.h>
 
 namespace gr {
@@ -45,6 +46,12 @@ namespace gr {
        *
        */
       static sptr make();
+
+      //! What goes to the logger of the block (a trace_level_t, default TRACE_OFF)
+      virtual void set_trace_level(int level) = 0;
+      virtual int trace_level() const = 0;
+      //! Bits output so far (lock free, cheap to poll)
+      virtual unsigned long items_out() const = 0;
     };
 
   } // namespace AISTX
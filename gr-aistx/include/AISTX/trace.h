@@ -0,0 +1,45 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+
+#ifndef INCLUDED_AISTX_TRACE_H
+#define INCLUDED_AISTX_TRACE_H
+
+namespace gr {
+  namespace AISTX {
+
+    /*!
+     * \brief Trace levels of the AISTX blocks (set_trace_level), quietest first.
+     * \ingroup AISTX
+     *
+     * Traces go through the GNU Radio logger of the block, at most
+     * 20 messages per second; the default level is TRACE_OFF.
+     */
+    enum trace_level_t {
+      TRACE_OFF = 0,	//!< nothing
+      TRACE_WARN = 1,	//!< what went wrong (e.g. payloads dropped)
+      TRACE_INFO = 2,	//!< a line per frame or per call, summaries
+      TRACE_DEBUG = 3	//!< the bits themselves
+    };
+
+  } // namespace AISTX
+} // namespace gr
+
+#endif /* INCLUDED_AISTX_TRACE_H */
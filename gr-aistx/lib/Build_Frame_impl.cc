@@ -24,21 +24,28 @@
 
 #include <gnuradio/io_signature.h>
 #include "Build_Frame_impl.h"
+#include "ais_frame.h"
 
 #include <stdio.h>	
 #include <stdlib.h>	
 #include <string.h>
+#include <math.h>
+#include <algorithm>
+#include <stdexcept>
+
+#include <boost/bind.hpp>
 
 #define LEN_PREAMBLE 24
 #define LEN_START 8
 #define LEN_CRC 16
 #define LEN_FRAME_MAX 256
 
+#define SLOTS_PER_MINUTE 2250
+#define SLOT_USEC (60e6/SLOTS_PER_MINUTE)
+
 #define PREAMBLE_MARK 101010101010101010101010 (24 bits)
 #define START_MARK 01111110	(8 bits)
 
-#define DEBUG 0
-
 namespace gr {
   namespace AISTX {
 
@@ -49,8 +56,15 @@ namespace gr {
         (new Build_Frame_impl(sentence, repeat, enable_NRZI));
     }
 
+    Build_Frame::sptr
+    Build_Frame::make(const std::vector<unsigned char> &payload, int nbits, bool repeat, bool enable_NRZI)
+    {
+      return gnuradio::get_initial_sptr
+        (new Build_Frame_impl(payload, nbits, repeat, enable_NRZI));
+    }
+
     /*
-     * The private constructor
+     * The private constructors
      */
     Build_Frame_impl::Build_Frame_impl(const char *sentence, bool repeat, bool enable_NRZI)
       : gr::sync_block("Build_Frame",
@@ -59,412 +73,580 @@ namespace gr {
 		      d_repeat(repeat),
 		      d_enable_NRZI(enable_NRZI)
     {
-		unsigned short REMAINDER_TO_EIGHT, PADDING_TO_EIGHT;	// to pad the payload to a multiple of 8
-    
-		LEN_PAYLOAD = strlen(sentence);
-		if (LEN_PAYLOAD>168)
-			printf ("Frame padding disabled. Multiple packets.\n");
-
-		// IMPORTANT
-		REMAINDER_TO_EIGHT = LEN_PAYLOAD%8;
-		if (REMAINDER_TO_EIGHT==0) {
-			payload = (char *) malloc(LEN_PAYLOAD + LEN_CRC);
-			// nb. It comes in in ASCII
-			for (int i=0; i<LEN_PAYLOAD; i++)
-				payload[i]=sentence[i]-48;	
+		init_port();
+		// nb. It comes in in ASCII
+		int length = strlen(sentence);
+		if (length == 0) {	// payloads come from the port only
+			d_stream = true;
+			return;
 		}
-		else if (REMAINDER_TO_EIGHT>0){
+		std::vector<unsigned char> packed((length + 7)/8, 0x0);
+		for (int i=0; i<length; i++)
+			packed[i >> 3] |= ((sentence[i]-48) & 0x01) << (7 - (i & 7));
+		set_payload(&packed[0], length, d_frame);
+		d_pending = true;
+    }
+
+    Build_Frame_impl::Build_Frame_impl(const std::vector<unsigned char> &packed, int nbits, bool repeat, bool enable_NRZI)
+      : gr::sync_block("Build_Frame",
+		      gr::io_signature::make(0, 0, 0),
+		      gr::io_signature::make(1, 1, sizeof(unsigned char))),
+		      d_repeat(repeat),
+		      d_enable_NRZI(enable_NRZI)
+    {
+		if (nbits <= 0 || (size_t) (nbits + 7)/8 > packed.size())
+			throw std::invalid_argument("Build_Frame: the packed payload holds less than nbits bits");
+		init_port();
+		// already binary: no ASCII to convert
+		set_payload(&packed[0], nbits, d_frame);
+		d_pending = true;
+    }
 
-		 	PADDING_TO_EIGHT = 8-REMAINDER_TO_EIGHT;		
-			payload = (char *) malloc(LEN_PAYLOAD + PADDING_TO_EIGHT + LEN_CRC);
+	// State shared by both constructors, and the payload port
+	void Build_Frame_impl::init_port()
+	{
+		d_stream = false;
+		d_meta = pmt::PMT_NIL;
+		d_sent = 0;
+		d_pending = false;
+		d_repeating = false;
+		d_queue_size = 64;
+		d_queue_policy = DROP_NEWEST;
+		d_stopping = false;
+		d_running = false;
+		d_withheld = 0;
+		d_high_water = 0;
+		d_queued = d_dropped = d_rejected = d_frames_sent = 0;
+		d_interval = 0.1;
+		d_first_slot = 0;
+		d_slot_increment = 0;
+		d_intervals = 0;
+		d_interval_mean = d_interval_m2 = d_max_lateness = 0;
+		d_frames_built = d_bits_stuffed = d_bytes_out = 0;
+		// buffers for the longest payload, once: frames are built and queued without allocating
+		d_frame.reserve(framing::frame_max_bytes(framing::MAX_PAYLOAD));
+		d_packed.reserve(framing::MAX_PAYLOAD/8);
+		d_spare.reserve(d_queue_size + 1);
+
+		message_port_register_in(pmt::mp("payload"));
+		set_msg_handler(pmt::mp("payload"), boost::bind(&Build_Frame_impl::handle_payload, this, _1));
+		// credits for the payload port: one per payload the queue can take
+		message_port_register_out(pmt::mp("room"));
+		// wake-up calls of the pacer, see pace()
+		message_port_register_in(pmt::mp("pace"));
+		set_msg_handler(pmt::mp("pace"), boost::bind(&Build_Frame_impl::handle_pace, this, _1));
+	}
 
-			for (int i=0; i<LEN_PAYLOAD; i++)
-				payload[i]=sentence[i]-48;		
+	// Build the whole frame of a packed payload once, into byte_frame: work() only copies it out
+	void Build_Frame_impl::set_payload(const unsigned char *payload, int length, std::vector<unsigned char> &byte_frame)
+	{
+		int slots = framing::frame_slots(length);
+		if (length <= 0 || !slots)
+			throw std::invalid_argument("Build_Frame: payloads go from 1 to 1008 bits (5 slots)");
+		LEN_PAYLOAD = length;
+		if (slots > 1)
+			AISTX_DEBUG(d_trace, d_logger, "Payload of " << LEN_PAYLOAD << " bits: a frame of " << slots << " slots");
+		if (LEN_PAYLOAD%8)
+			AISTX_DEBUG(d_trace, d_logger, "Detected a payload which is *not* multiple of 8 (" << LEN_PAYLOAD << " bits). Padding with "
+				<< 8-LEN_PAYLOAD%8 << " bits to " << (LEN_PAYLOAD+7)/8*8);
+		AISTX_DEBUG(d_trace, d_logger, "Payload = " << framing::bits_string(payload, LEN_PAYLOAD));
+
+		// padding to 8 bits, CRC, bit reversal, stuffing, headers, padding to the slots and NRZI (when
+		// enabled) on packed bits (see ais_frame.cc); byte_frame keeps its storage when it is large enough
+		int stuffed;
+		byte_frame.resize(framing::frame_max_bytes(LEN_PAYLOAD));
+		int LEN_FRAME = framing::frame_packed(payload, LEN_PAYLOAD, &byte_frame[0], d_enable_NRZI, &stuffed);
+		byte_frame.resize(LEN_FRAME/8);
+		d_frames_built++;
+		d_bits_stuffed += stuffed;
+
+		AISTX_DEBUG(d_trace, d_logger, "Frame (NRZI " << (d_enable_NRZI ? "enabled" : "disabled") << ") = " << framing::bits_string(&byte_frame[0], LEN_FRAME));
+	}
 
-			printf ("Detected a payload which is *not* multiple of 8 (%d bits). Padding with %d bits to %d\n", LEN_PAYLOAD, PADDING_TO_EIGHT, LEN_PAYLOAD + PADDING_TO_EIGHT);
-			memset (payload + LEN_PAYLOAD, 0x0, PADDING_TO_EIGHT);
-			
-			LEN_PAYLOAD += PADDING_TO_EIGHT;	// update PAYLOAD LENGHT
+	// Payload port: frame the payload of a message and queue it
+	void Build_Frame_impl::handle_payload(pmt::pmt_t msg)
+	{
+		pmt::pmt_t meta = pmt::PMT_NIL;
+		pmt::pmt_t data = msg;
+		if (pmt::is_pair(msg)) {	// PDU
+			meta = pmt::car(msg);
+			data = pmt::cdr(msg);
 		}
 
-		dump_buffer(payload, LEN_PAYLOAD);
+		const unsigned char *packed = NULL;
+		long nbits = 0;
+		if (pmt::is_symbol(data)) {
+			const std::string &sentence = pmt::symbol_to_string(data);
+			if (sentence.size() <= (size_t) framing::MAX_PAYLOAD) {
+				d_packed.assign((sentence.size() + 7)/8, 0x0);
+				for (nbits=0; nbits<(long) sentence.size(); nbits++) {
+					if (sentence[nbits] != '0' && sentence[nbits] != '1') {
+						nbits = 0;
+						break;
+					}
+					d_packed[nbits >> 3] |= (sentence[nbits]-48) << (7 - (nbits & 7));
+				}
+				if (nbits)
+					packed = &d_packed[0];
+			}
+			else
+				nbits = sentence.size();
+		}
+		else if (pmt::is_u8vector(data)) {
+			size_t len;
+			packed = pmt::u8vector_elements(data, len);
+			pmt::pmt_t n = pmt::is_dict(meta) ? pmt::dict_ref(meta, pmt::mp("nbits"), pmt::PMT_NIL) : pmt::PMT_NIL;
+			if (pmt::is_null(n))
+				nbits = len*8;
+			else if (pmt::is_integer(n))
+				nbits = pmt::to_long(n);
+			if ((size_t) (nbits + 7)/8 > len)
+				nbits = 0;
+		}
 
-		// crc 
-		char crc[16];	// 2 gnuradio bytes of CRC		
-		char input_crc[LEN_PAYLOAD];
-		memcpy (input_crc, payload, LEN_PAYLOAD);
-		compute_crc (input_crc, crc, LEN_PAYLOAD);	
-		memcpy (payload+LEN_PAYLOAD, crc, LEN_CRC);
+		if (nbits <= 0 || nbits > framing::MAX_PAYLOAD) {
+			if (nbits > 0)
+				AISTX_WARN(d_trace, d_logger, "payload of " << nbits << " bits, longer than 5 slots, dropped");
+			else
+				AISTX_WARN(d_trace, d_logger, "not a payload, dropped: " << pmt::write_string(msg));
+			{
+				gr::thread::scoped_lock lock(d_mutex);
+				d_rejected++;
+			}
+			room(1);
+			return;
+		}
 
-		// reverse
-		reverse_bit_order (payload, LEN_PAYLOAD+LEN_CRC);
+		// in the storage of a frame already sent, if any
+		std::vector<unsigned char> frame;
+		{
+			gr::thread::scoped_lock lock(d_mutex);
+			if (!d_spare.empty()) {
+				frame.swap(d_spare.back());
+				d_spare.pop_back();
+			}
+		}
+		frame.reserve(framing::frame_max_bytes(framing::MAX_PAYLOAD));
+		set_payload(packed, nbits, frame);
+		enqueue(frame, meta);
+	}
 
-    }
+	// Queue a frame (taken from frame), or apply the queue policy when full
+	void Build_Frame_impl::enqueue(std::vector<unsigned char> &frame, pmt::pmt_t meta)
+	{
+		int dropped = 0;
+		{
+			gr::thread::scoped_lock lock(d_mutex);
+			while (d_queue.size() >= d_queue_size) {
+				dropped++;
+				d_dropped++;
+				if (d_queue_policy == DROP_OLDEST) {
+					recycle(d_queue.front().frame);
+					d_queue.pop_front();
+				}
+				else {
+					recycle(frame);
+					break;
+				}
+			}
+			if (d_queue_policy == DROP_OLDEST || !dropped) {
+				d_queue.push_back(queued_frame());
+				d_queue.back().frame.swap(frame);
+				d_queue.back().meta = meta;
+				d_queued++;
+				d_high_water = std::max(d_high_water, d_queue.size());
+			}
+		}
+		// the credit of a dropped payload goes back
+		room(dropped);
+	}
 
-    /*
-     * Our virtual destructor.
-     */
-    Build_Frame_impl::~Build_Frame_impl()
-    {
-    }
+	// Tell the payload source that the queue can take n more payloads, but for the credits
+	// withheld since the queue got smaller
+	void Build_Frame_impl::room(int n)
+	{
+		{
+			gr::thread::scoped_lock lock(d_mutex);
+			int withheld = std::min(n, d_withheld);
+			d_withheld -= withheld;
+			n -= withheld;
+		}
+		for (int i = 0; i < n; i++)
+			message_port_pub(pmt::mp("room"), pmt::PMT_T);
+	}
 
+	// Keep the storage of a frame (taken from frame) for a next one, with d_mutex held
+	void Build_Frame_impl::recycle(std::vector<unsigned char> &frame)
+	{
+		if (d_spare.size() > d_queue_size)
+			return;
+		d_spare.push_back(std::vector<unsigned char>());
+		d_spare.back().swap(frame);
+	}
 
-	void Build_Frame_impl::dump_buffer(const char *b, int buffer_size)
-	{		
-		int k = 0;
-	  	for(; k < buffer_size; k++)
-			printf("%d", b[k]);
-	  	printf("\n");
+	// Nothing to do: the message itself gets work() called again
+	void Build_Frame_impl::handle_pace(pmt::pmt_t msg)
+	{
 	}
 
-	// buffer must have length >= sizeof(int) + 1
-	// Write to the buffer backwards so that the binary representation
-	// is in the correct order i.e.  the LSB is on the far right
-	// instead of the far left of the printed string
-	char * Build_Frame_impl::int2bin(int a, char *buffer, int buf_size) {
-		buffer += (buf_size - 1);
+	// Pacer thread: when work() has a frame that is not due yet it produces nothing, and the
+	// scheduler waits for a message before calling it again. The pacer posts one when it is due.
+	void Build_Frame_impl::pace()
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		while (!d_stopping) {
+			if (d_wake.is_not_a_date_time())
+				d_pace.wait(lock);
+			else if (boost::posix_time::microsec_clock::universal_time() < d_wake)
+				d_pace.timed_wait(lock, d_wake);
+			else {
+				d_wake = boost::posix_time::not_a_date_time;
+				lock.unlock();
+				_post(pmt::mp("pace"), pmt::PMT_T);
+				lock.lock();
+			}
+		}
+	}
 
-		for (int i = 31; i >= 0; i--) {
-		    *buffer-- = (a & 1) + '0';
+	// First slot of the schedule starting at or after a time (slots are counted from the UTC minute)
+	boost::posix_time::ptime Build_Frame_impl::next_slot(boost::posix_time::ptime after) const
+	{
+		boost::posix_time::time_duration t = after.time_of_day();
+		boost::posix_time::ptime minute(after.date(), boost::posix_time::time_duration(t.hours(), t.minutes(), 0));
+		int slot = (int) ceil((after - minute).total_microseconds() / SLOT_USEC);
+		int k = slot <= d_first_slot ? 0 : (slot - d_first_slot + d_slot_increment - 1) / d_slot_increment;
+		slot = d_first_slot + k*d_slot_increment;
+		if (slot >= SLOTS_PER_MINUTE) {
+			minute += boost::posix_time::minutes(1);
+			slot = d_first_slot;
+		}
+		return minute + boost::posix_time::microseconds((long) floor(slot*SLOT_USEC + 0.5));
+	}
 
-		    a >>= 1;
+	// Record the start of a frame (at now) and work out when the next one is due
+	void Build_Frame_impl::frame_started(boost::posix_time::ptime now)
+	{
+		// a frame that came after it was due ends an idle time, not an interval of the pace
+		bool paced = d_ready.is_not_a_date_time() || (!d_due.is_not_a_date_time() && d_ready <= d_due);
+		if (paced && !d_last_start.is_not_a_date_time()) {
+			double interval = (now - d_last_start).total_microseconds() / 1e6;
+			double delta = interval - d_interval_mean;
+			d_intervals++;
+			d_interval_mean += delta / d_intervals;
+			d_interval_m2 += delta * (interval - d_interval_mean);
+		}
+		if (!d_due.is_not_a_date_time()) {
+			boost::posix_time::ptime expected = d_ready.is_not_a_date_time() ? d_due : std::max(d_due, d_ready);
+			d_max_lateness = std::max(d_max_lateness, (now - expected).total_microseconds() / 1e6);
 		}
+		d_last_start = now;
+
+		if (d_slot_increment > 0)
+			d_due = next_slot(now + boost::posix_time::microseconds(1));
+		else if (d_interval > 0) {
+			boost::posix_time::time_duration interval = boost::posix_time::microseconds((long) (d_interval*1e6));
+			// keep to the schedule, unless more than an interval behind it
+			d_due = (d_due.is_not_a_date_time() ? now : d_due) + interval;
+			if (d_due < now)
+				d_due = now + interval;
+		}
+		else
+			d_due = boost::posix_time::not_a_date_time;
+	}
 
-		return buffer;
+	// A new pace: the next frame is due one interval (or at the next slot) after the previous one
+	void Build_Frame_impl::reschedule()
+	{
+		boost::posix_time::ptime now = boost::posix_time::microsec_clock::universal_time();
+		if (d_slot_increment > 0)
+			d_due = next_slot(d_last_start.is_not_a_date_time() ? now : d_last_start + boost::posix_time::microseconds(1));
+		else if (d_interval > 0 && !d_last_start.is_not_a_date_time())
+			d_due = d_last_start + boost::posix_time::microseconds((long) (d_interval*1e6));
+		else
+			d_due = boost::posix_time::not_a_date_time;
+		// work() may be waiting for the old due time
+		d_wake = now;
+		d_pace.notify_one();
+		d_intervals = 0;
+		d_interval_mean = d_interval_m2 = d_max_lateness = 0;
+		d_last_start = boost::posix_time::not_a_date_time;
 	}
 
-	// staffing function
-	int Build_Frame_impl::stuff (const char *in, char *out, int l_in)
+	// Tag the first byte of d_frame with the metadata of its payload
+	void Build_Frame_impl::tag_frame()
 	{
-		int i=0, j=0, consecutives=0, l_out=0;
-	
-		while(i<l_in) {
-		
-			if (in[i] & 0x01)
-				consecutives++;
-			else
-				consecutives=0;
-		
-			out[j++]=in[i++];
-			l_out++;
-		
-			if (consecutives==5) {
-				out[j++]=0x0;
-				l_out++;
-				consecutives=0;
+		if (!pmt::is_dict(d_meta))
+			return;
+		uint64_t offset = nitems_written(0);
+		pmt::pmt_t items = pmt::dict_items(d_meta);
+		for (size_t i=0; i<pmt::length(items); i++) {
+			pmt::pmt_t key = pmt::car(pmt::nth(i, items));
+			pmt::pmt_t value = pmt::cdr(pmt::nth(i, items));
+			if (pmt::eq(key, pmt::mp("nbits")))
+				continue;
+			if (pmt::eq(key, pmt::mp("time")) && pmt::is_number(value)) {	// as the UHD sink wants it
+				double t = pmt::to_double(value);
+				uint64_t secs = (uint64_t) t;
+				key = pmt::mp("tx_time");
+				value = pmt::make_tuple(pmt::from_uint64(secs), pmt::from_double(t - secs));
 			}
+			add_item_tag(0, offset, key, value, pmt::mp(alias()));
 		}
-		return l_out;
-	}
-
-	void Build_Frame_impl::pack (int orig_ascii, char *ret, int bits_per_byte)
-	{
-		// go down to fit in 6 bits
-		int ascii = orig_ascii-48;
-		if(ascii > 39) 
-			ascii -= 8;
-
-	/*	if (DEBUG)*/
-	/*		printf ("\nAscii: orig=%d scaled=%d\n", orig_ascii, ascii);*/
-
-		char binary[6];
-		int y = 0;
-		
-		if (ascii==0)
-			memset (binary, 0x0, 6);	
-		else	
-			while (ascii!=1) {
-				if (ascii % 2 == 0)
-					binary[y] = 0x0;
-				else if (ascii % 2 == 1)
-					binary[y] = 0x1;
-				ascii /= 2;
-				y++;				
-			}
-	
-		if (ascii==1) {
-			binary[y] = 0x1;
-			y++;
+	}
+
+	void Build_Frame_impl::set_queue_size(int queue_size)
+	{
+		if (queue_size < 1)
+			throw std::invalid_argument("Build_Frame: the queue size must be at least 1");
+		int more = 0;
+		{
+			gr::thread::scoped_lock lock(d_mutex);
+			if (d_running) {		// start() gives the credits of the whole queue
+				if ((size_t) queue_size < d_queue_size)
+					d_withheld += d_queue_size - queue_size;
+				else
+					more = queue_size - d_queue_size;
 			}
-		
-		if(y < 6) {	// fill in space
-			for(; y < 6; y++)
-				binary[y] = 0x0;
-		}
-	
-		for(y = 0; y < 6; y++)	// reverse*/
-			ret[y] = binary[5 - y];
-		ret[y]='\0';
-	
-	/*	if (DEBUG)*/
-	/*		printf("Binary = %s, Ret = %s\n", binary, ret );*/
-
-	}
-
-	void Build_Frame_impl::nrz_to_nrzi(char *data, int length)
-	{
-		unsigned short d_prev_nrzi_bit = 0;
-		unsigned short nrz_bit, nrzi_bit;
-	
-        for (int i = 0; i < length; i++)
-        {     
-            nrz_bit = data[i];
-
-            if(nrz_bit == 0)
-              {
-                nrzi_bit = d_prev_nrzi_bit ^ 1;
-              }
-            else
-              {
-                nrzi_bit = d_prev_nrzi_bit;
-              }
-              
-            data[i] = nrzi_bit;
-            d_prev_nrzi_bit = nrzi_bit;
-        }
-	}
-
-	void Build_Frame_impl::reverse_bit_order(char *data, int length)
-	{
-		int tmp = 0;
-		for(int i = 0; i < length/8; i++) {
-		for(int j = 0; j < 4; j++) {
-			tmp = data[i*8 + j];
-			data[i*8 + j] = data[i*8 + 7-j];
-			data[i*8 + 7-j] = tmp;
-		}
+			d_queue_size = queue_size;
+			d_spare.reserve(d_queue_size + 1);
 		}
+		room(more);
 	}
 
-	unsigned long Build_Frame_impl::unpack(char *buffer, int start, int length)
+	int Build_Frame_impl::queue_size() const
 	{
-		unsigned long ret = 0;
-		for(int i = start; i < (start+length); i++) {
-		ret <<= 1;
-		ret |= (buffer[i] & 0x01);
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_queue_size;
+	}
+
+	void Build_Frame_impl::set_queue_policy(int policy)
+	{
+		if (policy != DROP_NEWEST && policy != DROP_OLDEST)
+			throw std::invalid_argument("Build_Frame: unknown queue policy");
+		gr::thread::scoped_lock lock(d_mutex);
+		d_queue_policy = policy;
+	}
+
+	int Build_Frame_impl::queue_policy() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_queue_policy;
+	}
+
+	int Build_Frame_impl::queue_depth() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_queue.size();
+	}
+
+	int Build_Frame_impl::queue_high_water() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_high_water;
+	}
+
+	unsigned long Build_Frame_impl::frames_queued() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_queued;
+	}
+
+	unsigned long Build_Frame_impl::frames_dropped() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_dropped;
+	}
+
+	unsigned long Build_Frame_impl::frames_rejected() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_rejected;
+	}
+
+	unsigned long Build_Frame_impl::frames_sent() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_frames_sent;
+	}
+
+	void Build_Frame_impl::set_interval(double interval)
+	{
+		if (interval < 0)
+			throw std::invalid_argument("Build_Frame: the frame interval cannot be negative");
+		gr::thread::scoped_lock lock(d_mutex);
+		d_interval = interval;
+		reschedule();
+	}
+
+	double Build_Frame_impl::interval() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_interval;
+	}
+
+	void Build_Frame_impl::set_slot_schedule(int first_slot, int increment)
+	{
+		if (first_slot < 0 || first_slot >= SLOTS_PER_MINUTE || increment < 0 || increment >= SLOTS_PER_MINUTE)
+			throw std::invalid_argument("Build_Frame: slots go from 0 to 2249");
+		gr::thread::scoped_lock lock(d_mutex);
+		d_first_slot = first_slot;
+		d_slot_increment = increment;
+		reschedule();
+	}
+
+	int Build_Frame_impl::slot_increment() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_slot_increment;
+	}
+
+	double Build_Frame_impl::frame_interval_mean() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_interval_mean;
+	}
+
+	double Build_Frame_impl::frame_interval_jitter() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_intervals > 1 ? sqrt(d_interval_m2 / (d_intervals - 1)) : 0;
+	}
+
+	double Build_Frame_impl::frame_max_lateness() const
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		return d_max_lateness;
+	}
+
+	void Build_Frame_impl::reset_frame_interval_stats()
+	{
+		gr::thread::scoped_lock lock(d_mutex);
+		d_intervals = 0;
+		d_interval_mean = d_interval_m2 = d_max_lateness = 0;
+		d_last_start = boost::posix_time::not_a_date_time;
+	}
+
+	void Build_Frame_impl::set_trace_level(int level)
+	{
+		if (level < TRACE_OFF || level > TRACE_DEBUG)
+			throw std::invalid_argument("Build_Frame: unknown trace level");
+		d_trace.set_level(level);
+	}
+
+	int Build_Frame_impl::trace_level() const
+	{
+		return d_trace.level();
+	}
+
+	unsigned long Build_Frame_impl::frames_built() const
+	{
+		return d_frames_built;
+	}
+
+	unsigned long Build_Frame_impl::bits_stuffed() const
+	{
+		return d_bits_stuffed;
+	}
+
+	unsigned long Build_Frame_impl::bytes_out() const
+	{
+		return d_bytes_out;
+	}
+
+	bool Build_Frame_impl::start()
+	{
+		int credits;
+		{
+			gr::thread::scoped_lock lock(d_mutex);
+			d_stopping = false;
+			d_running = true;
+			d_withheld = 0;
+			credits = d_queue_size - std::min(d_queue_size, d_queue.size());
+			d_pacer = boost::shared_ptr<gr::thread::thread>(new gr::thread::thread(boost::bind(&Build_Frame_impl::pace, this)));
 		}
-		return ret;
+		room(credits);
+		return true;
 	}
 
-	void Build_Frame_impl::compute_crc(char *buffer, char *ret, unsigned int len) // Calculates CRC-checksum from unpacked data
+	// Stop the pacer and report the pace
+	bool Build_Frame_impl::stop()
 	{
-		static const unsigned short crc_itu16_table[] =
 		{
-		0x0000, 0x1189, 0x2312, 0x329B, 0x4624, 0x57AD, 0x6536, 0x74BF,
-		0x8C48, 0x9DC1, 0xAF5A, 0xBED3, 0xCA6C, 0xDBE5, 0xE97E, 0xF8F7,
-		0x1081, 0x0108, 0x3393, 0x221A, 0x56A5, 0x472C, 0x75B7, 0x643E,
-		0x9CC9, 0x8D40, 0xBFDB, 0xAE52, 0xDAED, 0xCB64, 0xF9FF, 0xE876,
-		0x2102, 0x308B, 0x0210, 0x1399, 0x6726, 0x76AF, 0x4434, 0x55BD,
-		0xAD4A, 0xBCC3, 0x8E58, 0x9FD1, 0xEB6E, 0xFAE7, 0xC87C, 0xD9F5,
-		0x3183, 0x200A, 0x1291, 0x0318, 0x77A7, 0x662E, 0x54B5, 0x453C,
-		0xBDCB, 0xAC42, 0x9ED9, 0x8F50, 0xFBEF, 0xEA66, 0xD8FD, 0xC974,
-		0x4204, 0x538D, 0x6116, 0x709F, 0x0420, 0x15A9, 0x2732, 0x36BB,
-		0xCE4C, 0xDFC5, 0xED5E, 0xFCD7, 0x8868, 0x99E1, 0xAB7A, 0xBAF3,
-		0x5285, 0x430C, 0x7197, 0x601E, 0x14A1, 0x0528, 0x37B3, 0x263A,
-		0xDECD, 0xCF44, 0xFDDF, 0xEC56, 0x98E9, 0x8960, 0xBBFB, 0xAA72,
-		0x6306, 0x728F, 0x4014, 0x519D, 0x2522, 0x34AB, 0x0630, 0x17B9,
-		0xEF4E, 0xFEC7, 0xCC5C, 0xDDD5, 0xA96A, 0xB8E3, 0x8A78, 0x9BF1,
-		0x7387, 0x620E, 0x5095, 0x411C, 0x35A3, 0x242A, 0x16B1, 0x0738,
-		0xFFCF, 0xEE46, 0xDCDD, 0xCD54, 0xB9EB, 0xA862, 0x9AF9, 0x8B70,
-		0x8408, 0x9581, 0xA71A, 0xB693, 0xC22C, 0xD3A5, 0xE13E, 0xF0B7,
-		0x0840, 0x19C9, 0x2B52, 0x3ADB, 0x4E64, 0x5FED, 0x6D76, 0x7CFF,
-		0x9489, 0x8500, 0xB79B, 0xA612, 0xD2AD, 0xC324, 0xF1BF, 0xE036,
-		0x18C1, 0x0948, 0x3BD3, 0x2A5A, 0x5EE5, 0x4F6C, 0x7DF7, 0x6C7E,
-		0xA50A, 0xB483, 0x8618, 0x9791, 0xE32E, 0xF2A7, 0xC03C, 0xD1B5,
-		0x2942, 0x38CB, 0x0A50, 0x1BD9, 0x6F66, 0x7EEF, 0x4C74, 0x5DFD,
-		0xB58B, 0xA402, 0x9699, 0x8710, 0xF3AF, 0xE226, 0xD0BD, 0xC134,
-		0x39C3, 0x284A, 0x1AD1, 0x0B58, 0x7FE7, 0x6E6E, 0x5CF5, 0x4D7C,
-		0xC60C, 0xD785, 0xE51E, 0xF497, 0x8028, 0x91A1, 0xA33A, 0xB2B3,
-		0x4A44, 0x5BCD, 0x6956, 0x78DF, 0x0C60, 0x1DE9, 0x2F72, 0x3EFB,
-		0xD68D, 0xC704, 0xF59F, 0xE416, 0x90A9, 0x8120, 0xB3BB, 0xA232,
-		0x5AC5, 0x4B4C, 0x79D7, 0x685E, 0x1CE1, 0x0D68, 0x3FF3, 0x2E7A,
-		0xE70E, 0xF687, 0xC41C, 0xD595, 0xA12A, 0xB0A3, 0x8238, 0x93B1,
-		0x6B46, 0x7ACF, 0x4854, 0x59DD, 0x2D62, 0x3CEB, 0x0E70, 0x1FF9,
-		0xF78F, 0xE606, 0xD49D, 0xC514, 0xB1AB, 0xA022, 0x92B9, 0x8330,
-		0x7BC7, 0x6A4E, 0x58D5, 0x495C, 0x3DE3, 0x2C6A, 0x1EF1, 0x0F78
-		};	
-
-		int crc=0xffff;
-		int i = 0;
-		char temp[8];
-		int datalen = len/8;
-
-//		// go to char (this can be optimized)
-//		printf ("INPUT:");
-//		for(int j=0;j<len;j++) {
-//			buffer[j]=buffer[j]+0x30;
-//			printf ("%x", buffer[j]); }
-//		printf ("\n");
-
-			char data[256];
-			for(int j=0;j<datalen;j++) //this unpacks the data in preparation for calculating CRC
-			{
-			data[j] = unpack(buffer, j*8, 8);
-			}
+			gr::thread::scoped_lock lock(d_mutex);
+			d_stopping = true;
+			d_running = false;
+			d_pace.notify_all();
+		}
+		if (d_pacer) {
+			d_pacer->join();
+			d_pacer.reset();
+		}
+		if (d_intervals)
+			AISTX_INFO(d_trace, d_logger, frames_sent() << " frames sent, " << frame_interval_mean()*1e3 << " ms apart on average, "
+				<< frame_interval_jitter()*1e3 << " ms jitter, at most " << frame_max_lateness()*1e3 << " ms late");
+		return true;
+	}
+
+    /*
+     * Our virtual destructor.
+     */
+    Build_Frame_impl::~Build_Frame_impl()
+    {
+    }
 
-		for (i = 0;  i < datalen;  i++)
-		    crc = (crc >> 8) ^ crc_itu16_table[(crc ^ data[i]) & 0xFF];
-
-		crc=(crc & 0xFFFF)^0xFFFF;
-//		printf("%X\n", crc);
-	
-	 	int2bin(crc, ret, 16);
-//	 	printf ("CRC ASCII1 = %s\n", ret); 
-	 	//dump_buffer(ret, 16);
-	 	
-	 	reverse_bit_order (ret, 16); //revert crc bit in byte
-
-		int2bin(crc, ret, 16);
-		strncpy(temp,ret+8,8); //swap the two crc byte
-		strncpy(ret+8,ret,8);
-		strncpy(ret,temp,8);
-
-		// back to binary
-		for(int j=0;j<16;j++)
-			ret[j]=ret[j]-0x30;
-
-//		if (DEBUG) {
-//			printf("CRC 2=\n");
-//			dump_buffer(ret,16);
-//		}	
-}
-
-    void Build_Frame_impl::byte_packing(char *input_frame, unsigned char *out_byte, unsigned int len) {
-    	for (int i = 0;  i < len/8;  i++) {
-    		char tmp[8];
-    		memcpy(tmp, &input_frame[i*8], 8);  		
-    		out_byte[i] = tmp[0]*128+tmp[1]*64+tmp[2]*32+tmp[3]*16+tmp[4]*8+tmp[5]*4+tmp[6]*2+tmp[7];
-    	
-			//out_byte[i] = input_frame[i*8]*128+input_frame[i*8+1]*64+input_frame[i*8+2]*32+input_frame[i*8+3]*16+input_frame[i*8+4]*8+input_frame[i*8+5]*4+input_frame[i*8+6]*2+input_frame[i*8+7];
-//			printf ("%X", out_byte[i]);
-      }
-//      printf("\n");
-    }  
-    
     int
     Build_Frame_impl::work(int noutput_items,
 			  gr_vector_const_void_star &input_items,
 			  gr_vector_void_star &output_items)
     {
         unsigned char *out = (unsigned char *) output_items[0];
-        
-//		B3co>HP00                                              P      ;8           ;56                RD           =Is3                     w      sU           kP06	                 CRC
-//		010010000011101011110111001110011000100000000000000000 100000 001011001000 001011000101000110 100010010100 001101011001111011000011 111111 111011100101 110011100000000000000110 0011000010001111		
-//		printf("\nENCODING:\t%s\n", sentence);
-//		printf("LEN_SENTENCE:\t%d\n", LEN_SENTENCE);
-//		printf("LEN_PAYLOAD:\t%d\n", LEN_PAYLOAD);
-//		printf("LEN_CRC:\t%d\n", LEN_CRC);
-		
-//		// payload encoding
-//		char buffer[6];
-		
-//		for (int i=0; i<LEN_SENTENCE; i++) {
-//			pack((int)d_sentence[i], buffer, 6);
-//			memcpy (payload+(i*6), buffer , 6);
-//			//p = payload+(i*6); //PASTA moved and corrected in the next IF 
-////			if (DEBUG)	printf("(len(payload)=%d) (len(sentence)=%d) %c -> %s \n", strlen(payload), i+1, sentence[i], payload);
-//		}
-		
-		
-//		// crc 
-//		char crc[16];	// 2 gnuradio bytes of CRC		
-//		char input_crc[LEN_PAYLOAD];
-//		memcpy (input_crc, payload, LEN_PAYLOAD);
-//		compute_crc (input_crc, crc, LEN_PAYLOAD);	
-//		memcpy (payload+LEN_PAYLOAD, crc, LEN_CRC);
-
-		// reverse bits (payload + crc)	
-//		reverse_bit_order (payload, LEN_PAYLOAD+LEN_CRC);
-////		printf("Dump buffer after reverse + crc= ");
-////		dump_buffer(payload, LEN_PAYLOAD+LEN_CRC);
-
-		// stuffing (payload + crc)
-		if (LEN_PAYLOAD<=168) {	
-		
-			char stuffed_payload[LEN_FRAME_MAX];
-			int LEN_STUFFED_PAYLOAD = stuff (payload, stuffed_payload, LEN_PAYLOAD+LEN_CRC);
-
-			//// frame generation /////		
-			char frame[LEN_FRAME_MAX];
-			unsigned char byte_frame[LEN_FRAME_MAX/8]; //PASTA
-			memset (frame, 0x0, LEN_FRAME_MAX);	
-		
-			// headers
-			memcpy (frame, "\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0", LEN_PREAMBLE);
-			memcpy (frame+LEN_PREAMBLE, "\0\1\1\1\1\1\1\0", LEN_START);
-			// payload + crc
-			memcpy (frame+LEN_PREAMBLE+LEN_START, stuffed_payload, LEN_STUFFED_PAYLOAD);
-			// trailer
-			memcpy (frame+LEN_PREAMBLE+LEN_START+LEN_STUFFED_PAYLOAD, "\0\1\1\1\1\1\1\0", 8);
-		
-			// padding
-			int LEN_PADDING = LEN_FRAME_MAX-(LEN_PREAMBLE+LEN_START+LEN_STUFFED_PAYLOAD+LEN_START);
-			memset (frame+LEN_PREAMBLE+LEN_START+LEN_STUFFED_PAYLOAD+LEN_START, 0x0, LEN_PADDING);
-			int len_frame_real = LEN_FRAME_MAX;	// 256
-			
-			// NRZI Conversion
-			nrz_to_nrzi (frame, len_frame_real);
-			printf ("Sent Frame (NRZI enabled) = ");
-
-			dump_buffer(frame, len_frame_real);
-
-			// Binary conversion (to use with GMSK mod's byte_to_symb				
-			byte_packing(frame, byte_frame, len_frame_real);
-			
-			// output 
-			memcpy (out, byte_frame, len_frame_real/8); 	
-			noutput_items = len_frame_real/8;
-
-			
+
+		// between frames: queued frames go before a repeated one, after one not sent yet
+		if (d_sent == 0) {
+			gr::thread::scoped_lock lock(d_mutex);
+			boost::posix_time::ptime now = boost::posix_time::microsec_clock::universal_time();
+			if (!d_queue.empty() && (!d_pending || d_repeating)) {
+				d_frame.swap(d_queue.front().frame);
+				d_meta = d_queue.front().meta;
+				recycle(d_queue.front().frame);
+				d_queue.pop_front();
+				// its credit goes back to the payload source (see room())
+				if (d_withheld)
+					d_withheld--;
+				else
+					message_port_pub(pmt::mp("room"), pmt::PMT_T);
+				d_pending = true;
+				d_repeating = false;
+				d_ready = now;
+			}
+			if (!d_pending)		// without repeat, each frame is sent once and the block is done when none is left
+				return d_stream ? 0 : WORK_DONE;
+			// not due yet: nothing now, the pacer gets work() called again in time
+			if (!d_due.is_not_a_date_time() && now < d_due) {
+				d_wake = d_due;
+				d_pace.notify_one();
+				return 0;
+			}
+			frame_started(now);
+			tag_frame();
 		}
-		else {
-		
-			char stuffed_payload[1024];
-			int LEN_STUFFED_PAYLOAD = stuff (payload, stuffed_payload, LEN_PAYLOAD+LEN_CRC);
-
-			//// frame generation /////	
-			int LEN_FRAME = LEN_PREAMBLE + LEN_START*2 + LEN_STUFFED_PAYLOAD;
-			//Make len_frame even 
-			while(LEN_FRAME%8 != 0)
-				LEN_FRAME++;
-			char frame[LEN_FRAME];
-			unsigned char byte_frame[LEN_FRAME/8]; //PASTA
-			memset (frame, 0x0, LEN_FRAME);	
-		
-			// headers
-			memcpy (frame, "\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0\1\0", LEN_PREAMBLE);
-			memcpy (frame+LEN_PREAMBLE, "\0\1\1\1\1\1\1\0", LEN_START);
-			// payload + crc
-			memcpy (frame+LEN_PREAMBLE+LEN_START, stuffed_payload, LEN_STUFFED_PAYLOAD);
-			// trailer
-			memcpy (frame+LEN_PREAMBLE+LEN_START+LEN_STUFFED_PAYLOAD, "\0\1\1\1\1\1\1\0", 8);
-		
-			int len_frame_real = LEN_FRAME;	
-			
-			// NRZI Conversion
-			nrz_to_nrzi (frame, len_frame_real);
-			printf ("Sent Frame (NRZI enabled) = ");
-
-			dump_buffer(frame, len_frame_real);
-
-			// Binary conversion (to use with GMSK mod's byte_to_symb				
-			byte_packing(frame, byte_frame, len_frame_real);
-			
-			// output 
-			memcpy (out, byte_frame, len_frame_real/8); 	
-			noutput_items = len_frame_real/8;
-		
+
+		// the frame is built once (see build_frame): copy out what is left of it, one frame per call at most
+		int n = std::min((size_t) noutput_items, d_frame.size() - d_sent);
+		memcpy (out, &d_frame[d_sent], n);
+		d_sent += n;
+		d_bytes_out += n;
+
+		if (d_sent == d_frame.size()) {
+			gr::thread::scoped_lock lock(d_mutex);
+			d_sent = 0;
+			d_pending = d_repeating = d_repeat;
+			d_ready = boost::posix_time::not_a_date_time;
+			d_frames_sent++;
 		}
 
-				
-		// some sleep here
-//		int r = (int) rand() % 1000;
-//		usleep(1000*r);	// -6
-		//sleep(1);
-		usleep(100000);
-		
         // Tell runtime system how many output items we produced.
-        return noutput_items;
+        return n;
     }
 
   } /* namespace AISTX */
@@ -22,35 +22,123 @@
 #define INCLUDED_AISTX_BUILD_FRAME_IMPL_H
 
 #include <AISTX/Build_Frame.h>
+#include <gnuradio/thread/thread.h>
+#include <pmt/pmt.h>
+#include <boost/date_time/posix_time/posix_time.hpp>
+#include <boost/atomic.hpp>
+#include <deque>
+#include "tracer.h"
 
 #define __VERSION 0.3
 
 namespace gr {
   namespace AISTX {
 
+    // a frame waiting to be sent, with the metadata of its payload
+    struct queued_frame
+    {
+		std::vector<unsigned char> frame;
+		pmt::pmt_t meta;
+    };
+
     class Build_Frame_impl : public Build_Frame
     {
      private:
 		bool d_repeat;
 		bool d_enable_NRZI;
+		bool d_stream;						// no sentence: frames only come from the payload port
 		//char * d_sentence;
-		char *payload;	// [the 01 rapresentation of the sentence as taken from input]
+		std::vector<unsigned char> d_frame;	// the frame as output: NRZI, one byte per 8 bits
+		pmt::pmt_t d_meta;					// metadata of d_frame, tagged on its first byte
+		size_t d_sent;						// bytes of d_frame already output
+		bool d_pending;						// d_frame is still to be sent (always, with repeat)
+		bool d_repeating;					// d_frame has been sent, it is only pending for repeat
 		unsigned short LEN_SENTENCE;
-		unsigned short LEN_PAYLOAD;
-		
+		int LEN_PAYLOAD;					// at most framing::MAX_PAYLOAD bits
+		std::vector<unsigned char> d_packed;	// payload of a symbol message, reused
+
+		// payload port queue, shared with the message handler
+		mutable gr::thread::mutex d_mutex;
+		std::deque<queued_frame> d_queue;
+		std::vector<std::vector<unsigned char> > d_spare;	// storage of the frames sent, reused for the next ones
+		size_t d_queue_size;
+		int d_queue_policy;
+		bool d_stopping;
+		bool d_running;						// between start() and stop()
+		int d_withheld;						// "room" credits not to give back, the queue got smaller
+		size_t d_high_water;
+		unsigned long d_queued;
+		unsigned long d_dropped;
+		unsigned long d_rejected;
+		unsigned long d_frames_sent;
+
+		// pacing, see due()
+		double d_interval;
+		int d_first_slot;
+		int d_slot_increment;
+		boost::posix_time::ptime d_due;			// when the next frame may start, not_a_date_time: now
+		boost::posix_time::ptime d_ready;		// when d_frame was ready to be sent
+		boost::posix_time::ptime d_last_start;	// start of the previous frame
+		boost::posix_time::ptime d_wake;		// when the pacer has to wake work() up
+		boost::shared_ptr<gr::thread::thread> d_pacer;
+		gr::thread::condition_variable d_pace;
+		// measured frame intervals (Welford's running mean and variance) and lateness
+		unsigned long d_intervals;
+		double d_interval_mean;
+		double d_interval_m2;
+		double d_max_lateness;
+
+		tracer d_trace;
+		boost::atomic<unsigned long> d_frames_built;
+		boost::atomic<unsigned long> d_bits_stuffed;
+		boost::atomic<unsigned long> d_bytes_out;
+
+		void set_payload(const unsigned char *payload, int length, std::vector<unsigned char> &frame);
+		void init_port();
+		void handle_payload(pmt::pmt_t msg);
+		void enqueue(std::vector<unsigned char> &frame, pmt::pmt_t meta);
+		void recycle(std::vector<unsigned char> &frame);
+		void room(int n);
+		void tag_frame();
+		boost::posix_time::ptime next_slot(boost::posix_time::ptime after) const;
+		void reschedule();
+		void frame_started(boost::posix_time::ptime now);
+		void pace();
+		void handle_pace(pmt::pmt_t msg);
+
      public:
         Build_Frame_impl(const char *sentence, bool repeat, bool enable_NRZI);
+        Build_Frame_impl(const std::vector<unsigned char> &packed, int nbits, bool repeat, bool enable_NRZI);
         ~Build_Frame_impl();
 
-		void dump_buffer(const char *b, int buffer_size);
-		char * int2bin(int a, char *buffer, int buf_size);      
-		int stuff (const char *in, char *out, int l_in);
-		void pack (int orig_ascii, char *ret, int bits_per_byte);
-		void nrz_to_nrzi(char *data, int length);
-		void reverse_bit_order(char *data, int length);
-		unsigned long unpack(char *buffer, int start, int length);
-		void compute_crc(char *buffer, char *ret, unsigned int len);
-		void byte_packing(char *input_frame, unsigned char *out_byte, unsigned int len);
+		void set_queue_size(int queue_size);
+		int queue_size() const;
+		void set_queue_policy(int policy);
+		int queue_policy() const;
+		int queue_depth() const;
+		int queue_high_water() const;
+		unsigned long frames_queued() const;
+		unsigned long frames_dropped() const;
+		unsigned long frames_rejected() const;
+		unsigned long frames_sent() const;
+		void set_interval(double interval);
+		double interval() const;
+		void set_slot_schedule(int first_slot, int increment);
+		int slot_increment() const;
+		double frame_interval_mean() const;
+		double frame_interval_jitter() const;
+		double frame_max_lateness() const;
+		void reset_frame_interval_stats();
+		void set_trace_level(int level);
+		int trace_level() const;
+		unsigned long frames_built() const;
+		unsigned long bits_stuffed() const;
+		unsigned long bytes_out() const;
+
+		bool start();
+		bool stop();
+
+		// the frame building steps are in ais_frame.h
 
       // Where all the action really happens
       int work(int noutput_items,
@@ -25,6 +25,8 @@
 #include <gnuradio/io_signature.h>
 #include "DebugME_impl.h"
 #include <stdio.h>
+#include <stdexcept>
+#include <sstream>
 
 namespace gr {
   namespace AISTX {
@@ -43,7 +45,8 @@ namespace gr {
       : gr::block("DebugME",
 		      gr::io_signature::make(1, 1, itemsize),
 		      gr::io_signature::make(0, 0, 0)),
-		      d_itemsize(itemsize)
+		      d_itemsize(itemsize),
+		      d_items_in(0)
     {}
 
     /*
@@ -53,6 +56,26 @@ namespace gr {
     {
     }
 
+    void
+    DebugME_impl::set_trace_level(int level)
+    {
+        if (level < TRACE_OFF || level > TRACE_DEBUG)
+            throw std::invalid_argument("DebugME: unknown trace level");
+        d_trace.set_level(level);
+    }
+
+    int
+    DebugME_impl::trace_level() const
+    {
+        return d_trace.level();
+    }
+
+    unsigned long
+    DebugME_impl::items_in() const
+    {
+        return d_items_in;
+    }
+
     void
     DebugME_impl::forecast (int noutput_items, gr_vector_int &ninput_items_required)
     {
@@ -65,24 +88,32 @@ namespace gr {
                        gr_vector_const_void_star &input_items,
                        gr_vector_void_star &output_items)
     {
-
-		// char / byte
-		if (d_itemsize == 1) {
-			const unsigned char *in = (const unsigned char *) input_items[0];
-	    	for(int i = 0; i<ninput_items[0]; ++i)
-				printf ("\\x%.2X", in[i]);
+		d_items_in += ninput_items[0];
+		// nothing to format unless it goes out
+		if (d_trace.on(TRACE_INFO)) {
+			std::ostringstream line;
+			char item[16];
+			// char / byte
+			if (d_itemsize == 1) {
+				const unsigned char *in = (const unsigned char *) input_items[0];
+				for(int i = 0; i<ninput_items[0]; ++i) {
+					snprintf (item, sizeof(item), "\\x%.2X", in[i]);
+					line << item;
+				}
 			}
-		// float
-		else if (d_itemsize == 4) {
-			const float *in = (const float *) input_items[0];
-			for(int i = 0; i<ninput_items[0]; ++i)
-				printf ("\\%.0f", in[i]);
+			// float
+			else if (d_itemsize == 4) {
+				const float *in = (const float *) input_items[0];
+				for(int i = 0; i<ninput_items[0]; ++i) {
+					snprintf (item, sizeof(item), "\\%.0f", in[i]);
+					line << item;
+				}
 			}
-		// complex
-		else
-			printf ("Complexes not supported yet!");
-			
-	    std::cout << std::endl;
+			// complex
+			else
+				line << "Complexes not supported yet!";
+			AISTX_INFO(d_trace, d_logger, line.str());
+		}
 
         // Do <+signal processing+>
         // Tell runtime system how many input items we consumed on
@@ -22,6 +22,8 @@
 #define INCLUDED_AISTX_DEBUGME_IMPL_H
 
 #include <AISTX/DebugME.h>
+#include <boost/atomic.hpp>
+#include "tracer.h"
 
 namespace gr {
   namespace AISTX {
@@ -30,11 +32,17 @@ namespace gr {
     {
      private:
       size_t d_itemsize;
+      tracer d_trace;
+      boost::atomic<unsigned long> d_items_in;
 
      public:
       DebugME_impl(size_t itemsize);
       ~DebugME_impl();
 
+      void set_trace_level(int level);
+      int trace_level() const;
+      unsigned long items_in() const;
+
       // Where all the action really happens
       void forecast (int noutput_items, gr_vector_int &ninput_items_required);
 
@@ -0,0 +1,408 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#include "ais_frame.h"
+
+#include <stdio.h>
+#include <string.h>
+
+#define LEN_PREAMBLE 24
+#define LEN_START 8
+#define LEN_CRC 16
+#define LEN_SLOT 256
+#define MAX_SLOTS 5
+
+namespace gr {
+  namespace AISTX {
+    namespace framing {
+
+	static const unsigned short crc_itu16_table[] =
+	{
+	0x0000, 0x1189, 0x2312, 0x329B, 0x4624, 0x57AD, 0x6536, 0x74BF,
+	0x8C48, 0x9DC1, 0xAF5A, 0xBED3, 0xCA6C, 0xDBE5, 0xE97E, 0xF8F7,
+	0x1081, 0x0108, 0x3393, 0x221A, 0x56A5, 0x472C, 0x75B7, 0x643E,
+	0x9CC9, 0x8D40, 0xBFDB, 0xAE52, 0xDAED, 0xCB64, 0xF9FF, 0xE876,
+	0x2102, 0x308B, 0x0210, 0x1399, 0x6726, 0x76AF, 0x4434, 0x55BD,
+	0xAD4A, 0xBCC3, 0x8E58, 0x9FD1, 0xEB6E, 0xFAE7, 0xC87C, 0xD9F5,
+	0x3183, 0x200A, 0x1291, 0x0318, 0x77A7, 0x662E, 0x54B5, 0x453C,
+	0xBDCB, 0xAC42, 0x9ED9, 0x8F50, 0xFBEF, 0xEA66, 0xD8FD, 0xC974,
+	0x4204, 0x538D, 0x6116, 0x709F, 0x0420, 0x15A9, 0x2732, 0x36BB,
+	0xCE4C, 0xDFC5, 0xED5E, 0xFCD7, 0x8868, 0x99E1, 0xAB7A, 0xBAF3,
+	0x5285, 0x430C, 0x7197, 0x601E, 0x14A1, 0x0528, 0x37B3, 0x263A,
+	0xDECD, 0xCF44, 0xFDDF, 0xEC56, 0x98E9, 0x8960, 0xBBFB, 0xAA72,
+	0x6306, 0x728F, 0x4014, 0x519D, 0x2522, 0x34AB, 0x0630, 0x17B9,
+	0xEF4E, 0xFEC7, 0xCC5C, 0xDDD5, 0xA96A, 0xB8E3, 0x8A78, 0x9BF1,
+	0x7387, 0x620E, 0x5095, 0x411C, 0x35A3, 0x242A, 0x16B1, 0x0738,
+	0xFFCF, 0xEE46, 0xDCDD, 0xCD54, 0xB9EB, 0xA862, 0x9AF9, 0x8B70,
+	0x8408, 0x9581, 0xA71A, 0xB693, 0xC22C, 0xD3A5, 0xE13E, 0xF0B7,
+	0x0840, 0x19C9, 0x2B52, 0x3ADB, 0x4E64, 0x5FED, 0x6D76, 0x7CFF,
+	0x9489, 0x8500, 0xB79B, 0xA612, 0xD2AD, 0xC324, 0xF1BF, 0xE036,
+	0x18C1, 0x0948, 0x3BD3, 0x2A5A, 0x5EE5, 0x4F6C, 0x7DF7, 0x6C7E,
+	0xA50A, 0xB483, 0x8618, 0x9791, 0xE32E, 0xF2A7, 0xC03C, 0xD1B5,
+	0x2942, 0x38CB, 0x0A50, 0x1BD9, 0x6F66, 0x7EEF, 0x4C74, 0x5DFD,
+	0xB58B, 0xA402, 0x9699, 0x8710, 0xF3AF, 0xE226, 0xD0BD, 0xC134,
+	0x39C3, 0x284A, 0x1AD1, 0x0B58, 0x7FE7, 0x6E6E, 0x5CF5, 0x4D7C,
+	0xC60C, 0xD785, 0xE51E, 0xF497, 0x8028, 0x91A1, 0xA33A, 0xB2B3,
+	0x4A44, 0x5BCD, 0x6956, 0x78DF, 0x0C60, 0x1DE9, 0x2F72, 0x3EFB,
+	0xD68D, 0xC704, 0xF59F, 0xE416, 0x90A9, 0x8120, 0xB3BB, 0xA232,
+	0x5AC5, 0x4B4C, 0x79D7, 0x685E, 0x1CE1, 0x0D68, 0x3FF3, 0x2E7A,
+	0xE70E, 0xF687, 0xC41C, 0xD595, 0xA12A, 0xB0A3, 0x8238, 0x93B1,
+	0x6B46, 0x7ACF, 0x4854, 0x59DD, 0x2D62, 0x3CEB, 0x0E70, 0x1FF9,
+	0xF78F, 0xE606, 0xD49D, 0xC514, 0xB1AB, 0xA022, 0x92B9, 0x8330,
+	0x7BC7, 0x6A4E, 0x58D5, 0x495C, 0x3DE3, 0x2C6A, 0x1EF1, 0x0F78
+	};
+
+	// byte -> the same bits in reverse order
+	static unsigned char reversed_byte[256];
+
+	// Bit stuffing of a byte after a run of 1s (0-4): the stuffed bits (up to 10,
+	// right aligned), how many and the run of 1s after them
+	struct stuffed_byte_t {
+		unsigned short bits;
+		unsigned char nbits;
+		unsigned char run;
+	};
+	static stuffed_byte_t stuffed_byte[5][256];
+
+	// Fill the tables once, when the library is loaded
+	static struct tables_t {
+		tables_t() {
+			for (int b = 0; b < 256; b++) {
+				reversed_byte[b] = 0;
+				for (int i = 0; i < 8; i++)
+					if (b & (1 << i))
+						reversed_byte[b] |= 0x80 >> i;
+			}
+			for (int run = 0; run < 5; run++)
+				for (int b = 0; b < 256; b++) {
+					stuffed_byte_t &t = stuffed_byte[run][b];
+					int r = run;
+					t.bits = 0;
+					t.nbits = 0;
+					for (int i = 7; i >= 0; i--) {
+						int bit = (b >> i) & 0x01;
+						t.bits = (t.bits << 1) | bit;
+						t.nbits++;
+						r = bit ? r+1 : 0;
+						if (r == 5) {
+							t.bits <<= 1;
+							t.nbits++;
+							r = 0;
+						}
+					}
+					t.run = r;
+				}
+		}
+	} tables;
+
+	void dump_buffer(const char *b, int buffer_size)
+	{		
+		int k = 0;
+	  	for(; k < buffer_size; k++)
+			printf("%d", b[k]);
+	  	printf("\n");
+	}
+
+	// Write the buf_size low bits of a as ASCII '0'/'1'
+	// Write to the buffer backwards so that the binary representation
+	// is in the correct order i.e.  the LSB is on the far right
+	// instead of the far left of the printed string
+	char * int2bin(int a, char *buffer, int buf_size) {
+		buffer += (buf_size - 1);
+
+		for (int i = buf_size - 1; i >= 0; i--) {
+		    *buffer-- = (a & 1) + '0';
+
+		    a >>= 1;
+		}
+
+		return buffer;
+	}
+
+	// staffing function
+	int stuff (const char *in, char *out, int l_in)
+	{
+		int i=0, j=0, consecutives=0, l_out=0;
+	
+		while(i<l_in) {
+		
+			if (in[i] & 0x01)
+				consecutives++;
+			else
+				consecutives=0;
+		
+			out[j++]=in[i++];
+			l_out++;
+		
+			if (consecutives==5) {
+				out[j++]=0x0;
+				l_out++;
+				consecutives=0;
+			}
+		}
+		return l_out;
+	}
+
+	void nrz_to_nrzi(char *data, int length)
+	{
+		unsigned short d_prev_nrzi_bit = 0;
+		unsigned short nrz_bit, nrzi_bit;
+	
+        for (int i = 0; i < length; i++)
+        {     
+            nrz_bit = data[i];
+
+            if(nrz_bit == 0)
+              {
+                nrzi_bit = d_prev_nrzi_bit ^ 1;
+              }
+            else
+              {
+                nrzi_bit = d_prev_nrzi_bit;
+              }
+              
+            data[i] = nrzi_bit;
+            d_prev_nrzi_bit = nrzi_bit;
+        }
+	}
+
+	void reverse_bit_order(char *data, int length)
+	{
+		int tmp = 0;
+		for(int i = 0; i < length/8; i++) {
+		for(int j = 0; j < 4; j++) {
+			tmp = data[i*8 + j];
+			data[i*8 + j] = data[i*8 + 7-j];
+			data[i*8 + 7-j] = tmp;
+		}
+		}
+	}
+
+	unsigned long unpack(const char *buffer, int start, int length)
+	{
+		unsigned long ret = 0;
+		for(int i = start; i < (start+length); i++) {
+		ret <<= 1;
+		ret |= (buffer[i] & 0x01);
+		}
+		return ret;
+	}
+
+	void compute_crc(const char *buffer, char *ret, unsigned int len) // Calculates CRC-checksum from unpacked data
+	{
+		int crc=0xffff;
+		int i = 0;
+		char temp[8];
+		int datalen = len/8;
+
+//		// go to char (this can be optimized)
+//		printf ("INPUT:");
+//		for(int j=0;j<len;j++) {
+//			buffer[j]=buffer[j]+0x30;
+//			printf ("%x", buffer[j]); }
+//		printf ("\n");
+
+			char data[256];
+			for(int j=0;j<datalen;j++) //this unpacks the data in preparation for calculating CRC
+			{
+			data[j] = unpack(buffer, j*8, 8);
+			}
+
+		for (i = 0;  i < datalen;  i++)
+		    crc = (crc >> 8) ^ crc_itu16_table[(crc ^ data[i]) & 0xFF];
+
+		crc=(crc & 0xFFFF)^0xFFFF;
+//		printf("%X\n", crc);
+	
+	 	int2bin(crc, ret, 16);
+//	 	printf ("CRC ASCII1 = %s\n", ret); 
+	 	//dump_buffer(ret, 16);
+	 	
+	 	reverse_bit_order (ret, 16); //revert crc bit in byte
+
+		int2bin(crc, ret, 16);
+		memcpy(temp,ret+8,sizeof(temp)); //swap the two crc byte
+		memcpy(ret+8,ret,sizeof(temp));
+		memcpy(ret,temp,sizeof(temp));
+
+		// back to binary
+		for(int j=0;j<16;j++)
+			ret[j]=ret[j]-0x30;
+
+//		if (DEBUG) {
+//			printf("CRC 2=\n");
+//			dump_buffer(ret,16);
+//		}	
+}
+
+    void byte_packing(const char *input_frame, unsigned char *out_byte, unsigned int len) {
+    	for (unsigned int i = 0;  i < len/8;  i++) {
+    		char tmp[8];
+    		memcpy(tmp, &input_frame[i*8], 8);  		
+    		out_byte[i] = tmp[0]*128+tmp[1]*64+tmp[2]*32+tmp[3]*16+tmp[4]*8+tmp[5]*4+tmp[6]*2+tmp[7];
+    	
+			//out_byte[i] = input_frame[i*8]*128+input_frame[i*8+1]*64+input_frame[i*8+2]*32+input_frame[i*8+3]*16+input_frame[i*8+4]*8+input_frame[i*8+5]*4+input_frame[i*8+6]*2+input_frame[i*8+7];
+//			printf ("%X", out_byte[i]);
+      }
+//      printf("\n");
+    }
+
+	// Inverse of byte_packing: len bits, MSB first, one bit per char
+	void byte_unpacking(const unsigned char *in_byte, char *output_frame, unsigned int len)
+	{
+		for (unsigned int i = 0; i < len; i++)
+			output_frame[i] = (in_byte[i >> 3] >> (7 - (i & 7))) & 0x01;
+	}
+
+	unsigned short crc16(const unsigned char *data, int nbytes)
+	{
+		unsigned short crc = 0xffff;
+		for (int i = 0; i < nbytes; i++)
+			crc = (crc >> 8) ^ crc_itu16_table[(crc ^ data[i]) & 0xFF];
+		return crc ^ 0xffff;
+	}
+
+	void reverse_bytes(unsigned char *data, int nbytes)
+	{
+		for (int i = 0; i < nbytes; i++)
+			data[i] = reversed_byte[data[i]];
+	}
+
+	// A byte at a time through the stuffed_byte table; the last byte of out is 0 padded
+	int stuff_packed(const unsigned char *in, int nbytes, unsigned char *out)
+	{
+		unsigned long acc = 0;		// bits not written yet, right aligned (at most 7 + 10)
+		int acc_bits = 0;
+		int run = 0;
+		int l_out = 0;
+
+		for (int i = 0; i < nbytes; i++) {
+			const stuffed_byte_t &t = stuffed_byte[run][in[i]];
+			acc = (acc << t.nbits) | t.bits;
+			acc_bits += t.nbits;
+			l_out += t.nbits;
+			run = t.run;
+			while (acc_bits >= 8) {
+				acc_bits -= 8;
+				*out++ = acc >> acc_bits;
+			}
+		}
+		if (acc_bits)
+			*out = acc << (8 - acc_bits);
+		return l_out;
+	}
+
+	// The line level after each bit is the parity of the 0s up to it (the line starts at 0):
+	// a prefix XOR of the inverted bits, 64 at a time
+	void nrzi_packed(unsigned char *data, int nbytes)
+	{
+		uint64_t level = 0;		// all 0s or all 1s: the level before the word
+		for (int i = 0; i < nbytes; i += 8) {
+			int n = nbytes - i < 8 ? nbytes - i : 8;
+			uint64_t w = 0;
+			for (int k = 0; k < 8; k++)
+				w = (w << 8) | (k < n ? data[i+k] : 0);
+			w = ~w;
+			w ^= w >> 1;
+			w ^= w >> 2;
+			w ^= w >> 4;
+			w ^= w >> 8;
+			w ^= w >> 16;
+			w ^= w >> 32;
+			w ^= level;
+			for (int k = 0; k < n; k++)
+				data[i+k] = w >> (56 - 8*k);
+			level = ((w >> (64 - 8*n)) & 1) ? ~(uint64_t) 0 : 0;
+		}
+	}
+
+	std::string bits_string(const unsigned char *b, int nbits)
+	{
+		std::string s(nbits, '0');
+		for (int k = 0; k < nbits; k++)
+			s[k] += (b[k >> 3] >> (7 - (k & 7))) & 0x01;
+		return s;
+	}
+
+	// Longest payload (padded to 8 bits) of a frame of 1 to 5 slots (ITU-R M.1371): the rest of
+	// the slots is preamble, flags, CRC and the buffer (stuffing bits, distance delay, jitter)
+	static const int slot_payload[MAX_SLOTS] = {168, 440, 696, 952, MAX_PAYLOAD};
+
+	int frame_slots(int nbits)
+	{
+		for (int slots = 1; slots <= MAX_SLOTS; slots++)
+			if ((nbits + 7)/8*8 <= slot_payload[slots-1])
+				return slots;
+		return 0;
+	}
+
+	int frame_max_bytes(int nbits)
+	{
+		int body = (nbits + 7)/8*8 + LEN_CRC;
+		int len = (LEN_PREAMBLE + LEN_START*2 + body + body/5 + 7)/8;
+		int slots = frame_slots(nbits);
+		return len > slots*LEN_SLOT/8 ? len : slots*LEN_SLOT/8;
+	}
+
+	int frame_packed(const unsigned char *payload, int nbits, unsigned char *frame, bool nrzi, int *stuffed)
+	{
+		int slots = frame_slots(nbits);
+		if (!slots)
+			return -1;
+
+		// payload padded to a multiple of 8 bits, CRC, bit order reversed byte by byte
+		int nbytes = (nbits + 7)/8;
+		unsigned char body[MAX_PAYLOAD/8 + LEN_CRC/8];
+		memcpy(body, payload, nbytes);
+		if (nbits & 7)
+			body[nbytes-1] &= 0xff << (8 - (nbits & 7));
+		unsigned short crc = crc16(body, nbytes);
+		body[nbytes] = crc & 0xff;
+		body[nbytes+1] = crc >> 8;
+		reverse_bytes(body, nbytes + 2);
+
+		// preamble and start flag, then the stuffed body: still on a byte boundary
+		memcpy(frame, "\xaa\xaa\xaa\x7e", 4);
+		int len = stuff_packed(body, nbytes + 2, frame + 4);
+		if (stuffed)
+			*stuffed = len - (nbytes + 2)*8;
+		len += LEN_PREAMBLE + LEN_START;
+
+		// end flag, after the last bits of the body (zero padded by stuff_packed)
+		if (len & 7) {
+			frame[len >> 3] |= 0x7e >> (len & 7);
+			frame[(len >> 3) + 1] = 0x7e << (8 - (len & 7));
+		}
+		else
+			frame[len >> 3] = 0x7e;
+
+		// then padding to a whole byte and to the end of the slots: the buffer, unless stuffing took it
+		int end = (len + LEN_START + 7)/8;
+		len = end*8 > slots*LEN_SLOT ? end*8 : slots*LEN_SLOT;
+		memset(frame + end, 0x0, len/8 - end);
+
+		if (nrzi)
+			nrzi_packed(frame, len/8);
+		return len;
+	}
+
+    } /* namespace framing */
+  } /* namespace AISTX */
+} /* namespace gr */
@@ -0,0 +1,69 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ *
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ *
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifndef INCLUDED_AISTX_AIS_FRAME_H
+#define INCLUDED_AISTX_AIS_FRAME_H
+
+/*
+ * Frame building steps used by Build_Frame. They do not depend on GNU Radio,
+ * so that they can be tested and benchmarked on their own (see benchmarks/).
+ * Unless stated otherwise buffers hold one bit per char (0 or 1), MSB first.
+ * The *_packed steps work on packed bits instead (8 per byte, MSB first) and
+ * give the same bits: Build_Frame uses those, the others are the reference.
+ */
+
+#include <stdint.h>
+#include <string>
+
+namespace gr {
+  namespace AISTX {
+    namespace framing {
+
+		void dump_buffer(const char *b, int buffer_size);
+		char * int2bin(int a, char *buffer, int buf_size);
+		int stuff (const char *in, char *out, int l_in);		// returns the stuffed length
+		void nrz_to_nrzi(char *data, int length);
+		void reverse_bit_order(char *data, int length);
+		unsigned long unpack(const char *buffer, int start, int length);
+		void compute_crc(const char *buffer, char *ret, unsigned int len);	// ret: 16 bits, ready to append
+		void byte_packing(const char *input_frame, unsigned char *out_byte, unsigned int len);
+		void byte_unpacking(const unsigned char *in_byte, char *output_frame, unsigned int len);
+
+		unsigned short crc16(const unsigned char *data, int nbytes);		// CRC-16 (ITU) of whole bytes, as compute_crc
+		void reverse_bytes(unsigned char *data, int nbytes);				// reverse_bit_order
+		int stuff_packed(const unsigned char *in, int nbytes, unsigned char *out);	// returns the stuffed length in bits
+		void nrzi_packed(unsigned char *data, int nbytes);					// nrz_to_nrzi
+		std::string bits_string(const unsigned char *b, int nbits);			// dump_buffer, as a string
+
+		const int MAX_PAYLOAD = 1008;		// bits, 5 slots
+
+		int frame_slots(int nbits);			// slots of a payload of nbits, 0 when longer than MAX_PAYLOAD
+		int frame_max_bytes(int nbits);
+		// The whole frame of a payload of nbits (preamble, flags, stuffed payload + CRC, padding to
+		// its slots, NRZI) into frame (frame_max_bytes(nbits) bytes); returns the frame length in bits,
+		// or -1 for a payload longer than MAX_PAYLOAD, and the bits inserted by stuffing in stuffed
+		// unless it is null
+		int frame_packed(const unsigned char *payload, int nbits, unsigned char *frame, bool nrzi, int *stuffed = 0);
+
+    } // namespace framing
+  } // namespace AISTX
+} // namespace gr
+
+#endif /* INCLUDED_AISTX_AIS_FRAME_H */
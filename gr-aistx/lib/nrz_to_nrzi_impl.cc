@@ -24,7 +24,8 @@
 
 #include <gnuradio/io_signature.h>
 #include "nrz_to_nrzi_impl.h"
-#include <stdio.h>
+#include <stdexcept>
+#include <string>
 
 namespace gr {
   namespace AISTX {
@@ -42,7 +43,8 @@ namespace gr {
     nrz_to_nrzi_impl::nrz_to_nrzi_impl()
       : gr::block("nrz_to_nrzi",
 		      gr::io_signature::make(1, 1, sizeof(unsigned char)),
-		      gr::io_signature::make(1, 1, sizeof(unsigned char)))
+		      gr::io_signature::make(1, 1, sizeof(unsigned char))),
+		      d_items_out(0)
     {}
 
     /*
@@ -52,6 +54,36 @@ namespace gr {
     {
     }
 
+    void
+    nrz_to_nrzi_impl::set_trace_level(int level)
+    {
+        if (level < TRACE_OFF || level > TRACE_DEBUG)
+            throw std::invalid_argument("nrz_to_nrzi: unknown trace level");
+        d_trace.set_level(level);
+    }
+
+    int
+    nrz_to_nrzi_impl::trace_level() const
+    {
+        return d_trace.level();
+    }
+
+    unsigned long
+    nrz_to_nrzi_impl::items_out() const
+    {
+        return d_items_out;
+    }
+
+    // '0'/'1' string of n bits, one per char
+    static std::string
+    bits_string(const unsigned char *bits, int n)
+    {
+        std::string s(n, '0');
+        for (int i = 0; i < n; i++)
+            s[i] += bits[i] & 0x01;
+        return s;
+    }
+
     void
     nrz_to_nrzi_impl::forecast (int noutput_items, gr_vector_int &ninput_items_required)
     {
@@ -70,9 +102,7 @@ namespace gr {
         unsigned char        nrz_bit;
         unsigned char        d_prev_nrzi_bit = 0;
 
-	  	for(int i = 0;i<noutput_items;++i)
-			printf("%d", in[i]);
-	  	printf("\n");	
+        AISTX_DEBUG(d_trace, d_logger, "NRZ  = " << bits_string(in, noutput_items));
 
         for (int i = 0; i < noutput_items; i++)
         {     
@@ -91,9 +121,8 @@ namespace gr {
 
         }
 
-	  	for(int i = 0;i<noutput_items;++i)
-			printf("%d", out[i]);
-	  	printf("\n");	
+        AISTX_DEBUG(d_trace, d_logger, "NRZI = " << bits_string(out, noutput_items));
+        d_items_out += noutput_items;
 
         // Tell runtime system how many input items we consumed on
         // each input stream.
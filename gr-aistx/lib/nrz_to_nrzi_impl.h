@@ -22,6 +22,8 @@
 #define INCLUDED_AISTX_NRZ_TO_NRZI_IMPL_H
 
 #include <AISTX/nrz_to_nrzi.h>
+#include <boost/atomic.hpp>
+#include "tracer.h"
 
 namespace gr {
   namespace AISTX {
@@ -29,12 +31,17 @@ namespace gr {
     class nrz_to_nrzi_impl : public nrz_to_nrzi
     {
      private:
-      // Nothing to declare in this block.
+      tracer d_trace;
+      boost::atomic<unsigned long> d_items_out;
 
      public:
       nrz_to_nrzi_impl();
       ~nrz_to_nrzi_impl();
 
+      void set_trace_level(int level);
+      int trace_level() const;
+      unsigned long items_out() const;
+
       // Where all the action really happens
       void forecast (int noutput_items, gr_vector_int &ninput_items_required);
 
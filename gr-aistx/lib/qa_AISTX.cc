@@ -26,11 +26,13 @@
  */
 
 #include "qa_AISTX.h"
+#include "qa_ais_frame.h"
 
 CppUnit::TestSuite *
 qa_AISTX::suite()
 {
   CppUnit::TestSuite *s = new CppUnit::TestSuite("AISTX");
+  s->addTest(gr::AISTX::qa_ais_frame::suite());
 
   return s;
 }
@@ -0,0 +1,217 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ *
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ *
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+
+#include "qa_ais_frame.h"
+#include "ais_frame.h"
+
+#include <cppunit/TestAssert.h>
+#include <stdlib.h>
+#include <string.h>
+#include <string>
+#include <vector>
+
+namespace gr {
+  namespace AISTX {
+
+    using namespace framing;
+
+    // Payloads ('0'/'1', as printed by AIVDM_Encoder.py) and their frames (hex), as built by
+    // AIVDM_Frame.py, which does the steps on its own
+    static const struct {
+      const char *payload;
+      int frame_bits;
+      const char *frame;
+    } golden[] = {
+      // type 1
+      {"000001000011101011110111001110011000101111100000000000000001000000101100100000101101000110011010001001010000010100100011010000101111111111001100000000000000000000000000",
+       256, "666666fe953de05ee5a85552b96a2c6236cae96b03ddd555555ee9bfaaaaaaaa"},
+      // type 24 A: 156 bits, padded to 160
+      {"011000000011101011110111001110011000100000001000110000000100001100101110000001010000111100111100110000101100100101010000000000000000000000000000000000000000",
+       256, "666666feaec21fa15a5aabeb793505416bdbacaaaaaaaaaa9f2680aaaaaaaaaa"},
+      // type 21 with a long name: more than 168 bits, 2 slots
+      {"010101000011101011110111001110011000100000100000110000001011000010101001001100110000000110000111100111000011110000000000100100100010010000001010000111110000000111000000010110010000010110100011001101000100101000001010010000101101000101101000111000111000011110010000000000000000010101100010010001110000010101000010010011110011101000000011100000010011010001010000",
+       512, "666666fe993de05ea5a95451d9eed50a4241556db69afd6aaa119a8b274db2b5962c740d6b6ab2a5c2cd5ac127bab56c54dd31202aaaaaaaaaaaaaaaaaaaaaaa"},
+      // 168 1s: stuffed past one slot
+      {"111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111",
+       264, "666666fe07e07e07e07e07e07e07e07e07e07e07e07e07e07e07e07e07a47080aa"},
+      // 1008 bits (a long type 8): 5 slots
+      {"001000000010111110101001111010011001001000010011111000111010110010011010111110100000100110100111100100001010000011011110100000111000011010010101111000010000011000110011011010111111001111011111101010011101111110100100011001001000010011100101000100010111001100110100001010000001101000001010001011111110111011101011011001111000001010101101010011111100100011110101011111111101110011111000001001100001011000011000110100001101000110110010110001111101000010100111110010010001010101100101111001110110001110000110000001111101101100111000111010101101100111010010010000110010101101001111000111000101111011100001010001100111001000000011101101111110100011011000100001001110000101000011010011101100100101000001111110111010101101001100000110101111110111110000111011010111110100100000100011001010100001111000100111100111110110001010110111100010000010011001101011110000011001110011111110111111111000100000001110011110111101100001000001110011110001001101100010110110001010111111110001100110011011001110101010000001001011110011",
+       1280, "666666feadf24c4f2425d08cc4c0daf652567c158a3228751118efc1ecfced922d720b442c5658a6be5e04fc895c605ade7e0687408972a2ac2c6e0bac0b1219647bf5dd7d4717a608e4fac6412f5f35e2dbc5439617128a056f648563f19bb62c0d7ee0fd528b4cbefb816583a92204c5778fdf8adbdf051ea827634d1f98b88845992efdc273faaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"},
+      // a few bits
+      {"101101", 256, "666666fe9c182afeaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"},
+    };
+
+    static std::vector<unsigned char> packed(const char *bits)
+    {
+      std::vector<unsigned char> bytes((strlen(bits) + 7)/8, 0x0);
+      for (size_t i = 0; bits[i]; i++)
+        bytes[i >> 3] |= (bits[i] - '0') << (7 - (i & 7));
+      return bytes;
+    }
+
+    static std::vector<unsigned char> from_hex(const char *hex)
+    {
+      std::vector<unsigned char> bytes(strlen(hex)/2);
+      for (size_t i = 0; i < bytes.size(); i++)
+        bytes[i] = strtol(std::string(hex + 2*i, 2).c_str(), NULL, 16);
+      return bytes;
+    }
+
+    // Random bytes, mostly 1s when dense (to stuff a lot)
+    static std::vector<unsigned char> random_bytes(int n, bool dense)
+    {
+      std::vector<unsigned char> bytes(n);
+      for (int i = 0; i < n; i++)
+        bytes[i] = dense ? 0xff & ~(1 << (rand() % 16)) : rand() & 0xff;
+      return bytes;
+    }
+
+    void
+    qa_ais_frame::t1_golden_frames()
+    {
+      for (size_t i = 0; i < sizeof(golden)/sizeof(golden[0]); i++) {
+        std::vector<unsigned char> payload = packed(golden[i].payload);
+        std::vector<unsigned char> expected = from_hex(golden[i].frame);
+        int nbits = strlen(golden[i].payload);
+        std::vector<unsigned char> frame(frame_max_bytes(nbits));
+        CPPUNIT_ASSERT_EQUAL(golden[i].frame_bits, frame_packed(&payload[0], nbits, &frame[0], true));
+        CPPUNIT_ASSERT(frame.size() >= expected.size());
+        CPPUNIT_ASSERT(!memcmp(&frame[0], &expected[0], expected.size()));
+
+        // the bits after the payload do not matter
+        if (nbits & 7) {
+          payload.back() |= 0xff >> (nbits & 7);
+          frame_packed(&payload[0], nbits, &frame[0], true);
+          CPPUNIT_ASSERT(!memcmp(&frame[0], &expected[0], expected.size()));
+        }
+      }
+    }
+
+    void
+    qa_ais_frame::t2_crc16()
+    {
+      srand(1);
+      for (int n = 1; n < 64; n++) {
+        std::vector<unsigned char> data = random_bytes(n, n & 1);
+        std::vector<char> bits(8*n);
+        byte_unpacking(&data[0], &bits[0], 8*n);
+        char crc_bits[16];
+        compute_crc(&bits[0], crc_bits, 8*n);
+        unsigned char expected[2];
+        byte_packing(crc_bits, expected, 16);
+
+        unsigned short crc = crc16(&data[0], n);
+        CPPUNIT_ASSERT_EQUAL((int) expected[0], crc & 0xff);
+        CPPUNIT_ASSERT_EQUAL((int) expected[1], crc >> 8);
+      }
+    }
+
+    void
+    qa_ais_frame::t3_stuff_packed()
+    {
+      srand(2);
+      for (int n = 1; n < 80; n++) {
+        std::vector<unsigned char> data = random_bytes(n, n & 1);
+        std::vector<char> bits(8*n), stuffed(10*n);
+        byte_unpacking(&data[0], &bits[0], 8*n);
+        int expected = stuff(&bits[0], &stuffed[0], 8*n);
+        std::vector<unsigned char> expected_bytes((expected + 7)/8, 0x0);
+        byte_packing(&stuffed[0], &expected_bytes[0], expected);
+        if (expected & 7)
+          for (int i = expected & ~7; i < expected; i++)
+            expected_bytes.back() |= stuffed[i] << (7 - (i & 7));
+
+        std::vector<unsigned char> out(10*n/8 + 1, 0xcc);
+        CPPUNIT_ASSERT_EQUAL(expected, stuff_packed(&data[0], n, &out[0]));
+        CPPUNIT_ASSERT(!memcmp(&out[0], &expected_bytes[0], expected_bytes.size()));
+      }
+    }
+
+    void
+    qa_ais_frame::t4_nrzi_packed()
+    {
+      srand(3);
+      for (int n = 1; n < 80; n++) {
+        std::vector<unsigned char> data = random_bytes(n, n & 1);
+        std::vector<char> bits(8*n);
+        byte_unpacking(&data[0], &bits[0], 8*n);
+        nrz_to_nrzi(&bits[0], 8*n);
+        std::vector<unsigned char> expected(n);
+        byte_packing(&bits[0], &expected[0], 8*n);
+
+        nrzi_packed(&data[0], n);
+        CPPUNIT_ASSERT(data == expected);
+      }
+    }
+
+    void
+    qa_ais_frame::t5_frame_slots()
+    {
+      static const int longest[] = {168, 440, 696, 952, 1008};
+      CPPUNIT_ASSERT_EQUAL(1, frame_slots(1));
+      for (int slots = 1; slots <= 5; slots++) {
+        CPPUNIT_ASSERT_EQUAL(slots, frame_slots(longest[slots-1]));
+        CPPUNIT_ASSERT_EQUAL(slots < 5 ? slots + 1 : 0, frame_slots(longest[slots-1] + 1));
+      }
+
+      // the longest payloads of each slot count, stuffed a lot or not: the frame fills its slots,
+      // and never goes past frame_max_bytes()
+      srand(5);
+      for (int i = 0; i < 50; i++)
+        for (int slots = 1; slots <= 5; slots++) {
+          int nbits = longest[slots-1];
+          std::vector<unsigned char> payload = random_bytes(nbits/8, i & 1);
+          std::vector<unsigned char> frame(frame_max_bytes(nbits) + 1, 0xcc);
+          int len = frame_packed(&payload[0], nbits, &frame[0], false);
+          CPPUNIT_ASSERT(len >= slots*256 && len % 8 == 0);
+          CPPUNIT_ASSERT(len/8 <= frame_max_bytes(nbits));
+          CPPUNIT_ASSERT_EQUAL(0xcc, (int) frame.back());
+        }
+
+      std::vector<unsigned char> payload(MAX_PAYLOAD/8 + 1), frame(frame_max_bytes(MAX_PAYLOAD + 8));
+      CPPUNIT_ASSERT_EQUAL(-1, frame_packed(&payload[0], MAX_PAYLOAD + 1, &frame[0], true));
+    }
+
+    void
+    qa_ais_frame::t6_frames_without_nrzi()
+    {
+      // golden[0] and golden[5], framed by AIVDM_Frame.py with enable_NRZI=False
+      static const char *frames[] = {
+        "aaaaaa7e205cef8e688380041a20c5acd25062217dccc000000e629f80000000",
+        "aaaaaa7e2debc07e000000000000000000000000000000000000000000000000",
+      };
+      static const int which[] = {0, 5};
+      for (int i = 0; i < 2; i++) {
+        std::vector<unsigned char> payload = packed(golden[which[i]].payload);
+        std::vector<unsigned char> expected = from_hex(frames[i]);
+        int nbits = strlen(golden[which[i]].payload);
+        std::vector<unsigned char> frame(frame_max_bytes(nbits));
+        CPPUNIT_ASSERT_EQUAL(256, frame_packed(&payload[0], nbits, &frame[0], false));
+        CPPUNIT_ASSERT(!memcmp(&frame[0], &expected[0], expected.size()));
+
+        // NRZI is the only difference
+        nrzi_packed(&frame[0], 32);
+        CPPUNIT_ASSERT(!memcmp(&frame[0], &from_hex(golden[which[i]].frame)[0], 32));
+      }
+    }
+
+  } /* namespace AISTX */
+} /* namespace gr */
@@ -0,0 +1,56 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ *
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ *
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+
+#ifndef _QA_AIS_FRAME_H_
+#define _QA_AIS_FRAME_H_
+
+#include <cppunit/extensions/HelperMacros.h>
+#include <cppunit/TestCase.h>
+
+namespace gr {
+  namespace AISTX {
+
+    // Golden frames of the packed frame steps, and the packed steps against the bit per char ones
+    class qa_ais_frame : public CppUnit::TestCase
+    {
+    public:
+      CPPUNIT_TEST_SUITE(qa_ais_frame);
+      CPPUNIT_TEST(t1_golden_frames);
+      CPPUNIT_TEST(t2_crc16);
+      CPPUNIT_TEST(t3_stuff_packed);
+      CPPUNIT_TEST(t4_nrzi_packed);
+      CPPUNIT_TEST(t5_frame_slots);
+      CPPUNIT_TEST(t6_frames_without_nrzi);
+      CPPUNIT_TEST_SUITE_END();
+
+    private:
+      void t1_golden_frames();
+      void t2_crc16();
+      void t3_stuff_packed();
+      void t4_nrzi_packed();
+      void t5_frame_slots();
+      void t6_frames_without_nrzi();
+    };
+
+  } /* namespace AISTX */
+} /* namespace gr */
+
+#endif /* _QA_AIS_FRAME_H_ */
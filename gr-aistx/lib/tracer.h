@@ -0,0 +1,85 @@
+/* -*- c++ -*- */
+/*
+ * Copyright 2013 <+YOU OR YOUR COMPANY+>.
+ *
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ *
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifndef INCLUDED_AISTX_TRACER_H
+#define INCLUDED_AISTX_TRACER_H
+
+#include <AISTX/trace.h>
+#include <gnuradio/logger.h>
+#include <boost/atomic.hpp>
+#include <time.h>
+
+#define TRACE_MAX_PER_SEC 20
+
+namespace gr {
+  namespace AISTX {
+
+    // Leveled and rate limited tracing of a block. The level is checked before
+    // anything is formatted: a trace that is off costs a load and a compare.
+    class tracer
+    {
+     private:
+      boost::atomic<int> d_level;
+      boost::atomic<long> d_second;		// of the messages counted in d_count
+      boost::atomic<int> d_count;
+      boost::atomic<unsigned long> d_suppressed;
+
+     public:
+      tracer() : d_level(TRACE_OFF), d_second(0), d_count(0), d_suppressed(0) {}
+
+      void set_level(int level) { d_level.store(level, boost::memory_order_relaxed); }
+      int level() const { return d_level.load(boost::memory_order_relaxed); }
+      bool on(int level) const { return level <= d_level.load(boost::memory_order_relaxed); }
+
+      // May a message go out now? suppressed is set to the messages held back
+      // since the last one that went out.
+      bool allow(unsigned long &suppressed)
+      {
+        long now = time(NULL);
+        if (d_second.exchange(now) != now)
+          d_count = 0;
+        if (++d_count > TRACE_MAX_PER_SEC) {
+          d_suppressed++;
+          return false;
+        }
+        suppressed = d_suppressed.exchange(0);
+        return true;
+      }
+    };
+
+// Trace msg (anything that goes to a stream: "a" << b) at a level, through logger
+#define AISTX_TRACE(tracer, level, GR_LOG, logger, msg) \
+    do { \
+      unsigned long _suppressed; \
+      if ((tracer).on(level) && (tracer).allow(_suppressed)) { \
+        if (_suppressed) \
+          GR_LOG(logger, _suppressed << " trace messages suppressed"); \
+        GR_LOG(logger, msg); \
+      } \
+    } while (0)
+
+#define AISTX_WARN(tracer, logger, msg) AISTX_TRACE(tracer, TRACE_WARN, GR_LOG_WARN, logger, msg)
+#define AISTX_INFO(tracer, logger, msg) AISTX_TRACE(tracer, TRACE_INFO, GR_LOG_INFO, logger, msg)
+#define AISTX_DEBUG(tracer, logger, msg) AISTX_TRACE(tracer, TRACE_DEBUG, GR_LOG_DEBUG, logger, msg)
+
+  } // namespace AISTX
+} // namespace gr
+
+#endif /* INCLUDED_AISTX_TRACER_H */
@@ -8,12 +8,15 @@
 %include "AISTX_swig_doc.i"
 
 %{
+#include "AISTX/trace.h"
 #include "AISTX/nrz_to_nrzi.h"
 #include "AISTX/Build_Frame.h"
 #include "AISTX/DebugME.h"
 %}
 
 
+%include "AISTX/trace.h"
+
 %include "AISTX/nrz_to_nrzi.h"
 GR_SWIG_BLOCK_MAGIC2(AISTX, nrz_to_nrzi);
 
@@ -0,0 +1,83 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_Armor.py: the vectorized armoring against the scalar one.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import unittest
+
+import AIVDM_Armor
+
+numpy = AIVDM_Armor.numpy
+
+
+@unittest.skipIf(numpy is None, "NumPy is required")
+class TestBatch(unittest.TestCase):
+
+	def setUp(self):
+		rng = numpy.random.RandomState(1)
+		self.matrix = rng.randint(0, 256, (40, 21)).astype(numpy.uint8)
+		# times of every number of digits, and a fractional one
+		self.times = numpy.array([0, 1, 9, 10, 99, 1700000000, 123456.7] + list(rng.randint(0, 2**33, 33)), dtype=float)
+
+	def scalar(self, armorer, times=None):
+		lines = []
+		for (n, row) in enumerate(self.matrix):
+			timestamp = None if times is None else times[n]
+			lines.extend(armorer.sentences(row.tobytes(), 168, timestamp=timestamp))
+		return "".join(line + "\n" for line in lines)
+
+	def test_armor_batch(self):
+		for length in (6, 38, 162, 168):
+			(chars, fill) = AIVDM_Armor.armor_batch(self.matrix, length)
+			for (row, line) in zip(self.matrix, chars):
+				self.assertEqual(AIVDM_Armor.armor(row.tobytes(), length), (line.tobytes().decode("ascii"), fill))
+
+	def test_sentences_batch(self):
+		for source in (None, "AISTX"):
+			batch = AIVDM_Armor.Armorer("B", source=source).sentences_batch(self.matrix, 168)
+			self.assertEqual(batch.tobytes().decode("ascii"), self.scalar(AIVDM_Armor.Armorer("B", source=source)))
+
+	def test_tag_blocks_batch(self):
+		# the same records give the same sentences and checksums through either path
+		for source in (None, "AISTX"):
+			batch = AIVDM_Armor.Armorer("A", source=source).sentences_batch(self.matrix, 168, self.times)
+			self.assertEqual(batch.tobytes().decode("ascii"), self.scalar(AIVDM_Armor.Armorer("A", source=source), self.times))
+
+		(tags, keep) = AIVDM_Armor.tag_blocks_batch(None, self.times, len(self.times))
+		for (n, t) in enumerate(self.times):
+			self.assertEqual(tags[n][keep[n]].tobytes().decode("ascii"), AIVDM_Armor.tag_block(timestamp=t))
+
+	def test_fractional_time(self):
+		# both paths round down
+		times = [0.5, 1.999, 9.99999, 99.5, 1700000000.9]
+		(tags, keep) = AIVDM_Armor.tag_blocks_batch("AISTX", times, len(times))
+		for (n, t) in enumerate(times):
+			self.assertEqual(tags[n][keep[n]].tobytes().decode("ascii"), AIVDM_Armor.tag_block("AISTX", t))
+			self.assertEqual(AIVDM_Armor.tag_block("AISTX", t), AIVDM_Armor.tag_block("AISTX", int(t)))
+
+	def test_negative_time(self):
+		for t in (-1, -0.5):
+			self.assertRaises(ValueError, AIVDM_Armor.tag_blocks_batch, None, [t], 1)
+			self.assertRaises(ValueError, AIVDM_Armor.tag_block, None, t)
+
+
+class TestSentences(unittest.TestCase):
+
+	def test_fragments(self):
+		armorer = AIVDM_Armor.Armorer("A")
+		(data, length) = AIVDM_Armor.bits_to_packed("01" * 212)
+		sentences = armorer.sentences(data, length)
+		self.assertEqual([s.split(",")[1:4] for s in sentences], [["2", "1", "0"], ["2", "2", "0"]])
+		self.assertEqual(armorer.sentences(data, length)[0].split(",")[3], "1")
+		for s in sentences:
+			(body, c) = s[1:].split("*")
+			self.assertEqual(int(c, 16), AIVDM_Armor.checksum(body))
+
+	def test_tag_block(self):
+		self.assertEqual(AIVDM_Armor.tag_block("AISTX", 1700000000), "\\s:AISTX,c:1700000000*6D\\")
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,59 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of the batch encoders of AIVDM_Encoder.py: every row is the payload of the scalar encoder.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import unittest
+
+import AIVDM_Encoder
+
+numpy = AIVDM_Encoder.numpy
+
+
+def reports(rows, seed=0):
+	"""Random (mmsi, status, speed, lon, lat, course, second) columns, every value within range."""
+	rng = numpy.random.RandomState(seed)
+	return (rng.randint(200000000, 780000000, rows), rng.randint(0, 16, rows), rng.uniform(0, 102.2, rows),
+		rng.uniform(-180, 180, rows), rng.uniform(-90, 90, rows), rng.uniform(0, 359.9, rows), rng.randint(0, 64, rows))
+
+def scalar_rows(encoder, columns):
+	return [encoder(*[c[n].item() for c in columns], packed=True)[0] for n in range(len(columns[0]))]
+
+
+@unittest.skipIf(numpy is None, "NumPy is required")
+class TestBatch(unittest.TestCase):
+
+	def test_encode_1_batch(self):
+		columns = reports(500)
+		matrix = AIVDM_Encoder.encode_1_batch(*columns)
+		self.assertEqual(matrix.shape, (500, 21))
+		self.assertEqual([row.tobytes() for row in matrix], scalar_rows(AIVDM_Encoder.encode_1, columns))
+
+	def test_encode_18_batch(self):
+		columns = reports(500, 1)
+		columns = columns[:1] + columns[2:]
+		matrix = AIVDM_Encoder.encode_18_batch(*columns)
+		self.assertEqual([row.tobytes() for row in matrix], scalar_rows(AIVDM_Encoder.encode_18, columns))
+
+	def test_scalar_columns(self):
+		# scalars are broadcast to every row
+		(mmsi, status, speed, lon, lat, course, second) = reports(20, 2)
+		matrix = AIVDM_Encoder.encode_1_batch(247320162, 15, speed, lon, lat, 83.4, 38)
+		for n in range(20):
+			self.assertEqual(matrix[n].tobytes(), AIVDM_Encoder.encode_1(247320162, 15, speed[n], lon[n], lat[n], 83.4, 38, packed=True)[0])
+
+	def test_rounding(self):
+		# halves round as the built-in round() of the interpreter does
+		speed = numpy.array([0.05, 0.15, 0.25, 10.45, 1.5])
+		matrix = AIVDM_Encoder.encode_18_batch(247320162, speed, 0.5/600000, -2.5/600000, 0.25, 1)
+		for n in range(len(speed)):
+			self.assertEqual(matrix[n].tobytes(), AIVDM_Encoder.encode_18(247320162, speed[n], 0.5/600000, -2.5/600000, 0.25, 1, packed=True)[0])
+
+	def test_empty(self):
+		self.assertEqual(AIVDM_Encoder.encode_1_batch(*[c[:0] for c in reports(1)]).shape, (0, 21))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,73 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_Corpus.py: the same corpus whatever the number of processes.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import AIVDM_Corpus
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "AIVDM_Corpus.py")
+
+
+def corpus_bytes(outdir):
+	"""The files of a corpus, concatenated in shard order, per format."""
+	data = {}
+	for ext in ("nmea", "bin"):
+		data[ext] = b"".join(open(path, "rb").read() for path in sorted(glob.glob(os.path.join(outdir, "*." + ext))))
+	return data
+
+
+class TestCorpus(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tmp)
+
+	def outdir(self, name):
+		path = os.path.join(self.tmp, name)
+		os.makedirs(path)
+		return path
+
+	def test_default_shards(self):
+		self.assertEqual(AIVDM_Corpus.default_shards(0), 1)
+		self.assertEqual(AIVDM_Corpus.default_shards(AIVDM_Corpus.SHARD_MESSAGES), 1)
+		self.assertEqual(AIVDM_Corpus.default_shards(AIVDM_Corpus.SHARD_MESSAGES + 1), 2)
+
+	def test_processes(self):
+		# several shards, generated by 1 or 2 processes
+		corpora = []
+		for processes in (1, 2):
+			settings = {"seed": 7, "mix": AIVDM_Corpus.DEFAULT_MIX, "stations": 50, "formats": ["nmea", "bin"],
+				"channel": "A", "outdir": self.outdir("p%d" % processes), "prefix": "corpus"}
+			results = list(AIVDM_Corpus.generate(settings, 3000, 5, processes))
+			self.assertEqual(sorted(r["shard"] for r in results), list(range(5)))
+			self.assertEqual(sum(r["messages"] for r in results), 3000)
+			corpora.append(corpus_bytes(settings["outdir"]))
+		self.assertTrue(corpora[0]["nmea"] and corpora[0]["bin"])
+		self.assertEqual(corpora[0], corpora[1])
+
+	def test_command_line(self):
+		# the default number of shards does not depend on --processes
+		corpora = []
+		for processes in (1, 2):
+			outdir = self.outdir("p%d" % processes)
+			with open(os.devnull, "w") as devnull:
+				subprocess.check_call([sys.executable, SCRIPT, "--messages=2000", "--seed=3", "--format=nmea,bin",
+					"--processes=%d" % processes, "--outdir=" + outdir], stderr=devnull)
+			corpora.append(corpus_bytes(outdir))
+		self.assertEqual(corpora[0], corpora[1])
+
+
+if __name__ == "__main__":
+	unittest.main()
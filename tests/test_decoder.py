@@ -0,0 +1,130 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_Decoder.py: decode(encode(x)) gives x back, within the resolution of every field.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import AIVDM_Armor
+import AIVDM_Decoder
+import AIVDM_Encoder
+
+numpy = AIVDM_Decoder.numpy
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# Message descriptions (encoder options besides the defaults), for every message type
+MESSAGES = [
+	{"type": "1", "mmsi": 970010000, "status": 0, "speed": 102.2, "long": -179.99, "lat": -89.5, "course": 359.9, "ts": 59},
+	{"type": "4", "long": -73.985, "lat": -40.75},
+	{"type": "14", "sart_msg": "Safety related message, lower case!"},
+	{"type": "18", "mmsi": 338123456, "speed": 45.3, "long": -122.4194, "lat": 37.7749, "course": 271.2, "ts": 12},
+	{"type": "20", "fatdmaoffset": 100, "fatdmaslots": 2, "fatdmatimeout": 3, "fatdmaincrement": 750},
+	{"type": "21", "aid_type": 1, "aid_name": "BUOY 7", "vsize": "30x10"},
+	{"type": "21", "aid_type": 20, "aid_name": "A VERY LONG AID TO NAVIGATION NAME", "long": -9.5, "lat": -45.25, "v_AtoN": True},
+	{"type": "22", "ne_lon": -9.9, "ne_lat": -45.8, "sw_lon": -10.5, "sw_lat": -46.5},
+	{"type": "23", "interval": 3, "quiet": 7},
+	{"type": "24", "part": "A", "vname": "MY VESSEL NAME"},
+	{"type": "24", "part": "B", "callsign": "WDC1234", "vsize": "31x7", "vtype": 37},
+]
+
+
+def options(**fields):
+	values = AIVDM_Encoder.option_parser().get_default_values()
+	for (name, value) in fields.items():
+		setattr(values, name, value)
+	return values
+
+
+class TestRoundTrip(unittest.TestCase):
+
+	def test_every_type(self):
+		for message in MESSAGES:
+			o = options(**message)
+			fields = AIVDM_Decoder.decode_bits(AIVDM_Encoder.encode_message(o))
+			self.assertEqual(AIVDM_Decoder.check(o, fields), [], message)
+
+	def test_fields(self):
+		fields = AIVDM_Decoder.decode_bits(AIVDM_Encoder.encode_1(970010000, 0, 102.2, -179.99, -89.5, 359.9, 59))
+		self.assertEqual((fields["type"], fields["mmsi"], fields["status"], fields["second"]), (1, 970010000, 0, 59))
+		self.assertAlmostEqual(fields["speed"], 102.2)
+		self.assertAlmostEqual(fields["lon"], -179.99)
+		self.assertAlmostEqual(fields["lat"], -89.5)
+		self.assertAlmostEqual(fields["course"], 359.9)
+		self.assertEqual((fields["turn"], fields["heading"]), (-128, 511))
+
+		fields = AIVDM_Decoder.decode_bits(AIVDM_Encoder.encode_24(366123456, "B", __callsign="WDC1234", __vsize="31x7", __vtype=37))
+		self.assertEqual((fields["part"], fields["callsign"], fields["shiptype"]), (1, "WDC1234", 37))
+		self.assertEqual((fields["to_bow"], fields["to_port"]), (15, 3))
+
+	def test_mismatch(self):
+		o = options(**MESSAGES[0])
+		fields = AIVDM_Decoder.decode_bits(AIVDM_Encoder.encode_message(o))
+		o.lat = -89.4
+		self.assertEqual([m[0] for m in AIVDM_Decoder.check(o, fields)], ["lat"])
+
+	def test_packed(self):
+		for message in MESSAGES:
+			o = options(**message)
+			self.assertEqual(AIVDM_Decoder.decode_packed(*AIVDM_Encoder.encode_message(o, packed=True)),
+				AIVDM_Decoder.decode_bits(AIVDM_Encoder.encode_message(o)))
+
+	def test_sentences(self):
+		# through NMEA, fragments and tag blocks included
+		armorer = AIVDM_Armor.Armorer("A", source="AISTX")
+		for message in MESSAGES:
+			o = options(**message)
+			(data, length) = AIVDM_Encoder.encode_message(o, packed=True)
+			lines = [s + "\n" for s in armorer.sentences(data, length, timestamp=1700000000)]
+			payloads = list(AIVDM_Decoder.read_payloads(lines))
+			self.assertEqual(len(payloads), 1)
+			self.assertEqual(AIVDM_Decoder.check(o, AIVDM_Decoder.decode(*payloads[0])), [], message)
+
+	def test_check_command(self):
+		# the records the encoder rejects, or that do not parse, have no payload to pair with
+		records = '{"type": 1, "speed": 12}\n{"type": 1, "speed": 500}\n{not json\n{"type": 18, "mmsi": 338123456}\n'
+		encoder = subprocess.Popen([sys.executable, os.path.join(TOP, "AIVDM_Encoder.py"), "--stream"],
+			stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+		payloads = encoder.communicate(records)[0]
+		(handle, path) = tempfile.mkstemp(suffix=".jsonl")
+		with os.fdopen(handle, "w") as f:
+			f.write(records)
+		try:
+			decoder = subprocess.Popen([sys.executable, os.path.join(TOP, "AIVDM_Decoder.py"), "--check=" + path],
+				stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+			out = decoder.communicate(payloads)[0]
+		finally:
+			os.remove(path)
+		self.assertEqual((decoder.returncode, out), (0, "2 payloads checked, 0 mismatching\n"))
+
+	def test_errors(self):
+		self.assertRaises(ValueError, AIVDM_Decoder.decode_bits, "00001")
+		self.assertRaises(ValueError, AIVDM_Decoder.decode_bits, "000010" + "0"*162)
+		self.assertRaises(ValueError, AIVDM_Decoder.decode_bits, "000001" + "0"*30)
+
+
+@unittest.skipIf(numpy is None or AIVDM_Encoder.numpy is None, "NumPy is required")
+class TestBatch(unittest.TestCase):
+
+	def test_decode_batch(self):
+		rng = numpy.random.RandomState(3)
+		columns = (rng.randint(200000000, 780000000, 100), rng.randint(0, 16, 100), rng.uniform(0, 102.2, 100),
+			rng.uniform(-180, 180, 100), rng.uniform(-90, 90, 100), rng.uniform(0, 359.9, 100), rng.randint(0, 64, 100))
+		matrix = AIVDM_Encoder.encode_1_batch(*columns)
+		fields = AIVDM_Decoder.decode_batch(matrix, 1)
+		for n in range(100):
+			expected = AIVDM_Decoder.decode_packed(matrix[n].tobytes(), 168)
+			for (name, values) in fields.items():
+				self.assertEqual(values[n], expected[name], name)
+		numpy.testing.assert_array_equal(fields["mmsi"], columns[0])
+		self.assertTrue(numpy.all(numpy.abs(fields["lon"] - columns[3]) <= 0.5/600000 + 1e-9))
+
+
+if __name__ == "__main__":
+	unittest.main()
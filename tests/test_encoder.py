@@ -0,0 +1,224 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_Encoder.py: payloads against the ones of the original encoder, and its building blocks.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import unittest
+
+import AIVDM_Encoder
+
+# (encoder, positional args, keyword args, payload), the payloads as printed by the original
+# AIVDM_Encoder.py (before the bit-writer), for every message type
+GOLDEN = [
+	('encode_1', (247320162, 15, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {},
+		'000001000011101011110111001110011000101111100000000000000001000000101100100000101101000110011010001001010000010100100011010000101111111111001100000000000000000000000000'),
+	('encode_1', (970010000, 0, 102.2, -179.99, -89.5, 359.9, 59), {},
+		'000001001110011101000100101101100100000000100000001111111110010011001000000100100011100001001100110010011010011000001110000011111111111111110110000000000000000000000000'),
+	('encode_1', (1, 8, 0, 0, 0, 0, 0), {},
+		'000001000000000000000000000000000000011000100000000000000000000000000000000000000000000000000000000000000000000000000000000000001111111110000000000000000000000000000000'),
+	('encode_4', (247320162, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {},
+		'000100000011101011110111001110011000100000000000000000000000011000111100111100100000101100100000101101000110011010001001010000010100100001000000000000000000000000000000'),
+	('encode_4', (2470000, 0, -73.985, -40.75, 0, 0), {},
+		'000100000000000010010110110000011100000000000000000000000000011000111100111100111010101101010100101101010001101000101011101100001100000001000000000000000000000000000000'),
+	('encode_14', (970010000, 'SART ACTIVE'), {},
+		'0011100011100111010001001011011001000000010011000001010010010100100000000001000011010100001001010110000101'),
+	('encode_14', (247320162, 'safety related message, lower case!'), {},
+		'0011100000111010111101110011100110001000010011000001000110000101010100011001100000010010000101001100000001010100000101000100100000001101000101010011010011000001000111000101101100100000001100001111010111000101010010100000000011000001010011000101100001'),
+	('encode_18', (247320162, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38), {},
+		'010010000011101011110111001110011000100000000000000000010000001011001000001011010001100110100010010100000101001000110100001011111111110011000101110011100000000000000110'),
+	('encode_18', (338123456, 45.3, -122.4194, 37.7749, 271.2, 12), {},
+		'010010000101000010011101011010110000000000000001110001010101110011111001101111000100000101011001110101101110110010101001100011111111100110000101110011100000000000000110'),
+	('encode_20', (247320162, 100, 2, 3, 750), {},
+		'010100000011101011110111001110011000100000000110010000100110101110111000'),
+	('encode_21', (247320162, 1, 'BUOY 7', 9.72357833333333, 45.6910166666667, '90x14', 0), {},
+		'01010100001110101111011100111001100010000010000000000000000000000000000000000000000000000000000000000000000000000000000000000000000100101010011110110011000001101110000001011001000001011010001100110100010010100000101001000010110100010110100011100011100001111001000000000000'),
+	('encode_21', (992471234, 20, 'A VERY LONG AID TO NAVIGATION NAME', -9.5, -45.25, '10x4', 1), {},
+		'010101001110110010011111101000110000101010000000110000001011000010101001001100110000000110000111100111000011110000000000100100100010010000001010000111110000000111001111101010010000011001100000110011000011011100101010000000000000000000000000000000000000011110010000000001000000010101100010010001110000010101000010010011110011101000000011100000010011010001010000'),
+	('encode_22', (247320162, 2087, 2088, 9.9, 45.8, 9.5, 45.5), {},
+		'010110000011101011110111001110011000100010000010011110000010100000000000001011100110100001101011010110000000010110010001000011010101010010000010000000000000000000000000'),
+	('encode_22', (2470000, 2087, 2088, -9.9, -45.8, -10.5, -46.5), {},
+		'010110000000000010010110110000011100000010000010011110000010100000000111110100011001100110010100101010001111100111011001001100100110000010000010000000000000000000000000'),
+	('encode_23', (247320162, 9.9, 45.8, 9.5, 45.5, 1, 15), {},
+		'0101110000111010111101110011100110001000000001011100110100001101011010110000000010110010001000011010101010010000000000000000000000000000000000000000011111000000'),
+	('encode_24', (247320162, 'A'), {'__vname': 'NAN'},
+		'011000000011101011110111001110011000100000111000000100111000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000'),
+	('encode_24', (247320162, 'A'), {'__vname': 'MY VESSEL NAME'},
+		'011000000011101011110111001110011000100000110101100110000001011000010101001101001100010100110010000000111000000100110100010100000000000000000000000000000000'),
+	('encode_24', (247320162, 'B'), {'__vtype': 60, '__vsize': '90x14', '__callsign': 'KC9CAF'},
+		'011000000011101011110111001110011000100100111100000000000000000000000000000000000000000000001011000011111001000011000001000110000000000101101000101101000111000111000000'),
+	('encode_24', (366123456, 'B'), {'__vtype': 37, '__vsize': '31x7', '__callsign': 'WDC1234'},
+		'011000000101011101001010011001110000000100100101000000000000000000000000000000000000000000010111000100000011110001110010110011110100000001111000001111000011000011000000'),
+]
+
+
+def bits_to_packed(bits):
+	"""The packed form of an ASCII '0'/'1' payload, worked out independently of the encoder."""
+	data = bytearray((len(bits) + 7) // 8)
+	for (i, b) in enumerate(bits):
+		if b == "1":
+			data[i >> 3] |= 0x80 >> (i & 7)
+	return (bytes(data), len(bits))
+
+
+class TestGolden(unittest.TestCase):
+
+	def test_bits(self):
+		for (name, args, kwargs, bits) in GOLDEN:
+			self.assertEqual(getattr(AIVDM_Encoder, name)(*args, **kwargs), bits, "%s%r" % (name, args))
+
+	def test_packed(self):
+		for (name, args, kwargs, bits) in GOLDEN:
+			self.assertEqual(getattr(AIVDM_Encoder, name)(*args, packed=True, **kwargs), bits_to_packed(bits), "%s%r" % (name, args))
+
+	def test_every_type(self):
+		self.assertEqual(set(name for (name, args, kwargs, bits) in GOLDEN),
+			set(name for name in dir(AIVDM_Encoder) if name.startswith("encode_") and name[7:].isdigit()))
+
+
+class TestBitWriter(unittest.TestCase):
+
+	def test_put(self):
+		w = AIVDM_Encoder.BitWriter()
+		w.put((1, 6), (0, 2), (247320162, 30))
+		w.put((5, 3))
+		self.assertEqual(w.length, 41)
+		self.assertEqual(w.bits(), "000001" + "00" + format(247320162, "030b") + "101")
+
+	def test_masking(self):
+		# negative values in two's complement, too wide ones cut to their width
+		w = AIVDM_Encoder.BitWriter()
+		w.put((-1, 4), (-2, 8), (0x1ff, 4))
+		self.assertEqual(w.bits(), "1111" + "11111110" + "1111")
+
+	def test_text(self):
+		w = AIVDM_Encoder.BitWriter()
+		w.put((3, 2))
+		w.text("A@ 0")
+		self.assertEqual(w.bits(), "11" + "000001" + "000000" + "100000" + "110000")
+		self.assertEqual(w.length, 26)
+
+	def test_pack(self):
+		w = AIVDM_Encoder.BitWriter()
+		w.put((0x5, 3), (0xabc, 12))
+		self.assertEqual(w.pack(), bits_to_packed(w.bits()))
+		self.assertEqual(AIVDM_Encoder.BitWriter().pack(), (b"", 0))
+		self.assertEqual(AIVDM_Encoder.BitWriter().bits(), "")
+
+	def test_render_bits(self):
+		self.assertEqual(AIVDM_Encoder.render_bits(5, 8), "00000101")
+		self.assertEqual(AIVDM_Encoder.pack_bits(5, 3), (b"\xa0", 3))
+
+
+def reference_text(string):
+	"""Six-bit encoding as the original encode_string() did it, for the characters of the alphabet."""
+	return "".join(format(AIVDM_Encoder.vocabolary.find(c), "b").rjust(6, "0") for c in string.upper())
+
+
+class TestText(unittest.TestCase):
+
+	def test_alphabet(self):
+		alphabet = AIVDM_Encoder.vocabolary
+		for string in (alphabet, alphabet.lower(), "KC9CAF", "My Vessel-Name 7"):
+			self.assertEqual(AIVDM_Encoder.encode_string(string), reference_text(string))
+		self.assertEqual(AIVDM_Encoder.encode_text(""), (0, 0))
+
+	def test_outside_alphabet(self):
+		# anything else becomes '?'
+		for c in ("~", "\xe9", "\t", "`"):
+			self.assertEqual(AIVDM_Encoder.encode_text("A" + c), (1 << 6 | 63, 12))
+
+	def test_memoized(self):
+		AIVDM_Encoder.text_cache.clear()
+		first = AIVDM_Encoder.encode_text("MEMOIZED NAME")
+		self.assertEqual(AIVDM_Encoder.text_cache.info()["misses"], 1)
+		self.assertTrue(AIVDM_Encoder.encode_text("MEMOIZED NAME") is first)
+		self.assertEqual(AIVDM_Encoder.text_cache.info()["hits"], 1)
+
+
+class TestLRUCache(unittest.TestCase):
+
+	def test_eviction(self):
+		cache = AIVDM_Encoder.LRUCache(maxsize=2)
+		cache.put("a", 1)
+		cache.put("b", 2)
+		self.assertEqual(cache.get("a"), 1)		# "b" is now the least recently used
+		cache.put("c", 3)
+		self.assertEqual(len(cache), 2)
+		self.assertEqual(cache.get("b"), None)
+		self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+		self.assertEqual(cache.info(), {"hits": 3, "misses": 1, "size": 2, "maxsize": 2})
+
+	def test_clear(self):
+		cache = AIVDM_Encoder.LRUCache()
+		cache.put("a", 1)
+		cache.get("a")
+		cache.clear()
+		self.assertEqual(cache.info(), {"hits": 0, "misses": 0, "size": 0, "maxsize": 4096})
+
+
+class TestStaticCache(unittest.TestCase):
+
+	def setUp(self):
+		self.cache = AIVDM_Encoder.static_cache
+		self.cache.clear()
+		self.cache.enabled = True
+
+	def tearDown(self):
+		self.cache.enabled = False
+		self.cache.clear()
+
+	def test_disabled(self):
+		# off by default: every call packs the payload again
+		self.cache.enabled = False
+		first = AIVDM_Encoder.encode_24(247320162, "A", __vname="CACHED")
+		second = AIVDM_Encoder.encode_24(247320162, "A", __vname="CACHED")
+		self.assertEqual(second, first)
+		self.assertFalse(second is first)
+		self.assertEqual(self.cache.info()["size"], 0)
+		self.assertFalse(AIVDM_Encoder.StaticCache().enabled)
+
+	def test_hit(self):
+		first = AIVDM_Encoder.encode_24(247320162, "A", __vname="CACHED")
+		self.assertTrue(AIVDM_Encoder.encode_24(247320162, "A", __vname="CACHED") is first)
+		# the packed payload is an entry of its own
+		self.assertEqual(AIVDM_Encoder.encode_24(247320162, "A", __vname="CACHED", packed=True), bits_to_packed(first))
+		self.assertEqual(self.cache.info()["hits"], 1)
+		self.assertEqual(len(self.cache), 2)
+
+	def test_changed_field(self):
+		# a static field changing is a miss: the new payload replaces the old one
+		for (name, args, kwargs, bits) in GOLDEN:
+			if name not in ("encode_21", "encode_24"):
+				continue
+			self.cache.clear()
+			self.assertEqual(getattr(AIVDM_Encoder, name)(*args, **kwargs), bits)
+			if name == "encode_21":
+				changed = getattr(AIVDM_Encoder, name)(*(args[:2] + ("OTHER NAME",) + args[3:]), **kwargs)
+			else:
+				changed = getattr(AIVDM_Encoder, name)(*args, **dict(kwargs, __vsize="20x4", __vname="OTHER NAME"))
+			self.assertNotEqual(changed, bits)
+			self.assertEqual(getattr(AIVDM_Encoder, name)(*args, **kwargs), bits)
+			self.assertEqual(self.cache.info()["hits"], 0)
+			self.assertEqual(self.cache.info()["invalidations"], 2)
+
+	def test_against_encoder(self):
+		# whatever is cached, the payload is the one of the fields given
+		for vname in ("ONE", "TWO", "ONE", "THREE", "ONE"):
+			self.assertEqual(AIVDM_Encoder.encode_24(247320162, "A", __vname=vname),
+				AIVDM_Encoder.render_bits(*AIVDM_Encoder.PACKERS["24A"](247320162, vname)))
+
+	def test_invalidate(self):
+		AIVDM_Encoder.encode_24(247320162, "A")
+		AIVDM_Encoder.encode_24(247320162, "B", packed=True)
+		AIVDM_Encoder.encode_24(247320163, "A")
+		self.assertEqual(self.cache.invalidate(247320162, "24B"), 1)
+		self.assertEqual(self.cache.invalidate(247320162), 1)
+		self.assertEqual(self.cache.invalidate(247320162), 0)
+		self.assertEqual(len(self.cache), 1)
+		self.assertEqual(self.cache.info()["invalidations"], 2)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,91 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_pre.pl --scenario: it accepts the values the encoder accepts, at the bounds of every field.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import AIVDM_Encoder
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "AIVDM_pre.pl")
+
+def has_perl():
+	try:
+		with open(os.devnull, "w") as devnull:
+			return subprocess.call(["perl", "-MJSON::PP", "-e", "1"], stderr=devnull) == 0
+	except OSError:
+		return False
+
+# (message fields, field name, values just inside and just outside its bounds)
+BOUNDS = [
+	({"type": "1"}, "speed", ["0", "102.3", "102.4", "-0.1", "1022", "1023"]),
+	({"type": "1"}, "course", ["0", "360", "409.5", "409.6", "3600"]),
+	({"type": "1"}, "lat", ["111.848", "-111.848", "111.849", "-111.849"]),
+	({"type": "1"}, "long", ["223.696", "-223.696", "223.697", "-223.697"]),
+	({"type": "1"}, "ts", ["63", "64"]),
+	({"type": "20"}, "fatdmaoffset", ["4095", "4096"]),
+	({"type": "20"}, "fatdmaincrement", ["2047", "2048"]),
+	({"type": "21"}, "aid_type", ["31", "32"]),
+	({"type": "22"}, "channel_a", ["4095", "4096"]),
+	({"type": "22"}, "ne_lon", ["218.45", "218.46"]),
+	({"type": "22"}, "sw_lat", ["-109.22", "-109.23"]),
+	({"type": "23"}, "quiet", ["15", "16"]),
+	({"type": "24", "part": "B"}, "vtype", ["255", "256"]),
+]
+
+
+def encodes(fields):
+	options = AIVDM_Encoder.option_parser().get_default_values()
+	for (name, value) in fields.items():
+		setattr(options, name, value)
+	try:
+		AIVDM_Encoder.encode_message(options)
+	except ValueError:
+		return False
+	return True
+
+
+@unittest.skipUnless(has_perl(), "perl and JSON::PP are required")
+class TestScenarioChecks(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.tmp)
+
+	def run_pre(self, fields, *args):
+		"""(exit status, stdout) of AIVDM_pre.pl on a one message scenario."""
+		scenario = os.path.join(self.tmp, "scenario.csv")
+		with open(scenario, "w") as f:
+			f.write(",".join(sorted(fields)) + "\n" + ",".join(fields[k] for k in sorted(fields)) + "\n")
+		process = subprocess.Popen(["perl", SCRIPT, "--scenario=" + scenario] + list(args),
+			stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+		(out, err) = process.communicate()
+		return (process.returncode, out)
+
+	def test_bounds(self):
+		for (message, name, values) in BOUNDS:
+			for value in values:
+				fields = dict(message, **{name: value})
+				(status, out) = self.run_pre(fields)
+				self.assertEqual(status == 0, encodes(fields), fields)
+
+	def test_not_a_number(self):
+		self.assertEqual(self.run_pre({"type": "1", "speed": "fast"})[0], 1)
+
+	def test_command(self):
+		(status, out) = self.run_pre({"type": "1"}, "--target=A", "--channel=B")
+		self.assertEqual(status, 0)
+		self.assertTrue(out.startswith("./AIVDM_Encoder.py --stream --packed < "), out)
+		self.assertTrue(out.rstrip().endswith("| ./AiS_TX.py --packed_file=- --stream --channel=B"), out)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,123 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of the range checks of the encoder inputs, scalar and vectorized.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import unittest
+
+import AIVDM_Encoder
+
+numpy = AIVDM_Encoder.numpy
+
+# A good type 1 report: (mmsi, status, speed, lon, lat, course, second)
+REPORT = (247320162, 15, 0.1, 9.72357833333333, 45.6910166666667, 83.4, 38)
+
+# (argument index, out of range value, field name) for encode_1
+OUT_OF_RANGE = [
+	(0, 1 << 30, "mmsi"),
+	(0, -1, "mmsi"),
+	(1, 16, "status"),
+	(2, 102.4, "speed"),
+	(2, -0.1, "speed"),
+	(3, 223.7, "lon"),
+	(4, -111.9, "lat"),
+	(5, 409.6, "course"),
+	(6, 64, "second"),
+]
+
+
+class TestScalar(unittest.TestCase):
+
+	def test_out_of_range(self):
+		for (index, value, name) in OUT_OF_RANGE:
+			args = REPORT[:index] + (value,) + REPORT[index+1:]
+			try:
+				AIVDM_Encoder.encode_1(*args)
+			except ValueError as e:
+				self.assertTrue(name in str(e), str(e))
+			else:
+				self.fail("encode_1: %s = %r accepted" % (name, value))
+
+	def test_bounds(self):
+		# the extreme values of every field fit
+		AIVDM_Encoder.encode_1((1 << 30) - 1, 15, 102.3, 223.6, -111.8, 409.5, 63)
+		AIVDM_Encoder.encode_1(0, 0, 0, -223.6, 111.8, 0, 0)
+		AIVDM_Encoder.encode_22(247320162, 4095, 0, 218.45, 109.22, -218.45, -109.22)
+
+	def test_every_packer(self):
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_4, 247320162, 0, 9.7, 120, 0, 0)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_18, 247320162, 0.1, 9.7, 45.6, 83.4, 64)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_20, 247320162, 4096, 2, 3, 750)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_21, 247320162, 32, "BUOY", 9.7, 45.6, "90x14", 0)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_22, 247320162, 2087, 2088, 9.9, 112, 9.5, 45.5)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_23, 247320162, 9.9, 45.8, 9.5, 45.5, 16, 15)
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_24, 247320162, "B", __callsign="TOOLONG1")
+		self.assertRaises(ValueError, AIVDM_Encoder.encode_24, 247320162, "B", __vsize="1024x14")
+		self.assertRaises(ValueError, AIVDM_Encoder.pack, "1", mmsi=1, status=0, speed=0, lon=0, lat=0, course=0, second=0, repeat=4)
+
+	def test_every_error(self):
+		# one ValueError names every field out of range
+		try:
+			AIVDM_Encoder.encode_1(1 << 30, 15, 0.1, 9.7, 45.6, 83.4, 64)
+		except ValueError as e:
+			self.assertTrue("mmsi" in str(e) and "second" in str(e), str(e))
+		else:
+			self.fail("encode_1: out of range inputs accepted")
+
+	def test_template(self):
+		template = AIVDM_Encoder.PositionTemplate(1, 247320162)
+		self.assertRaises(ValueError, template.encode, 102.4, 9.7, 45.6, 83.4, 38)
+		self.assertRaises(ValueError, template.value_raw, 1, 9*600000, 45*600000, 3600*2, 38)
+		self.assertRaises(ValueError, AIVDM_Encoder.PositionTemplate, 1, 1 << 30)
+
+
+@unittest.skipIf(numpy is None, "NumPy is required")
+class TestBatch(unittest.TestCase):
+
+	def columns(self, rows):
+		return [numpy.array([r[i] for r in rows]) for i in range(len(REPORT))]
+
+	def test_checked(self):
+		rows = [REPORT]
+		for (index, value, name) in OUT_OF_RANGE:
+			rows.append(REPORT[:index] + (value,) + REPORT[index+1:])
+			rows.append(REPORT)
+		(matrix, bad) = AIVDM_Encoder.encode_1_batch(*self.columns(rows), checked=True)
+
+		expected = []
+		for (n, row) in enumerate(rows):
+			try:
+				payload = AIVDM_Encoder.encode_1(*row, packed=True)[0]
+			except ValueError:
+				expected.append(True)
+				# the fields of a bad row are packed as zeros
+				self.assertEqual(matrix[n].tobytes(), AIVDM_Encoder.encode_1(0, 0, 0, 0, 0, 0, 0, packed=True)[0])
+				continue
+			expected.append(False)
+			self.assertEqual(matrix[n].tobytes(), payload)
+		self.assertEqual(bad.tolist(), expected)
+		self.assertEqual(bad.sum(), len(OUT_OF_RANGE))
+
+	def test_nan(self):
+		columns = self.columns([REPORT] * 4)
+		columns[3] = numpy.array([9.7, numpy.nan, 9.7, numpy.inf])
+		(matrix, bad) = AIVDM_Encoder.encode_1_batch(*columns, checked=True)
+		self.assertEqual(bad.tolist(), [False, True, False, True])
+
+	def test_scalar_out_of_range(self):
+		# a scalar column out of range makes every row bad
+		columns = self.columns([REPORT] * 3)
+		(matrix, bad) = AIVDM_Encoder.encode_1_batch(columns[0], 16, *columns[2:], checked=True)
+		self.assertEqual(bad.tolist(), [True] * 3)
+
+	def test_all_good(self):
+		columns = self.columns([REPORT] * 3)
+		(matrix, bad) = AIVDM_Encoder.encode_1_batch(*columns, checked=True)
+		self.assertFalse(bad.any())
+		self.assertTrue((matrix == AIVDM_Encoder.encode_1_batch(*columns)).all())
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,108 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of the packers compiled from AIVDM_Schema.py: against the field by field packing, and back through the decoders.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import random
+import unittest
+
+import AIVDM_Decoder
+import AIVDM_Encoder
+import AIVDM_Schema
+
+numpy = AIVDM_Encoder.numpy
+
+ALPHABET = AIVDM_Encoder.vocabolary
+
+
+def random_inputs(key, rng):
+	"""Random values (field name -> value) of the inputs of a schema, every one within range."""
+	values = {}
+	for f in AIVDM_Schema.inputs(key):
+		if f.width is None:
+			values[f.name] = "".join(rng.choice(ALPHABET) for i in range(rng.randint(0, 40)))
+		elif f.kind in "tr":
+			values[f.name] = "".join(rng.choice(ALPHABET) for i in range(rng.randint(0, f.width // 6)))
+		else:
+			(low, high) = AIVDM_Encoder.field_bounds(f)
+			x = rng.randint(low, high)
+			values[f.name] = x / float(f.scale) if f.scale else x
+	return values
+
+def call(packer, key, values):
+	return packer(*[values[f.name] for f in AIVDM_Schema.inputs(key)])
+
+
+class TestPackers(unittest.TestCase):
+
+	def test_against_pack(self):
+		# the compiled packers and the generic BitWriter one build the same payloads
+		rng = random.Random(1)
+		for key in sorted(AIVDM_Schema.SCHEMAS):
+			for i in range(200):
+				values = random_inputs(key, rng)
+				self.assertEqual(call(AIVDM_Encoder.PACKERS[key], key, values), AIVDM_Encoder.pack(key, **values), (key, values))
+
+	def test_lengths(self):
+		rng = random.Random(2)
+		for key in AIVDM_Schema.SCHEMAS:
+			(value, length) = call(AIVDM_Encoder.PACKERS[key], key, random_inputs(key, rng))
+			self.assertTrue(value < 1 << length)
+			if AIVDM_Schema.is_fixed(key):
+				self.assertEqual(length, AIVDM_Schema.length(key))
+		self.assertEqual(AIVDM_Encoder.PACKERS["24A"](247320162, "A")[1], 156)		# padded
+
+	def test_constants(self):
+		# the constant fields are inputs of pack()
+		values = random_inputs("1", random.Random(3))
+		(plain, length) = AIVDM_Encoder.pack("1", **values)
+		(value, length) = AIVDM_Encoder.pack("1", repeat=3, heading=0, **values)
+		self.assertEqual(value ^ plain, 3 << (length - 8) | 511 << (length - 137))
+		self.assertRaises(TypeError, AIVDM_Encoder.pack, "1", speed=0)
+		self.assertRaises(TypeError, AIVDM_Encoder.pack, "20", nonsense=1, **random_inputs("20", random.Random(4)))
+
+	def test_offset(self):
+		self.assertEqual(AIVDM_Schema.offset("1", "lon"), (61, 28))
+		self.assertEqual(AIVDM_Schema.offset("18", "second"), (133, 6))
+		self.assertEqual(AIVDM_Schema.offset("21", "name_ext"), (272, None))
+		self.assertRaises(ValueError, AIVDM_Schema.offset, "24A", "pad")
+		self.assertRaises(KeyError, AIVDM_Schema.offset, "1", "nonsense")
+
+	@unittest.skipIf(numpy is None, "NumPy is required")
+	def test_pack_batch(self):
+		rng = random.Random(5)
+		for key in sorted(AIVDM_Schema.SCHEMAS):
+			if not AIVDM_Schema.is_fixed(key) or any(f.kind in "tr" for f in AIVDM_Schema.SCHEMAS[key]):
+				continue
+			rows = [random_inputs(key, rng) for i in range(100)]
+			columns = dict((f.name, numpy.array([r[f.name] for r in rows])) for f in AIVDM_Schema.inputs(key))
+			matrix = AIVDM_Encoder.pack_batch(key, **columns)
+			for (row, values) in zip(matrix, rows):
+				self.assertEqual(row.tobytes(), AIVDM_Encoder.pack_bits(*call(AIVDM_Encoder.PACKERS[key], key, values))[0], key)
+
+
+class TestDecoders(unittest.TestCase):
+
+	def test_schema_round_trip(self):
+		# the decoders compiled from the same schemas give every input back
+		rng = random.Random(6)
+		for key in sorted(AIVDM_Schema.SCHEMAS):
+			for i in range(50):
+				values = random_inputs(key, rng)
+				fields = AIVDM_Decoder.decode(*call(AIVDM_Encoder.PACKERS[key], key, values))
+				for f in AIVDM_Schema.inputs(key):
+					x = values[f.name]
+					if f.kind == 'r':		# right justified
+						self.assertEqual(fields[f.name].lstrip("@"), x.lstrip("@"), key)
+					elif f.kind == 't':		# '@' padded, up to the end of the payload if variable
+						self.assertEqual(fields[f.name].rstrip("@"), x.rstrip("@"), key)
+					elif f.scale:
+						self.assertAlmostEqual(fields[f.name], x, 9, key)
+					else:
+						self.assertEqual(fields[f.name], x, key)
+
+
+if __name__ == "__main__":
+	unittest.main()
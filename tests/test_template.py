@@ -0,0 +1,68 @@
+#
+# This script is part of the AIS BlackToolkit.
+# Tests of AIVDM_Encoder.PositionTemplate: patched payloads and frames against fully packed ones.
+#
+# Run from the top directory: python -m pytest tests, or python -m unittest discover -s tests
+#
+
+import random
+import unittest
+
+import AIVDM_Encoder
+import AIVDM_Frame
+
+
+def reports(rng, count):
+	"""Random (speed, lon, lat, course, second) reports, within range."""
+	return [(rng.randint(0, 1022) / 10.0, rng.uniform(-180, 180), rng.uniform(-90, 90), rng.randint(0, 3599) / 10.0, rng.randint(0, 63))
+		for i in range(count)]
+
+
+class TestPositionTemplate(unittest.TestCase):
+
+	def test_encode_1(self):
+		rng = random.Random(1)
+		template = AIVDM_Encoder.PositionTemplate(1, 247320162, status=5)
+		for report in reports(rng, 300):
+			self.assertEqual(template.encode(*report), AIVDM_Encoder.encode_1(247320162, 5, *report))
+			self.assertEqual(template.encode(*report, packed=True), AIVDM_Encoder.encode_1(247320162, 5, *report, packed=True))
+
+	def test_encode_18(self):
+		rng = random.Random(2)
+		template = AIVDM_Encoder.PositionTemplate(18, 338123456)
+		for report in reports(rng, 300):
+			self.assertEqual(template.value(*report), AIVDM_Encoder.PACKERS["18"](338123456, *report))
+			self.assertEqual(template.encode(*report), AIVDM_Encoder.encode_18(338123456, *report))
+
+	def test_value_raw(self):
+		rng = random.Random(3)
+		template = AIVDM_Encoder.PositionTemplate(1, 247320162)
+		for (speed, lon, lat, course, second) in reports(rng, 100):
+			raw = (int(round(speed*10)), int(round(lon*600000)), int(round(lat*600000)), int(round(course*10)), second)
+			self.assertEqual(template.value_raw(*raw), template.value(speed, lon, lat, course, second))
+
+	def test_frame(self):
+		# the CRC carried over the static bytes gives the frame of the whole payload
+		rng = random.Random(4)
+		for msg_type in (1, 18):
+			template = AIVDM_Encoder.PositionTemplate(msg_type, 247320162)
+			for report in reports(rng, 50):
+				(data, length) = template.encode(*report, packed=True)
+				for nrzi in (True, False):
+					self.assertEqual(template.frame(*report, enable_NRZI=nrzi), AIVDM_Frame.build_frame(data, length, nrzi))
+
+	def test_update(self):
+		template = AIVDM_Encoder.PositionTemplate(1, 247320162, status=0)
+		report = (12.3, 9.72357833333333, 45.6910166666667, 83.4, 38)
+		template.update(8)
+		self.assertEqual(template.encode(*report), AIVDM_Encoder.encode_1(247320162, 8, *report))
+		template.mmsi = 970010000
+		template.update()
+		self.assertEqual(template.encode(*report), AIVDM_Encoder.encode_1(970010000, 8, *report))
+
+	def test_not_a_position_report(self):
+		self.assertRaises(ValueError, AIVDM_Encoder.PositionTemplate, 4, 247320162)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -13,27 +13,44 @@ of the License, or (at your option) any later version.
 Usage example: 
 $ ./AIVDM_Encoder.py --type=1 --vsize=30x10 | xargs -IA ./unpacker A 1 A
 
+Batch mode: with "-" as binary_string, payloads are read from stdin, one '0'/'1' string per line;
+with "-b", as packed binary records (2 bytes bit count, big endian, then the payload bytes, as
+written by AIVDM_Encoder.py --packed). The sentences are written to stdout, which is
+buffered and flushed once full, so a single process handles any number of payloads of any length.
+Payloads that do not end on a six-bit boundary are padded with fill bits, and those longer than 60
+characters are split into fragments (!AIVDM,n,m,seq,...) to keep each sentence within 82 characters:
+$ ./AIVDM_Encoder.py --stream < messages.jsonl | ./unpacker - 1 A > sentences.nmea
+$ ./AIVDM_Encoder.py --stream --packed < messages.jsonl | ./unpacker -b 1 A > sentences.nmea
+
+With a source station as fourth argument, sentences are prefixed with an NMEA 4.10 tag block:
+\s:source,c:time*hh\!AIVDM,... In "-" mode the Unix time (c:) of each payload is taken from the
+line, after the bits and a comma (e.g. from a simulated schedule); lines without one get s: only.
+$ ./unpacker - 1 A LAB1 < scheduled_payloads.txt > replay.nmea
+
+Lines with anything but '0'/'1' in the payload, or a time that is not a number of seconds, are
+reported on stderr and skipped, and the exit status is then non-zero.
+
 */
 
 
-#include <sstream>
 #include <ctype.h>
 #include <stdio.h>
-#include <iostream>
-#include <iomanip>
+#include <stdlib.h>
 #include <string.h>
+#include <string>
+#include <vector>
 
-unsigned long unpack(char *buffer, int start, int length)
-{
-    unsigned long ret = 0;
-    for(int i = start; i < (start+length); i++) {
-	ret <<= 1;
-	ret |= (buffer[i] & 0x01);
-    }
-    return ret;
-}
+#define OUTPUT_BUFFER (1 << 20)
+
+// Payload characters per fragment: keeps "!AIVDM,n,m,s,c,<payload>,f*hh<CR><LF>" within 82 characters
+#define MAX_FRAGMENT_CHARS 60
+
+// Six-bit value -> armored character ('0'..'W', then '`'..'w')
+static const char ARMOR[] = "0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVW`abcdefghijklmnopqrstuvw";
 
-char nmea_checksum(std::string buffer)
+static const char HEX[] = "0123456789ABCDEF";
+
+char nmea_checksum(const std::string &buffer)
 {
     unsigned int i = 0;
     char sum = 0x00;
@@ -42,45 +59,225 @@ char nmea_checksum(std::string buffer)
     return sum;
 }
 
+// True if the len characters of bits are all '0' or '1'
+static bool valid_bits(const char *bits, int len)
+{
+	for (int i = 0; i < len; i++)
+		if (bits[i] != '0' && bits[i] != '1')
+			return false;
+	return true;
+}
+
+// True if time is a Unix time in seconds, as a tag block carries it: digits only
+static bool valid_time(const char *time)
+{
+	if (!*time)
+		return false;
+	for (; *time; time++)
+		if (!isdigit((unsigned char) *time))
+			return false;
+	return true;
+}
+
+// Armor a '0'/'1' string; the last six-bit group is padded with zeros.
+// Returns the number of fill bits.
+int armor_bits(const char *bits, int len, std::string &out)
+{
+	int i;
+	for (i = 0; i + 6 <= len; i += 6)
+		out += ARMOR[(bits[i] & 1) << 5 | (bits[i+1] & 1) << 4 | (bits[i+2] & 1) << 3 |
+			(bits[i+3] & 1) << 2 | (bits[i+4] & 1) << 1 | (bits[i+5] & 1)];
+	if (i == len)
+		return 0;
+	int value = 0;
+	for (int j = 0; j < 6; j++)
+		value = value << 1 | (i + j < len ? bits[i+j] & 1 : 0);
+	out += ARMOR[value];
+	return 6 - (len - i);
+}
+
+// Same, for nbits bits packed MSB first in (nbits+7)/8 bytes
+int armor_packed(const unsigned char *data, int nbits, std::string &out)
+{
+	int nbytes = (nbits + 7)/8;
+	for (int offset = 0; offset < nbits; offset += 6) {
+		int i = offset >> 3;
+		unsigned int window = data[i] << 8 | (i + 1 < nbytes ? data[i+1] : 0);
+		unsigned int value = (window >> (10 - (offset & 7))) & 0x3f;
+		if (offset + 6 > nbits)	// bits past the payload are fill bits
+			value &= 0x3f << (offset + 6 - nbits);
+		out += ARMOR[value];
+	}
+	return (6 - nbits % 6) % 6;
+}
+
+static void append_sentence(const std::string &body, std::string &out)
+{
+	unsigned char checksum = nmea_checksum(body);
+	out += body;
+	out += '*';
+	out += HEX[checksum >> 4];
+	out += HEX[checksum & 0xf];
+	out += '\n';
+}
+
+// NMEA 4.10 tag block of source (s:) and time (c:, if not NULL)
+void tag_block(const char *source, const char *time, std::string &tag)
+{
+	std::string body = "s:";
+	body += source;
+	if (time) {
+		body += ",c:";
+		body += time;
+	}
+	unsigned char checksum = nmea_checksum(body);
+	tag = "\\";
+	tag += body;
+	tag += '*';
+	tag += HEX[checksum >> 4];
+	tag += HEX[checksum & 0xf];
+	tag += '\\';
+}
+
+// Append the sentences (or the bare payload) carrying the armored payload to out, with their line ends,
+// each sentence after tag (a tag block, or empty).
+// Payloads longer than MAX_FRAGMENT_CHARS are split into fragments sharing a sequential message ID.
+void sentence(const std::string &payload, int fill, int enable_nmea, char channel, const std::string &tag, std::string &out)
+{
+	static int seq = 0;
+	char head[32];
+
+	if (!enable_nmea) {
+		out += payload;
+		out += '\n';
+		return;
+	}
+	int count = payload.empty() ? 1 : (payload.size() + MAX_FRAGMENT_CHARS - 1)/MAX_FRAGMENT_CHARS;
+	for (int n = 0; n < count; n++) {
+		if (count == 1)
+			snprintf(head, sizeof(head), "!AIVDM,1,1,,%c,", channel);
+		else
+			snprintf(head, sizeof(head), "!AIVDM,%d,%d,%d,%c,", count, n+1, seq, channel);
+		std::string body = head;
+		body.append(payload, n*MAX_FRAGMENT_CHARS, MAX_FRAGMENT_CHARS);
+		body += ',';
+		body += (char) ('0' + (n == count-1 ? fill : 0));	//number of bits to fill out 6-bit boundary
+		out += tag;
+		append_sentence(body, out);
+	}
+	if (count > 1)
+		seq = (seq + 1) % 10;
+}
+
+void flush(std::string &out, bool force)
+{
+	if (out.size() >= OUTPUT_BUFFER || (force && !out.empty())) {
+		fwrite(out.data(), 1, out.size(), stdout);
+		out.clear();
+	}
+}
+
+// "-": one '0'/'1' payload per line, optionally followed by ",time"; returns the number of payloads,
+// or -1 if any line was rejected (reported on stderr and skipped)
+int batch_bits(int enable_nmea, char channel, const char *source)
+{
+	std::string out, payload, tag;
+	out.reserve(OUTPUT_BUFFER + 4096);
+	char *line = NULL;
+	size_t size = 0;
+	ssize_t len;
+	int count = 0, number = 0, errors = 0;
+	while ((len = getline(&line, &size, stdin)) != -1) {
+		number++;
+		while (len > 0 && (line[len-1] == '\n' || line[len-1] == '\r'))
+			len--;
+		if (len == 0)
+			continue;
+		line[len] = '\0';
+		char *time = strchr(line, ',');
+		if (time) {
+			len = time - line;
+			time++;
+		}
+		if (!valid_bits(line, len) || (time && !valid_time(time))) {
+			fprintf(stderr, "unpacker: line %d: %s\n", number, valid_bits(line, len) ? "the time is not a number of seconds" : "not a '0'/'1' payload");
+			errors++;
+			continue;
+		}
+		if (source)
+			tag_block(source, time, tag);
+		payload.clear();
+		int fill = armor_bits(line, len, payload);
+		sentence(payload, fill, enable_nmea, channel, tag, out);
+		flush(out, false);
+		count++;
+	}
+	free(line);
+	flush(out, true);
+	return errors ? -1 : count;
+}
+
+// "-b": packed records; returns the number of payloads, or -1 on a truncated record
+int batch_packed(int enable_nmea, char channel, const char *source)
+{
+	std::string out, payload, tag;
+	if (source)
+		tag_block(source, NULL, tag);
+	out.reserve(OUTPUT_BUFFER + 4096);
+	unsigned char head[2];
+	std::vector<unsigned char> data;
+	int count = 0;
+	while (fread(head, 1, 2, stdin) == 2) {
+		int nbits = head[0] << 8 | head[1];
+		size_t nbytes = (nbits + 7)/8;
+		data.resize(nbytes + 1);
+		if (fread(&data[0], 1, nbytes, stdin) != nbytes) {
+			fprintf(stderr, "unpacker: truncated packed record\n");
+			count = -1;
+			break;
+		}
+		payload.clear();
+		int fill = armor_packed(&data[0], nbits, payload);
+		sentence(payload, fill, enable_nmea, channel, tag, out);
+		flush(out, false);
+		count++;
+	}
+	flush(out, true);
+	return count;
+}
+
 
 int main(int argc, char *argv[]) {
 
 
 	if (argc<4) {
-		std::cout << "\nUsage: ./unpacker binary_string enable_nmea channel\n";
-		std::cout << "\nenable_nmea = 1 for full NMEA sentence, otherwise only payload is printed\n";
-		std::cout << "channel = A/B\n\n";
+		printf("\nUsage: ./unpacker binary_string enable_nmea channel [source]\n");
+		printf("\nbinary_string = - to read one payload per line from stdin, -b to read packed records from stdin\n");
+		printf("enable_nmea = 1 for full NMEA sentence, otherwise only payload is printed\n");
+		printf("channel = A/B\n");
+		printf("source = prefix the sentences with an NMEA 4.10 tag block of this source station\n\n");
 		return 0; 
 	}
 
-	int i;
-	char asciidata[255];
-
-	int len = strlen(argv[1]);
-	
 	int enable_nmea = (int) *argv[2] - 48;
 	char channel = *argv[3];
-	std::ostringstream d_payload;
-	d_payload.str("");
-	
-	for(i = 0; i < len/6; i++) {
-		asciidata[i] = unpack(argv[1], i*6, 6);
-		if(asciidata[i] > 39) asciidata[i] += 8;
-			asciidata[i] += 48;
-	}
+	const char *source = argc > 4 ? argv[4] : NULL;
 
-	if (enable_nmea)
-	    d_payload << "!AIVDM,1,1,," << channel << ",";
+	if (!strcmp(argv[1], "-"))
+		return batch_bits(enable_nmea, channel, source) < 0;
+	if (!strcmp(argv[1], "-b"))
+		return batch_packed(enable_nmea, channel, source) < 0;
 
-    for(int i = 0; i < len/6; i++) 
-    	d_payload << asciidata[i];
-    
-    if (enable_nmea) {
-		d_payload << ",0"; //number of bits to fill out 6-bit boundary
-		char checksum = nmea_checksum(std::string(d_payload.str()));
-		d_payload << "*" << std::setw(2) << std::setfill('0') << std::hex << std::uppercase << int(checksum);
-    }
-
-	std::cout << std::string(d_payload.str()) << std::endl;	
+	int len = strlen(argv[1]);
+	if (!valid_bits(argv[1], len)) {
+		fprintf(stderr, "unpacker: %s: not a '0'/'1' payload\n", argv[1]);
+		return 2;
+	}
+	std::string payload, out, tag;
+	if (source)
+		tag_block(source, NULL, tag);
+	int fill = armor_bits(argv[1], len, payload);
+	sentence(payload, fill, enable_nmea, channel, tag, out);
+	fwrite(out.data(), 1, out.size(), stdout);
 	return 1;
 }